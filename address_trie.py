@@ -0,0 +1,253 @@
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Tuple
+
+import requests
+
+from classes import RequestConfig, SearchContext
+from json_processing import can_stream_output, extract_address_records, iter_address_records, \
+    save_record_stream
+from name_matching import NameIndex
+from settings import beam_margin, beam_width, stream_final_level
+
+logger = logging.getLogger(__name__)
+
+
+class AddressTrieNode:
+    """
+    Узел префиксного дерева адресов. Соответствует одному уникальному префиксу адреса
+    (регион → город → улица → дом), который ищется в ФИАС ровно один раз за пакет.
+
+    Attributes:
+    name str: Элемент адреса, по которому ищется объект на уровне level.
+    level int: Уровень элемента в адресе (индекс в массиве hierarchy).
+    children Dict[str, AddressTrieNode]: Дочерние узлы, ключ — элемент адреса в нижнем регистре.
+    tasks List[List[str]]: Задачи, адрес которых заканчивается на этом узле.
+    path str: Строка из ID найденных объектов, заполняется при разрешении узла.
+    response_data dict: Декодированный ответ GetAddressItems со списком дочерних объектов path.
+    name_index NameIndex: Индекс названий дочерних объектов, строится один раз для всех дочерних узлов.
+    records List[dict]: Записи об адресах, если ответ узла читался потоково (settings.stream_final_level).
+                        Пустой список, если записи уже выведены по мере чтения ответа.
+    """
+
+    def __init__(self, name: str = None, level: int = -1, parent: 'AddressTrieNode' = None):
+        """
+        Инициализирует узел префиксного дерева.
+
+        :param name: Элемент адреса. Для корня — None.
+        :type name: Optional[str]
+        :param level: Уровень элемента в адресе. Для корня — -1.
+        :type level: int
+        :param parent: Родительский узел. Для корня — None.
+        :type parent: Optional[AddressTrieNode]
+        """
+        self.name = name
+        self.level = level
+        self.parent = parent
+        self.children: Dict[str, AddressTrieNode] = {}
+        self.tasks: List[List[str]] = []
+        self.path: str | None = None
+        self.response_data: dict | None = None
+        self.name_index: NameIndex | None = None
+        self.records: List[dict] | None = None
+
+    def build_name_index(self) -> None:
+        """
+        Строит индекс названий по ответу узла, если у узла есть дочерние узлы.
+        Индекс используется всеми дочерними узлами, поэтому ответ разбирается один раз.
+
+        :return: None
+        """
+        if self.children:
+            self.name_index = NameIndex(self.response_data.get('addresses', []), self.level + 1)
+
+
+class AddressTrie:
+    """
+    Префиксное дерево задач для пакетного поиска.
+
+    Задачи с общим началом адреса (тысячи квартир в одном городе и на нескольких улицах) разделяют узлы дерева,
+    поэтому каждый уникальный префикс разрешается одним запросом GetAddressItems, а дочерние узлы ищутся
+    в уже полученном ответе родителя.
+
+    Если объект узла неоднозначен (несколько объектов совпадают почти одинаково, см. settings.beam_width),
+    узел проверяет кандидатов на один уровень вперёд: выбирается кандидат, среди дочерних объектов которого
+    лучше находятся дочерние узлы. Полный поиск по нескольким путям (RequestConfig.beam_search) в дереве
+    невозможен: узел общий для всех задач поддерева, и путь выбирается один раз для всех.
+
+    Methods:
+        resolve(session: requests.Session, workers: int) -> Iterator[AddressTrieNode]:
+        Разрешает все узлы дерева и по мере готовности возвращает узлы, на которых заканчиваются задачи.
+    """
+
+    def __init__(self, task_list: List[List[str]], config: RequestConfig):
+        """
+        Строит префиксное дерево из списка задач.
+
+        :param task_list: Список задач, где каждая задача представлена списком строк.
+        :type task_list: List[List[str]]
+        :param config: Конфигурация запроса GetAddressItems (search_response из requests_config).
+        :type config: RequestConfig
+        """
+        self.config = config
+        self.root = AddressTrieNode()
+        self.nodes_count = 0
+
+        # Сессия, переданная в resolve. Из неё выбираются прокси для узлов, если задан пул прокси
+        self.session = None
+
+        for task in task_list:
+            node: AddressTrieNode = self.root
+            for level, item in enumerate(task):
+                # Ключ в нижнем регистре: get_object_id_by_name сравнивает имена без учёта регистра
+                key: str = item.lower()
+                if key not in node.children:
+                    node.children[key] = AddressTrieNode(item, level, node)
+                    self.nodes_count += 1
+                node = node.children[key]
+            node.tasks.append(task)
+
+        logger.info(f'Address trie built: {len(task_list)} tasks, {self.nodes_count} unique prefixes')
+
+    def _resolve_node(self, context: SearchContext, node: AddressTrieNode) -> AddressTrieNode:
+        """
+        Ищет ID объекта узла в ответе родителя и запрашивает список его дочерних объектов.
+
+        :param context: Подготовленный контекст (сессия и заголовки с токеном).
+        :type context: SearchContext
+        :param node: Узел, родитель которого уже разрешён.
+        :type node: AddressTrieNode
+        :return: Разрешённый узел.
+        :rtype: AddressTrieNode
+        :raises LookupError: Если объект не найден в ответе родителя.
+        """
+        logger.info('Searching %s on level %d', node.name, node.level)
+        # Проверять на уровень вперёд можно только узлы с дочерними узлами, у листа выбирается лучший объект
+        candidates: List[Tuple[str, float]] = node.parent.name_index.top_matches(
+            node.name, beam_width if node.children else 1, beam_margin, RequestConfig.match_min_ratio)
+        if not candidates:
+            raise LookupError(f'Object {node.name} not found on level {node.level}')
+
+        # Каждый поток работает со своей копией контекста, общими остаются только сессия и заголовки.
+        # С пулом прокси каждый узел выполняется через выбранный для него прокси с токеном этого прокси.
+        if RequestConfig.proxy_pool is not None:
+            node_context: SearchContext = self.config.prepare_context(self.session)
+        else:
+            node_context: SearchContext = SearchContext()
+            node_context.session, node_context.headers = context.session, context.headers
+
+        if len(candidates) > 1:
+            self._choose_candidate(node_context, node, candidates)
+            return node
+
+        new_path: str = candidates[0][0]
+        node.path = f"{node.parent.path}.{new_path}" if node.parent.path else str(new_path)
+        logger.debug('New path: %s', node.path)
+
+        if stream_final_level and not node.children and can_stream_output():
+            # Листовой узел в потоковом режиме: записи выводятся для всех задач узла частями по мере чтения ответа,
+            # дальше передаётся пустой список
+            save_record_stream(iter_address_records(self.config.iter_address_items(node_context, node.path)),
+                               node.tasks)
+            node.records = []
+        elif stream_final_level and not node.children:
+            # Адреса сразу превращаются в записи, ответ целиком не хранится
+            node.records = extract_address_records(self.config.iter_address_items(node_context, node.path))
+        else:
+            node.response_data = self.config.get_address_items(node_context, node.path)
+            node.build_name_index()
+        return node
+
+    def _choose_candidate(self, context: SearchContext, node: AddressTrieNode,
+                          candidates: List[Tuple[str, float]]) -> None:
+        """
+        Выбирает объект неоднозначного узла: списки дочерних объектов кандидатов запрашиваются параллельно,
+        и выбирается кандидат с наибольшей суммой степени совпадения и лучших степеней совпадения дочерних узлов.
+        При равной сумме выигрывает кандидат, который лучше совпадает сам. Заполняет path, ответ и индекс узла.
+
+        :param context: Контекст узла (сессия и заголовки с токеном).
+        :type context: SearchContext
+        :param node: Узел с дочерними узлами.
+        :type node: AddressTrieNode
+        :param candidates: Пары (ID объекта, степень совпадения) из NameIndex.top_matches.
+        :type candidates: List[Tuple[str, float]]
+        :return: None
+        """
+        paths: List[str] = [f"{node.parent.path}.{object_id}" if node.parent.path else str(object_id)
+                            for object_id, _ in candidates]
+        logger.info('Ambiguous %s on level %d, candidates: %s', node.name, node.level, candidates)
+
+        # Каждый кандидат получает свою копию контекста: get_address_items записывает в контекст данные запроса
+        def fetch(candidate_path: str) -> dict:
+            candidate_context: SearchContext = copy.copy(context)
+            candidate_context.headers = dict(context.headers)
+            return self.config.get_address_items(candidate_context, candidate_path)
+
+        with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            responses: List[dict] = list(executor.map(fetch, paths))
+
+        best_score: float = -1.0
+        for (_, match_ratio), path, response_data in zip(candidates, paths, responses):
+            name_index: NameIndex = NameIndex(response_data.get('addresses', []), node.level + 1)
+            score: float = match_ratio
+            for child in node.children.values():
+                matches: List[Tuple[str, float]] = name_index.top_matches(child.name, 1, 0.0,
+                                                                          RequestConfig.match_min_ratio)
+                score += matches[0][1] if matches else 0.0
+            if score > best_score:
+                best_score = score
+                node.path, node.response_data, node.name_index = path, response_data, name_index
+        logger.debug('New path: %s (score %.2f)', node.path, best_score)
+
+    def resolve(self, session: requests.Session, workers: int = 1) -> Iterator[AddressTrieNode]:
+        """
+        Разрешает дерево: сначала запрашивается список объектов первого уровня, затем каждый узел ищется
+        в ответе родителя, как только родитель готов. Запросы независимых узлов выполняются параллельно.
+
+        Если объект какого-то узла не найден, ошибка логируется, а задачи всего поддерева пропускаются.
+
+        :param session: Активная сессия для выполнения запросов.
+        :type session: requests.Session
+        :param workers: Количество потоков.
+        :type workers: int
+        :return: Итератор по разрешённым узлам, на которых заканчивается хотя бы одна задача.
+        :rtype: Iterator[AddressTrieNode]
+        """
+        self.session = session
+        context: SearchContext = self.config.prepare_context(session)
+        self.root.response_data = self.config.get_address_items(context)
+        self.root.build_name_index()
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            pending: Dict[Future, AddressTrieNode] = {
+                executor.submit(self._resolve_node, context, child): child for child in self.root.children.values()
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node: AddressTrieNode = pending.pop(future)
+                    try:
+                        future.result()
+                    except LookupError as e:
+                        logger.error(f'{e}, skipped tasks: {self.count_tasks(node)}')
+                        continue
+
+                    # Как только узел разрешён, запускаем поиск его дочерних узлов
+                    for child in node.children.values():
+                        pending[executor.submit(self._resolve_node, context, child)] = child
+
+                    if node.tasks:
+                        yield node
+
+    @staticmethod
+    def count_tasks(node: AddressTrieNode) -> int:
+        """
+        Считает количество задач в поддереве узла.
+
+        :param node: Узел дерева.
+        :type node: AddressTrieNode
+        :return: Количество задач.
+        :rtype: int
+        """
+        return len(node.tasks) + sum(AddressTrie.count_tasks(child) for child in node.children.values())
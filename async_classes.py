@@ -0,0 +1,357 @@
+import asyncio
+import copy
+import inspect
+import logging
+import time
+from typing import Callable, List, Tuple
+
+import requests
+
+from classes import ADDRESS_LEVELS, RequestConfig, SearchContext, rank_beam_candidates
+from metrics import get_endpoint, get_level, get_response_size, registry
+from response_cache import ResponseCache
+from settings import request_timeout, beam_width
+from json_processing import get_object_id_by_name, json_loads, save_search_result
+
+# httpx нужен только для асинхронного режима, поэтому он необязательный и импортируется в get_async_client:
+# до создания клиента ни один запрос через httpx не выполняется
+httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+def get_async_client(headers: dict, proxy: str = '', max_connections: int = 100):
+    """
+    Создаёт асинхронный HTTP-клиент с общими заголовками, прокси и пулом соединений.
+
+    :param headers: Заголовки, которые отправляются в каждом запросе.
+    :type headers: dict
+    :param proxy: Адрес прокси. Пустая строка — без прокси.
+    :type proxy: str
+    :param max_connections: Максимальное количество одновременных соединений.
+    :type max_connections: int
+    :return: Асинхронный клиент.
+    :rtype: httpx.AsyncClient
+    :raises RuntimeError: Если httpx не установлен.
+    """
+    global httpx
+    if httpx is None:
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError('Async mode requires httpx: pip install httpx')
+
+    # Прокси в credentials указывается без схемы, httpx требует её явно
+    if proxy and '://' not in proxy:
+        proxy = f'http://{proxy}'
+
+    connect_timeout, read_timeout = request_timeout
+    return httpx.AsyncClient(
+        headers=headers,
+        proxy=proxy or None,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+    )
+
+
+class AsyncRequestConfig:
+    """
+    Асинхронный вариант RequestConfig на httpx.AsyncClient. Выполняет те же декларативные конфигурации
+    из requests_config.py (URL, метод, заголовки, данные и методы до и после запроса), но без потока
+    на каждый запрос: сотни поисков адресов выполняются одновременно в одном цикле событий.
+
+    Методы до и после запроса ищутся сначала в AsyncRequestConfig (асинхронные add_token_to_headers и search_loop),
+    затем в исходной конфигурации (get_token). Если метод возвращает корутину, она ожидается.
+
+    Ограничитель частоты RequestConfig.rate_limiter, политика повторов RequestConfig.retry_policy и кэш
+    RequestConfig.response_cache общие с синхронным режимом. Количество одновременных запросов ограничивается
+    семафором AsyncRequestConfig.semaphore. Ответ последнего уровня читается целиком, settings.stream_final_level
+    и пул прокси в асинхронном режиме не используются.
+
+    Attributes:
+    token_manager AsyncTokenManager: Менеджер токена для асинхронных запросов.
+    semaphore asyncio.Semaphore: Ограничение количества одновременных запросов. Если None, не ограничивается.
+
+    Methods:
+        execute(client: httpx.AsyncClient, context: SearchContext) -> httpx.Response:
+        Выполняет запрос на основе конфигурации, используя указанный клиент.
+    """
+    token_manager = None  # Заполняется в main.start_async
+    semaphore = None  # Заполняется в main.start_async
+
+    def __init__(self, config: RequestConfig):
+        """
+        :param config: Декларативная конфигурация запроса (объект из requests_config.py).
+        :type config: RequestConfig
+        """
+        self.config = config
+
+    @property
+    def url(self) -> str:
+        return self.config.url
+
+    async def _request(self, client, method: str, headers: dict, data: dict = None):
+        """
+        Отправляет одну попытку запроса. Ошибки httpx превращаются в исключения requests,
+        чтобы политика повторов и обработка ошибок были общими с синхронным режимом.
+
+        :return: Ответ сервера с прочитанным телом.
+        :rtype: httpx.Response
+        """
+        if RequestConfig.rate_limiter is not None:
+            # Бюджет резервируется сразу, а пауза выполняется без блокировки цикла событий
+            delay: float = RequestConfig.rate_limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        # Длину тела вычисляет клиент: httpx, в отличие от requests, не заменяет заголовок content-length
+        # из конфигурации запроса
+        headers = {key: value for key, value in headers.items() if key.lower() != 'content-length'}
+
+        try:
+            if AsyncRequestConfig.semaphore is None:
+                return await client.request(method, self.url, headers=headers, json=data)
+            async with AsyncRequestConfig.semaphore:
+                return await client.request(method, self.url, headers=headers, json=data)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+    async def send(self, client, method: str, headers: dict, data: dict = None):
+        """
+        Отправляет HTTP-запрос на self.url, повторяя его при временных ошибках по RequestConfig.retry_policy.
+        Если сервер отклонил заголовок "master-token" (401/403), токен обновляется и запрос повторяется.
+
+        :param client: Асинхронный HTTP-клиент.
+        :type client: httpx.AsyncClient
+        :param method: HTTP-метод ('GET' или 'POST').
+        :type method: str
+        :param headers: Заголовки запроса.
+        :type headers: dict
+        :param data: Данные для POST-запроса.
+        :type data: Optional[dict]
+        :return: Ответ сервера.
+        :rtype: httpx.Response
+        """
+        started: float = time.perf_counter()
+
+        async def request_with_retries():
+            if RequestConfig.retry_policy is None:
+                return await self._request(client, method, headers, data)
+            return await RequestConfig.retry_policy.send_async(
+                lambda: self._request(client, method, headers, data), f'{method} {self.url}')
+
+        response = await request_with_retries()
+
+        token: str | None = headers.get('master-token')
+        token_manager = AsyncRequestConfig.token_manager
+        if response.status_code in (401, 403) and token and token_manager is not None:
+            registry.increment('token_rejections_total')
+            token_manager.invalidate(token)
+            headers['master-token'] = await token_manager.get_async(client)
+            response = await request_with_retries()
+
+        name: str = get_endpoint(self.url)
+        registry.observe_since('request_seconds', started, endpoint=name)
+        registry.increment('responses_total', endpoint=name, status=response.status_code)
+        registry.increment('response_bytes_total', get_response_size(response), endpoint=name)
+        return response
+
+    async def _call_hook(self, name: str | None, *args):
+        """
+        Вызывает метод до или после запроса по имени и ожидает его, если он асинхронный.
+
+        :param name: Имя метода. Может быть None.
+        :type name: Optional[str]
+        :return: Результат метода.
+        """
+        if not name:
+            return None
+        method_to_call: Callable = getattr(self, name, None) or getattr(self.config, name, None)
+        if not callable(method_to_call):
+            return None
+        result = method_to_call(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def prepare_context(self, client, context: SearchContext = None) -> SearchContext:
+        """
+        Подготавливает контекст задачи: сохраняет клиент, копирует заголовки и данные из конфигурации
+        и вызывает before_request_method.
+
+        :param client: Асинхронный HTTP-клиент.
+        :type client: httpx.AsyncClient
+        :param context: Контекст задачи. Если не передан, создаётся пустой контекст.
+        :type context: Optional[SearchContext]
+        :return: Подготовленный контекст задачи.
+        :rtype: SearchContext
+        """
+        if context is None:
+            context = SearchContext()
+
+        context.session = client
+        context.headers = dict(self.config.headers)
+        context.data = dict(self.config.data) if self.config.data is not None else None
+        await self._call_hook(self.config.before_request_method, context)
+        return context
+
+    async def execute(self, client, context: SearchContext = None):
+        """
+        Выполняет запрос по конфигурации, вызывая методы до и после запроса.
+
+        :param client: Асинхронный HTTP-клиент.
+        :type client: httpx.AsyncClient
+        :param context: Контекст задачи. Если не передан, создаётся пустой контекст.
+        :type context: Optional[SearchContext]
+        :return: Ответ сервера или новый ответ, который вернул after_request_method.
+        :rtype: httpx.Response
+        :raises ValueError: Если указан неподдерживаемый HTTP-метод (не GET и не POST).
+        """
+        logger.debug('Executing async %s request to %s', self.config.method, self.url)
+
+        context = await self.prepare_context(client, context)
+
+        method: str = self.config.method.upper()
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported method: {self.config.method}")
+        response = await self.send(client, method, context.headers, context.data if method == 'POST' else None)
+
+        new_response = await self._call_hook(self.config.after_request_method, response, context)
+        if new_response:
+            logger.debug('Received new response from after request method: %s', self.config.after_request_method)
+            return new_response
+        return response
+
+    @staticmethod
+    async def add_token_to_headers(context: SearchContext) -> None:
+        """
+        Добавляет заголовок "master-token" с действующим токеном из AsyncRequestConfig.token_manager.
+
+        :param context: Контекст задачи.
+        :type context: SearchContext
+        :return: None
+        """
+        logger.debug('Adding token to headers')
+        token: str = await AsyncRequestConfig.token_manager.get_async(context.session)
+        context.headers.update({"master-token": f"{token}"})
+
+    async def get_address_items(self, context: SearchContext, path: str = None) -> dict:
+        """
+        Выполняет POST-запрос GetAddressItems и возвращает декодированный список дочерних объектов для path.
+        Если path не указан, отправляются исходные данные конфигурации. Ответ сначала ищется в локальном
+        индексе ГАР (RequestConfig.local_resolver), затем в кэше. Запросы к SQLite индекса и кэша выполняются
+        в потоках (asyncio.to_thread), чтобы чтение с диска не останавливало цикл событий.
+
+        :param context: Подготовленный контекст задачи (клиент и заголовки с токеном).
+        :type context: SearchContext
+        :param path: Строка из ID объектов, разделённых точкой.
+        :type path: Optional[str]
+        :return: Декодированный ответ сервера.
+        :rtype: dict
+        :raises requests.exceptions.HTTPError: Если сервер вернул ошибку.
+        """
+        started: float = time.perf_counter()
+        level: int = get_level(path)
+        context.data = {"address_levels": ADDRESS_LEVELS, "address_type": 2, "path": f"{path}"} if path \
+            else dict(self.config.data)
+        logger.debug('New data: %s', context.data)
+
+        if RequestConfig.local_resolver is not None:
+            local_data: dict | None = await asyncio.to_thread(RequestConfig.local_resolver.get_address_items,
+                                                              context.data)
+            if local_data is not None:
+                registry.observe_since('address_items_seconds', started, level=level, source='local')
+                return local_data
+
+        cache: ResponseCache | None = RequestConfig.response_cache
+        if cache is not None:
+            body: str | None = await asyncio.to_thread(cache.get, self.url, context.data)
+            if body is not None:
+                response_data: dict = json_loads(body)
+                registry.observe_since('address_items_seconds', started, level=level, source='cache')
+                return response_data
+
+        response = await self.send(context.session, 'POST', context.headers, context.data)
+        if response.status_code >= 400:
+            raise requests.exceptions.HTTPError(f'{response.status_code} Error for url: {self.url}')
+
+        if cache is not None:
+            await asyncio.to_thread(cache.put, self.url, context.data, response.text)
+
+        response_data: dict = json_loads(response.content)
+        if RequestConfig.cadastral_index is not None:
+            await asyncio.to_thread(RequestConfig.cadastral_index.add_addresses, response_data.get('addresses', []))
+        registry.observe_since('address_items_seconds', started, level=level, source='network')
+        return response_data
+
+    async def beam_search(self, response_data: dict, context: SearchContext) -> None:
+        """
+        Асинхронный вариант RequestConfig.beam_search: списки дочерних объектов для нескольких путей
+        запрашиваются одновременно. Найденный path записывается в context.path.
+
+        :param response_data: Декодированный ответ со списком объектов первого уровня.
+        :type response_data: dict
+        :param context: Подготовленный контекст задачи, содержащий адрес.
+        :type context: SearchContext
+        :return: None
+        :raises LookupError: Если элемент адреса не найден ни на одном из путей.
+        """
+        beam: List[Tuple[float, str, dict]] = [(0.0, '', response_data)]
+        last_level: int = len(context.address) - 1
+
+        for level, item in enumerate(context.address):
+            candidates: List[Tuple[float, str]] = rank_beam_candidates(beam, item, level)
+            if level == last_level:
+                context.path = candidates[0][1]
+                break
+
+            # Каждый кандидат получает свою копию контекста: get_address_items записывает в контекст данные запроса
+            contexts: List[SearchContext] = [copy.copy(context) for _ in candidates]
+            for candidate_context in contexts:
+                candidate_context.headers = dict(context.headers)
+            responses = await asyncio.gather(*(self.get_address_items(candidate_context, path)
+                                               for candidate_context, (_, path) in zip(contexts, candidates)))
+            beam = [(score, path, data) for (score, path), data in zip(candidates, responses)]
+
+        logger.debug('New path: %s', context.path)
+
+    async def search_loop(self, response, context: SearchContext) -> None:
+        """
+        Последовательно ищет элементы адреса context.address, спускаясь по иерархии ФИАС.
+        Вызывается после выполнения запроса search_response. Сохранение результата (Excel, таблица)
+        выполняется в отдельном потоке, чтобы не останавливать остальные поиски.
+
+        :param response: Ответ со списком объектов первого уровня. Если None, список запрашивается
+                         через get_address_items.
+        :type response: Optional[httpx.Response]
+        :param context: Контекст задачи, содержащий адрес. В него записываются path и результат поиска.
+        :type context: SearchContext
+        :return: None
+        """
+        logger.debug('Starting async search loop')
+        started: float = time.perf_counter()
+
+        response_data: dict = json_loads(response.content) if response is not None \
+            else await self.get_address_items(context)
+        if beam_width > 1 and context.address:
+            await self.beam_search(response_data, context)
+            response_data = await self.get_address_items(context, context.path)
+        else:
+            for level, item in enumerate(context.address):
+                logger.info('Searching %s on level %d', item, level)
+                new_path: str | None = get_object_id_by_name(response_data, item, level,
+                                                                   RequestConfig.match_min_ratio, context.path)
+                if new_path is None:
+                    raise LookupError(f'Address element {item} not found on level {level}')
+                context.path = f"{context.path}.{new_path}" if context.path else new_path
+                logger.debug('New path: %s', context.path)
+
+                response_data = await self.get_address_items(context, context.path)
+
+        context.result = response_data
+        await asyncio.to_thread(save_search_result, response_data, task=context.address, path=context.path)
+        registry.observe_since('address_seconds', started)
+
+        logger.debug('Async search loop finished')
@@ -0,0 +1,448 @@
+# Модуль benchmarks.py содержит бенчмарки парсера. Запуск:
+#
+#   python benchmarks.py matching [--candidates 5000] [--queries 200]
+#   python benchmarks.py load [--tasks 200] [--workers 8] [--latency 0.02] [--error-rate 0.01] [--trie]
+#   python benchmarks.py output [--records 100000] [--sinks csv,jsonl,sqlite]
+#   python benchmarks.py startup [--runs 10]
+#
+# Бенчмарки не обращаются к ФИАС: данные для них генерируются, а нагрузочный бенчмарк (load) выполняет
+# настоящий поиск против локального заменителя сервера ФИАС (mock_fias.py).
+
+import argparse
+import collections
+import itertools
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+import json_processing
+import main as parser_main
+from classes import RequestConfig
+from json_processing import extract_address_records
+from mock_fias import ID_BASE, MockFiasServer, RecordedHierarchy, SyntheticHierarchy
+from name_matching import NameIndex
+from output_sinks import OutputWriter
+from requests_config import request_configs, search_response, use_base_url
+from task_reader import Task
+from token_manager import TokenManager
+
+# Тяжёлые модули, которые не должны загружаться при запуске (нужны только отдельным способам вывода и режимам)
+HEAVY_MODULES = ['pandas', 'openpyxl', 'prettytable', 'pyarrow', 'httpx']
+
+# Буквы для генерации названий
+LETTERS = 'абвгдежзийклмнопрстуфхцчшщэюя'
+STREET_TYPES = ['ул.', 'пер.', 'пр-кт', 'б-р', 'ш.', 'наб.']
+
+
+def legacy_get_object_id_by_name(addresses: List[dict], name: str, level: int) -> str | None:
+    """
+    Прежний алгоритм get_object_id_by_name: SequenceMatcher.ratio() для каждого кандидата.
+    Используется как эталон для сравнения скорости и результата.
+
+    :param addresses: Список адресов из ответа GetAddressItems.
+    :param name: Имя объекта для поиска.
+    :param level: Уровень, на котором нужно искать.
+    :return: Идентификатор объекта или None.
+    """
+    best_match_id: str | None = None
+    best_match_ratio: float = 0
+    for address in addresses:
+        hierarchy: list = address.get('hierarchy', [])
+        if level < len(hierarchy):
+            item: dict = hierarchy[level]
+            match_ratio: float = SequenceMatcher(None, name.lower(), item.get('full_name', '').lower()).ratio()
+            if match_ratio > best_match_ratio:
+                best_match_ratio, best_match_id = match_ratio, item.get('object_id')
+    return best_match_id
+
+
+def make_addresses(count: int, rng: random.Random) -> List[dict]:
+    """
+    Генерирует ответ GetAddressItems с count улицами одного города.
+
+    :param count: Количество улиц.
+    :param rng: Генератор случайных чисел.
+    :return: Список адресов.
+    """
+    addresses: List[dict] = []
+    for object_id in range(count):
+        word: str = ''.join(rng.choice(LETTERS) for _ in range(rng.randint(5, 14))).capitalize()
+        full_name: str = f'{rng.choice(STREET_TYPES)} {word}'
+        addresses.append({'hierarchy': [{'object_id': 1, 'full_name': 'г. Москва'},
+                                        {'object_id': 1000 + object_id, 'full_name': full_name}]})
+    return addresses
+
+
+def make_typo(name: str, rng: random.Random) -> str:
+    """
+    Вносит в название одну опечатку: удаление, замену или перестановку символа.
+
+    :param name: Название.
+    :param rng: Генератор случайных чисел.
+    :return: Название с опечаткой.
+    """
+    position: int = rng.randrange(len(name) - 1)
+    kind: int = rng.randrange(3)
+    if kind == 0:
+        return name[:position] + name[position + 1:]
+    if kind == 1:
+        return name[:position] + rng.choice(LETTERS) + name[position + 1:]
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def benchmark_matching(candidates: int, queries: int, seed: int = 1) -> None:
+    """
+    Сравнивает прежний перебор через SequenceMatcher с индексом NameIndex на одном ответе
+    с candidates улицами и queries запросами (точные названия, названия с опечатками и другие сокращения).
+
+    :param candidates: Количество кандидатов в ответе.
+    :param queries: Количество запросов.
+    :param seed: Начальное значение генератора случайных чисел.
+    :return: None
+    """
+    rng: random.Random = random.Random(seed)
+    addresses: List[dict] = make_addresses(candidates, rng)
+    names: List[str] = [address['hierarchy'][1]['full_name'] for address in addresses]
+
+    query_list: List[str] = []
+    for i in range(queries):
+        name: str = rng.choice(names)
+        if i % 3 == 0:
+            query_list.append(name)  # Точное совпадение
+        elif i % 3 == 1:
+            query_list.append(make_typo(name, rng))  # Опечатка
+        else:
+            query_list.append(name.replace('ул.', 'улица').upper())  # Другое написание
+
+    started: float = time.perf_counter()
+    legacy_results: List[str | None] = [legacy_get_object_id_by_name(addresses, query, 1) for query in query_list]
+    legacy_time: float = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index: NameIndex = NameIndex(addresses, 1)
+    build_time: float = time.perf_counter() - started
+    results: List[str | None] = [index.best_match(query) for query in query_list]
+    index_time: float = time.perf_counter() - started
+
+    # Для опечаток (нечёткий поиск) результат обязан совпадать с прежним алгоритмом
+    fuzzy_mismatches: int = sum(1 for i in range(1, queries, 3) if legacy_results[i] != results[i])
+    mismatches: int = sum(1 for legacy, result in zip(legacy_results, results) if legacy != result)
+
+    print(f'Кандидатов: {candidates}, запросов: {queries}')
+    print(f'SequenceMatcher:  {legacy_time:8.3f} с ({legacy_time / queries * 1000:.2f} мс на запрос)')
+    print(f'NameIndex:        {index_time:8.3f} с ({index_time / queries * 1000:.2f} мс на запрос, '
+          f'построение индекса {build_time * 1000:.1f} мс)')
+    print(f'Ускорение:        {legacy_time / index_time:8.1f}x')
+    print(f'Расхождений с прежним алгоритмом: {mismatches} (из них в нечётком поиске: {fuzzy_mismatches})')
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Процентиль по ближайшему рангу.
+
+    :param values: Значения.
+    :param fraction: Доля от 0 до 1 (0.5 — медиана, 0.99 — 99-й процентиль).
+    :return: Процентиль или 0, если значений нет.
+    """
+    if not values:
+        return 0.0
+    ordered: List[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TimedWriter:
+    """
+    Обёртка над OutputWriter, которая считает записи и время вывода.
+
+    Attributes:
+    writer OutputWriter: Способы вывода.
+    records int: Количество выведенных записей.
+    busy_time float: Суммарное время вывода, секунды.
+    """
+
+    def __init__(self, writer: OutputWriter):
+        self.writer = writer
+        self.records = 0
+        self.busy_time = 0.0
+
+    def write(self, records: List[dict], task: List[str] = None) -> None:
+        started: float = time.perf_counter()
+        self.writer.write(records, task)
+        self.busy_time += time.perf_counter() - started
+        self.records += len(records)
+
+    def close(self) -> None:
+        started: float = time.perf_counter()
+        self.writer.close()
+        self.busy_time += time.perf_counter() - started
+
+
+def benchmark_load(arguments: argparse.Namespace) -> None:
+    """
+    Нагрузочный бенчмарк: настоящий поиск адресов (main.search_objects или main.search_objects_batched)
+    против локального заменителя сервера ФИАС с заданной задержкой, долей ошибок и ограничением частоты.
+    Выводит пропускную способность, p50/p99 времени ответа GetAddressItems по уровням, ответы сервера,
+    стоимость вывода и пик памяти (tracemalloc).
+
+    Кэш ответов, локальный индекс ГАР и журнал не используются, токен хранится только в памяти,
+    результат записывается во временную папку. Ограничитель частоты и адаптивный лимит запросов клиента
+    по умолчанию отключены, чтобы измерялся сам парсер, а не настройки settings (--client-limits их оставляет).
+    Сервер работает в том же процессе, поэтому сравнивать имеет смысл запуски с одинаковыми параметрами сервера.
+
+    :param arguments: Аргументы командной строки подкоманды load.
+    :return: None
+    """
+    if arguments.recorded and not arguments.tasks_file:
+        raise SystemExit('--recorded requires --tasks-file: tasks cannot be generated from recorded responses')
+    hierarchy: SyntheticHierarchy | RecordedHierarchy = RecordedHierarchy(arguments.recorded) if arguments.recorded \
+        else SyntheticHierarchy(*arguments.size, seed=arguments.seed)
+    tasks: List[Task] = list(parser_main.read_tasks(arguments.tasks_file) or []) if arguments.tasks_file \
+        else [Task(task) for task in hierarchy.sample_tasks(arguments.tasks, arguments.seed)]
+
+    # Время ответа GetAddressItems (включая кэш и повторы) по уровню: количеству ID в path
+    latencies: Dict[int, List[float]] = collections.defaultdict(list)
+    get_address_items = search_response.get_address_items
+
+    def timed_get_address_items(context, path: str = None) -> dict:
+        started: float = time.perf_counter()
+        try:
+            return get_address_items(context, path)
+        finally:
+            latencies[len(path.split('.')) if path else 0].append(time.perf_counter() - started)
+
+    # Состояние, которое бенчмарк меняет и восстанавливает после запуска
+    urls: List[str] = [request_config.url for request_config in request_configs]
+    saved: dict = {name: getattr(RequestConfig, name) for name in
+                   ('token_manager', 'response_cache', 'local_resolver', 'cadastral_index', 'rate_limiter',
+                    'concurrency_controller')}
+    saved_writer = json_processing.output_writer
+
+    server: MockFiasServer = MockFiasServer(hierarchy, latency=arguments.latency, jitter=arguments.jitter,
+                                            latency_per_item=arguments.latency_per_item,
+                                            error_rate=arguments.error_rate, rate_limit=arguments.rate_limit,
+                                            seed=arguments.seed)
+    with server, tempfile.TemporaryDirectory() as output_path:
+        use_base_url(server.url)
+        RequestConfig.token_manager = TokenManager(parser_main.fetch_token)
+        RequestConfig.response_cache = RequestConfig.local_resolver = RequestConfig.cadastral_index = None
+        if not arguments.client_limits:
+            RequestConfig.rate_limiter = RequestConfig.concurrency_controller = None
+        writer: TimedWriter = TimedWriter(OutputWriter.create(arguments.sinks, output_path))
+        json_processing.output_writer = writer
+        search_response.get_address_items = timed_get_address_items
+        try:
+            session = parser_main.get_session(arguments.workers, '')
+            if arguments.memory:
+                tracemalloc.start()
+            started: float = time.perf_counter()
+            parser_main.get_token(session)
+            if arguments.trie:
+                parser_main.search_objects_batched(session, tasks, arguments.workers)
+            else:
+                parser_main.search_objects(session, tasks, arguments.workers)
+            writer.close()
+            elapsed: float = time.perf_counter() - started
+            memory_peak: int = tracemalloc.get_traced_memory()[1] if arguments.memory else 0
+        finally:
+            tracemalloc.stop()
+            del search_response.get_address_items
+            json_processing.output_writer = saved_writer
+            for name, value in saved.items():
+                setattr(RequestConfig, name, value)
+            for request_config, url in zip(request_configs, urls):
+                request_config.url = url
+
+    requests_count: int = sum(len(values) for values in latencies.values())
+    print(f'Задач: {len(tasks)}, потоков: {arguments.workers}, префиксное дерево: {"да" if arguments.trie else "нет"}')
+    print(f'Сервер: задержка {arguments.latency * 1000:.0f} мс + до {arguments.jitter * 1000:.0f} мс, '
+          f'ошибок {arguments.error_rate:.0%}, лимит {arguments.rate_limit or "нет"} запросов/с')
+    print(f'Время:            {elapsed:8.3f} с ({len(tasks) / elapsed:.1f} задач/с, '
+          f'{requests_count / elapsed:.1f} запросов GetAddressItems/с)')
+    for level in sorted(latencies):
+        values: List[float] = latencies[level]
+        print(f'Уровень {level:2d}:       {len(values):6d} запросов, p50 {percentile(values, 0.5) * 1000:7.1f} мс, '
+              f'p99 {percentile(values, 0.99) * 1000:7.1f} мс')
+    print('Ответы сервера:   ' + ', '.join(f'{endpoint} {status}: {count}'
+                                           for (endpoint, status), count in sorted(server.counts.items())))
+    print(f'Вывод ({",".join(arguments.sinks)}): {writer.records} записей, {writer.busy_time:.3f} с '
+          f'({writer.busy_time / elapsed:.1%} времени)')
+    if arguments.memory:
+        print(f'Пик памяти:       {memory_peak / 1024 / 1024:8.1f} МБ (tracemalloc, замедляет запуск)')
+
+
+def benchmark_output(records_count: int, sinks: List[str], seed: int = 1) -> None:
+    """
+    Стоимость разбора и вывода результата: извлечение записей (extract_address_records) из ответов домов
+    синтетической иерархии и запись их в каждый способ вывода отдельно.
+
+    :param records_count: Количество записей (помещений).
+    :param sinks: Способы вывода.
+    :param seed: Начальное значение генератора названий.
+    :return: None
+    """
+    hierarchy: SyntheticHierarchy = SyntheticHierarchy(regions=9, cities=9, streets=99, houses=99, premises=100,
+                                                       seed=seed)
+    responses: List[dict] = []
+    premises: int = 0
+    for region, city, street, house in itertools.product(*(range(1, count + 1) for count in hierarchy.counts[:4])):
+        if premises >= records_count:
+            break
+        path: str = '.'.join(str(object_id) for object_id in itertools.accumulate(
+            (region, city, street, house), lambda parent, number: parent * ID_BASE + number))
+        responses.append(hierarchy.get_address_items({"path": path}))
+        premises += len(responses[-1]["addresses"])
+
+    started: float = time.perf_counter()
+    results: List[List[dict]] = [extract_address_records(response) for response in responses]
+    extract_time: float = time.perf_counter() - started
+    records: int = sum(len(result) for result in results)
+    print(f'Домов: {len(responses)}, записей: {records}')
+    print(f'Извлечение:       {extract_time:8.3f} с ({records / extract_time:.0f} записей/с)')
+
+    for name in sinks:
+        with tempfile.TemporaryDirectory() as output_path:
+            writer: OutputWriter = OutputWriter.create([name], output_path)
+            started = time.perf_counter()
+            for index, result in enumerate(results):
+                writer.write(result, [f'дом {index}'])
+            writer.close()
+            sink_time: float = time.perf_counter() - started
+        print(f'{name + ":":18}{sink_time:8.3f} с ({records / sink_time:.0f} записей/с)')
+
+
+def run_process(command: List[str], cwd: str) -> Tuple[float, str]:
+    """
+    Запускает команду в новом процессе и измеряет время до её завершения.
+
+    :param command: Команда.
+    :param cwd: Рабочая папка процесса.
+    :return: Время выполнения, секунды, и стандартный вывод процесса.
+    :raises RuntimeError: Если команда завершилась с ошибкой.
+    """
+    started: float = time.perf_counter()
+    result: subprocess.CompletedProcess = subprocess.run(command, cwd=cwd, capture_output=True, text=True,
+                                                         stdin=subprocess.DEVNULL)
+    elapsed: float = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f'{" ".join(command)} failed with code {result.returncode}: {result.stderr[-2000:]}')
+    return elapsed, result.stdout
+
+
+def benchmark_startup(runs: int) -> None:
+    """
+    Время холодного запуска в новом процессе, как при запуске из планировщика или контейнера: запуск
+    интерпретатора, импорт main, python main.py --help и пакетный запуск (--batch) одной задачи без кэша
+    против локального заменителя сервера ФИАС. Для импорта main выводятся тяжёлые модули, которые он загрузил.
+
+    :param runs: Количество запусков каждой команды.
+    :return: None
+    """
+    package_dir: str = os.path.dirname(os.path.abspath(__file__))
+    script: str = os.path.join(package_dir, 'main.py')
+    import_code: str = (f'import sys, time; sys.path.insert(0, {package_dir!r}); started = time.perf_counter(); '
+                        f'import main; print(time.perf_counter() - started); '
+                        f'print(",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))')
+
+    hierarchy: SyntheticHierarchy = SyntheticHierarchy(regions=1, cities=1, streets=2, houses=2, premises=20)
+    with tempfile.TemporaryDirectory() as work_dir, MockFiasServer(hierarchy) as server:
+        tasks_file: str = os.path.join(work_dir, 'tasks.txt')
+        with open(tasks_file, 'w', encoding='utf-8') as file:
+            file.write(', '.join(hierarchy.sample_tasks(1)[0]) + '\n')
+
+        commands: Dict[str, List[str]] = {
+            'python -c pass': [sys.executable, '-c', 'pass'],
+            'import main': [sys.executable, '-c', import_code],
+            'main.py --help': [sys.executable, script, '--help'],
+            'main.py --batch': [sys.executable, script, '--batch', '--tasks', tasks_file, '--no-cache',
+                                '--no-local-index', '--output', 'csv', '--fias-url', server.url,
+                                '--log-level', 'WARNING'],
+        }
+        import_times: List[float] = []
+        heavy_modules: str = ''
+        for name, command in commands.items():
+            times: List[float] = []
+            for _ in range(runs):
+                elapsed, output = run_process(command, work_dir)
+                times.append(elapsed)
+                if name == 'import main':
+                    lines: List[str] = output.splitlines()
+                    import_times.append(float(lines[0]))
+                    heavy_modules = lines[1] if len(lines) > 1 else ''
+            print(f'{name + ":":18}min {min(times):.3f} с, p50 {percentile(times, 0.5):.3f} с')
+
+    print(f'Импорт main:      min {min(import_times):.3f} с, p50 {percentile(import_times, 0.5):.3f} с')
+    print(f'Тяжёлые модули, загруженные импортом main: {heavy_modules or "нет"}')
+
+
+def split_ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def split_names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def main() -> None:
+    """ Разбирает аргументы командной строки и запускает выбранный бенчмарк.
+
+    :return: None
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Бенчмарки парсера ФИАС')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    matching_parser = subparsers.add_parser('matching', help='поиск объекта по названию')
+    matching_parser.add_argument('--candidates', type=int, default=5000)
+    matching_parser.add_argument('--queries', type=int, default=200)
+
+    load_parser = subparsers.add_parser('load', help='нагрузочный бенчмарк поиска против mock_fias.py')
+    load_parser.add_argument('--tasks', type=int, default=200, help='количество сгенерированных задач')
+    load_parser.add_argument('--tasks-file', help='файл задач вместо сгенерированных (txt, csv или jsonl)')
+    load_parser.add_argument('--recorded', metavar='CACHE',
+                             help='отвечать записанными ответами из кэша ответов (нужен --tasks-file)')
+    load_parser.add_argument('--size', type=split_ints, default=[2, 3, 50, 20, 40],
+                             help='синтетическая иерархия: регионов, городов, улиц, домов, помещений через запятую')
+    load_parser.add_argument('--workers', type=int, default=8)
+    load_parser.add_argument('--trie', action='store_true', help='пакетный поиск через префиксное дерево')
+    load_parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа сервера, секунды')
+    load_parser.add_argument('--jitter', type=float, default=0.01, help='случайная добавка к задержке, секунды')
+    load_parser.add_argument('--latency-per-item', type=float, default=0.0,
+                             help='добавка к задержке на каждый объект ответа, секунды')
+    load_parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 503')
+    load_parser.add_argument('--rate-limit', type=float, default=0, help='лимит сервера, запросов в секунду')
+    load_parser.add_argument('--client-limits', action='store_true',
+                             help='оставить ограничитель частоты и адаптивный лимит запросов из settings')
+    load_parser.add_argument('--sinks', type=split_names, default=['csv'], help='способы вывода через запятую')
+    load_parser.add_argument('--no-memory', dest='memory', action='store_false',
+                             help='не измерять пик памяти (tracemalloc замедляет запуск)')
+    load_parser.add_argument('--seed', type=int, default=1)
+
+    output_parser = subparsers.add_parser('output', help='извлечение записей и способы вывода')
+    output_parser.add_argument('--records', type=int, default=100000)
+    output_parser.add_argument('--sinks', type=split_names, default=['csv', 'jsonl', 'sqlite'])
+
+    startup_parser = subparsers.add_parser('startup', help='время холодного запуска в новом процессе')
+    startup_parser.add_argument('--runs', type=int, default=10)
+
+    parser.add_argument('--log-level', default='WARNING', help='уровень логирования парсера во время бенчмарка')
+
+    arguments: argparse.Namespace = parser.parse_args()
+    logging.getLogger().setLevel(arguments.log_level)
+    if arguments.benchmark == 'matching':
+        benchmark_matching(arguments.candidates, arguments.queries)
+    elif arguments.benchmark == 'load':
+        benchmark_load(arguments)
+    elif arguments.benchmark == 'output':
+        benchmark_output(arguments.records, arguments.sinks)
+    elif arguments.benchmark == 'startup':
+        benchmark_startup(arguments.runs)
+
+
+if __name__ == '__main__':
+    main()
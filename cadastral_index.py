@@ -0,0 +1,242 @@
+"""
+Обратный индекс: кадастровый номер -> object_id, path и адрес объекта.
+
+Индекс пополняется каждым ответом GetAddressItems, полученным во время поиска (RequestConfig.cadastral_index).
+Уже накопленные ответы можно загрузить из кэша ответов и из локального индекса ГАР:
+
+    python cadastral_index.py --cache cache/responses.sqlite3 --gar cache/gar.sqlite3
+
+Поиск адресов по кадастровым номерам: python main.py --lookup-cadastral numbers.txt
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from json_processing import json_loads
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк вставляется в базу за один раз при загрузке из кэша и индекса ГАР
+BATCH_SIZE = 10000
+
+
+def normalize_cadastral_number(number: str) -> str:
+    """
+    Приводит кадастровый номер к виду, в котором он хранится в индексе: без пробелов по краям и внутри.
+
+    :param number: Кадастровый номер.
+    :type number: str
+    :rtype: str
+    """
+    return ''.join(str(number).split())
+
+
+def make_row(address: dict) -> Tuple[str, int, str, str, str] | None:
+    """
+    Превращает адрес из ответа GetAddressItems в строку индекса.
+
+    :param address: Адрес из массива addresses ответа.
+    :type address: dict
+    :return: (кадастровый номер, object_id, path, адрес, тип) или None, если у объекта нет кадастрового номера.
+    :rtype: Optional[Tuple[str, int, str, str, str]]
+    """
+    number: str = normalize_cadastral_number(address.get('address_details', {}).get('cadastral_number') or '')
+    hierarchy: List[dict] = address.get('hierarchy') or []
+    if not number or not hierarchy:
+        return None
+    path: str = '.'.join(str(item.get('object_id')) for item in hierarchy)
+    address_str: str = ', '.join(item.get('full_name_short') or item.get('full_name') or '' for item in hierarchy)
+    return number, hierarchy[-1].get('object_id'), path, address_str, hierarchy[-1].get('type_name')
+
+
+class CadastralIndex:
+    """
+    Постоянный индекс кадастровых номеров в базе SQLite.
+
+    Methods:
+        add_addresses(addresses: Iterable[dict]) -> int:
+        Добавляет в индекс объекты ответа GetAddressItems.
+
+        lookup(numbers: Iterable[str]) -> Dict[str, dict]:
+        Находит объекты по кадастровым номерам.
+
+        import_response_cache(cache_path: str) -> int:
+        Загружает объекты из всех ответов в кэше ответов.
+
+        import_gar_index(gar_path: str) -> int:
+        Загружает объекты из локального индекса ГАР.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Открывает (или создаёт) базу индекса.
+
+        :param db_path: Путь к файлу базы SQLite.
+        :type db_path: str
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # Соединение используется из нескольких потоков, доступ к нему защищён блокировкой
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cadastral ('
+            'cadastral_number TEXT PRIMARY KEY, object_id INTEGER, path TEXT, address TEXT, type TEXT, '
+            'updated_at REAL)'
+        )
+        self._connection.commit()
+
+    def _insert(self, rows: List[tuple]) -> None:
+        now: float = time.time()
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO cadastral (cadastral_number, object_id, path, address, type, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', [(*row, now) for row in rows]
+            )
+            self._connection.commit()
+
+    def add_addresses(self, addresses: Iterable[dict]) -> int:
+        """
+        Добавляет в индекс объекты ответа GetAddressItems, у которых есть кадастровый номер.
+        Более свежие данные заменяют прежние.
+
+        :param addresses: Адреса из массива addresses ответа.
+        :type addresses: Iterable[dict]
+        :return: Количество добавленных объектов.
+        :rtype: int
+        """
+        rows: List[tuple] = [row for row in map(make_row, addresses) if row is not None]
+        if rows:
+            self._insert(rows)
+        return len(rows)
+
+    def lookup(self, numbers: Iterable[str]) -> Dict[str, dict]:
+        """
+        Находит объекты по кадастровым номерам.
+
+        :param numbers: Кадастровые номера.
+        :type numbers: Iterable[str]
+        :return: Найденные объекты по кадастровому номеру: object_id, path, адрес и тип.
+                 Номеров, которых нет в индексе, в результате нет.
+        :rtype: Dict[str, dict]
+        """
+        found: Dict[str, dict] = {}
+        numbers = list(dict.fromkeys(normalize_cadastral_number(number) for number in numbers))
+        with self._lock:
+            # SQLite ограничивает количество параметров запроса, поэтому номера ищутся частями
+            for start in range(0, len(numbers), 500):
+                part: List[str] = numbers[start:start + 500]
+                for number, object_id, path, address, type_name in self._connection.execute(
+                        f'SELECT cadastral_number, object_id, path, address, type FROM cadastral '
+                        f'WHERE cadastral_number IN ({",".join("?" * len(part))})', part):
+                    found[number] = {"object_id": object_id, "path": path, "address": address, "type": type_name}
+        return found
+
+    def import_response_cache(self, cache_path: str) -> int:
+        """
+        Загружает объекты из всех ответов, сохранённых в кэше ответов (response_cache.py).
+
+        :param cache_path: Путь к базе кэша ответов.
+        :type cache_path: str
+        :return: Количество загруженных объектов.
+        :rtype: int
+        """
+        connection: sqlite3.Connection = sqlite3.connect(f'file:{cache_path}?mode=ro', uri=True)
+        count: int = 0
+        try:
+            for (body,) in connection.execute('SELECT body FROM responses'):
+                try:
+                    count += self.add_addresses(json_loads(body).get('addresses', []))
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f'Skipping cached response: {e}')
+        finally:
+            connection.close()
+        logger.info(f'Imported {count} cadastral numbers from response cache {cache_path}')
+        return count
+
+    def import_gar_index(self, gar_path: str) -> int:
+        """
+        Загружает объекты с кадастровыми номерами из локального индекса ГАР (gar_index.py).
+        Адрес собирается из названий объектов path, названия родительских объектов запоминаются.
+
+        :param gar_path: Путь к базе индекса ГАР.
+        :type gar_path: str
+        :return: Количество загруженных объектов.
+        :rtype: int
+        """
+        connection: sqlite3.Connection = sqlite3.connect(f'file:{gar_path}?mode=ro', uri=True)
+        names: Dict[int, str] = {}
+
+        def get_name(object_id: int) -> str:
+            if object_id not in names:
+                row = connection.execute('SELECT full_name_short FROM objects WHERE object_id = ?',
+                                         (object_id,)).fetchone()
+                names[object_id] = row[0] if row else ''
+            return names[object_id]
+
+        count: int = 0
+        rows: List[tuple] = []
+        try:
+            for number, object_id, path, type_name in connection.execute(
+                    'SELECT c.cadastral_number, c.object_id, h.path, o.type_name FROM cadastral c '
+                    'JOIN hierarchy h ON h.object_id = c.object_id JOIN objects o ON o.object_id = c.object_id'):
+                number = normalize_cadastral_number(number or '')
+                if not number or not path:
+                    continue
+                address: str = ', '.join(get_name(int(item)) for item in path.split('.'))
+                rows.append((number, object_id, path, address, type_name))
+                if len(rows) >= BATCH_SIZE:
+                    self._insert(rows)
+                    count += len(rows)
+                    rows = []
+            if rows:
+                self._insert(rows)
+                count += len(rows)
+        finally:
+            connection.close()
+        logger.info(f'Imported {count} cadastral numbers from GAR index {gar_path}')
+        return count
+
+    def close(self) -> None:
+        """
+        Закрывает базу индекса.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+
+    :return: Аргументы командной строки.
+    :rtype: argparse.Namespace
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Индекс кадастровых номеров')
+    parser.add_argument('--db', default=None, help='файл базы индекса (по умолчанию settings.cadastral_index_path)')
+    parser.add_argument('--cache', help='загрузить номера из кэша ответов, например cache/responses.sqlite3')
+    parser.add_argument('--gar', help='загрузить номера из локального индекса ГАР, например cache/gar.sqlite3')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from settings import cadastral_index_path
+
+    logging.basicConfig(format='%(asctime)s | %(levelname)s | %(message)s', datefmt='%d-%m-%Y %H:%M:%S',
+                        level=logging.INFO)
+    arguments: argparse.Namespace = parse_args()
+    index: CadastralIndex = CadastralIndex(arguments.db or cadastral_index_path)
+    if arguments.cache:
+        index.import_response_cache(arguments.cache)
+    if arguments.gar:
+        index.import_gar_index(arguments.gar)
+    index.close()
@@ -1,29 +1,153 @@
-import json
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Tuple
 
 
+import copy
 import requests
 import logging
-
-from json_processing import get_object_id_by_name, parse_json_to_dataframe, create_search_result_table
+import time
+
+from json_stream import iter_addresses
+from metrics import get_endpoint, get_level, get_response_size, registry
+from response_cache import ResponseCache
+from rate_limiter import ConcurrencyController, TokenBucket
+from retry import RetryBudget, RetryPolicy
+from settings import stream_final_level, request_timeout, retry_policies, retry_backoff_base, retry_backoff_max, \
+    retry_after_max, retry_budget_ratio, rate_limit_per_second, rate_limit_burst, adaptive_concurrency, \
+    concurrency_initial, concurrency_min, concurrency_max, concurrency_latency_target, beam_width, beam_margin
+from json_processing import can_stream_output, extract_address_records, get_object_candidates, \
+    get_object_id_by_name, json_loads, save_search_result
 
 logger = logging.getLogger(__name__)
 
+# Уровни объектов, которые запрашиваются у GetAddressItems при спуске по иерархии
+ADDRESS_LEVELS = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 17]
+
+# Размер фрагмента при потоковом чтении ответа
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def rank_beam_candidates(beam: List[Tuple[float, str, dict]], item: str, level: int) -> List[Tuple[float, str]]:
+    """
+    Шаг поиска по нескольким путям: для каждого пути берёт до beam_width кандидатов элемента адреса item
+    и оставляет beam_width путей с наибольшей суммой степеней совпадения.
+
+    :param beam: Пути поиска: (сумма степеней совпадения, path, ответ со списком дочерних объектов).
+    :type beam: List[Tuple[float, str, dict]]
+    :param item: Элемент адреса.
+    :type item: str
+    :param level: Уровень (индекс в массиве hierarchy).
+    :type level: int
+    :return: Новые пути: (сумма степеней совпадения, path) по убыванию суммы.
+    :rtype: List[Tuple[float, str]]
+    :raises LookupError: Если элемент адреса не найден ни на одном из путей.
+    """
+    candidates: List[Tuple[float, str]] = []
+    for score, path, data in beam:
+        for object_id, match_ratio in get_object_candidates(data, item, level, beam_width, beam_margin,
+                                                             RequestConfig.match_min_ratio, path or None):
+            candidates.append((score + match_ratio, f'{path}.{object_id}' if path else f'{object_id}'))
+    if not candidates:
+        raise LookupError(f'Address element {item} not found on level {level}')
+
+    # Сортировка устойчивая: при равной сумме выигрывает путь, найденный раньше
+    candidates.sort(key=lambda candidate: -candidate[0])
+    candidates = candidates[:beam_width]
+    if len(candidates) > 1:
+        logger.info('Ambiguous %s on level %d, candidates: %s', item, level, candidates)
+    return candidates
+
+
+class SearchContext:
+    """
+    Контекст выполнения одной задачи (поиска одного адреса).
+
+    Хранит состояние, которое меняется в процессе поиска: адрес, найденный path, данные и заголовки текущего
+    запроса. Благодаря этому один и тот же объект RequestConfig может одновременно выполняться в нескольких
+    потоках, и потоки не перезаписывают состояние друг друга.
+
+    Attributes:
+    address List[str]: Адрес, разбитый на элементы.
+    path str: Строка из ID найденных объектов, разделённых точкой.
+    data dict: Данные текущего POST-запроса.
+    headers dict: Заголовки текущего запроса.
+    session requests.Session: Сессия, через которую выполняется задача.
+    token str: Токен, полученный запросом get_token_response.
+    result dict: Результат поиска (JSON последнего уровня).
+    records List[dict]: Записи результата, если ответ последнего уровня читался потоково и вывод отложен.
+    defer_output bool: Если True, search_loop не выводит результат, а только сохраняет его в контексте
+                       (вывод выполняет следующая стадия конвейера main.search_objects_pipelined).
+    """
+
+    def __init__(self, address: List[str] = None):
+        """
+        Инициализирует контекст задачи.
+
+        :param address: Адрес, разбитый на элементы. Для запросов без поиска (получение токена) может быть None.
+        :type address: Optional[List[str]]
+        """
+
+        # Адрес, разбитый на элементы (город, район, улица, дом, квартира)
+        self.address = address
+
+        # Строка состоящая из ID объектов.
+        # Пример: 807356.96228493.862378.864576.10847998.159610445
+        self.path = None
+
+        # Данные текущего POST-запроса, заполняются в RequestConfig.execute
+        self.data = None
+
+        # Заголовки текущего запроса, заполняются в RequestConfig.execute
+        self.headers = {}
+
+        # Сессия, используемая для выполнения запросов задачи (requests.Session)
+        self.session = None
+
+        # Токен, заполняется в get_token
+        self.token = None
+
+        # Результат поиска, заполняется в search_loop
+        self.result = None
+
+        # Записи результата при потоковом чтении последнего уровня с отложенным выводом
+        self.records = None
+
+        # Отложенный вывод результата (конвейер)
+        self.defer_output = False
+
 
 class RequestConfig:
     """
     Класс для конфигурирования и выполнения HTTP-запросов.
 
     Attributes:
-    address List[str]: Адрес, разбитый на элементы.
-    token str: Токен для аутентификации на сервере ФИАС.
+    token_manager TokenManager: Менеджер токена для аутентификации на сервере ФИАС.
+    response_cache ResponseCache: Постоянный кэш ответов GetAddressItems. Если None, кэш не используется.
+    retry_policy RetryPolicy: Политика повторов запросов при временных ошибках. Если None, запросы не повторяются.
+    rate_limiter TokenBucket: Ограничитель частоты запросов. Если None, частота не ограничивается.
+    concurrency_controller ConcurrencyController: Адаптивный лимит одновременных запросов (AIMD).
+    proxy_pool ProxyPool: Пул прокси. Если задан, каждая задача выполняется через выбранный пулом прокси
+                          с его собственными сессией, токеном, ограничителем частоты и лимитом запросов.
+    local_resolver LocalResolver: Локальный индекс ГАР (gar_index.py). Если задан, запросы GetAddressItems
+                                  сначала выполняются по нему, а HTTP используется, только если объекта нет в индексе.
+    cadastral_index CadastralIndex: Индекс кадастровых номеров. Если задан, в него записываются объекты
+                                    из каждого ответа GetAddressItems, полученного от сервера.
 
     Methods:
-        execute(session: requests.Session) -> requests.Response:
+        execute(session: requests.Session, context: SearchContext) -> requests.Response:
         Выполняет запрос на основе конфигурации объекта RequestConfig, используя указанную сессию
     """
-    address = None  # Заполняется в main
-    token = None  # Заполняется в get_token
+    token_manager = None  # Заполняется в main.get_token
+    response_cache = None  # Заполняется в main, если кэш не отключён
+    retry_policy = RetryPolicy(retry_policies, retry_backoff_base, retry_backoff_max, retry_after_max,
+                               RetryBudget(retry_budget_ratio))
+    rate_limiter = TokenBucket(rate_limit_per_second, rate_limit_burst) if rate_limit_per_second else None
+    concurrency_controller = ConcurrencyController(concurrency_initial, concurrency_min, concurrency_max,
+                                                   concurrency_latency_target) if adaptive_concurrency else None
+    proxy_pool = None  # Заполняется в main, если в credentials задан список прокси
+    local_resolver = None  # Заполняется в main, если построен локальный индекс ГАР
+    cadastral_index = None  # Заполняется в main, если индекс кадастровых номеров не отключён
+    match_min_ratio = 0.0  # Задаётся в resolver_service: пакетный поиск всегда выбирает лучший объект
 
     def __init__(self, url: str = None, method: str = 'GET', headers: dict = None, data: dict = None,
                  use_proxies: bool = True,
@@ -57,10 +181,6 @@ class RequestConfig:
         # URL запроса
         self.url = url
 
-        # Строка состоящая из ID объектов.
-        # Пример: 807356.96228493.862378.864576.10847998.159610445
-        self.path = None
-
         # Метод (GET или POST)
         self.method = method
 
@@ -81,10 +201,166 @@ class RequestConfig:
         # Метод, который будет выполнен после получения ответа (может быть None)
         self.after_request_method = after_request_method
 
-        # Сессия, используемая для выполнения запроса, инициализируется позже (requests.Session)
-        self.session = None
+    @staticmethod
+    def select_session(session: requests.Session) -> requests.Session:
+        """
+        Выбирает сессию для задачи. Если задан RequestConfig.proxy_pool и сессия ещё не привязана к прокси,
+        возвращает сессию наименее нагруженного здорового прокси из пула, иначе — переданную сессию.
+
+        :param session: Активная сессия requests.Session.
+        :type session: requests.Session
+        :return: Сессия, через которую выполняется задача.
+        :rtype: requests.Session
+        """
+        if RequestConfig.proxy_pool is None or getattr(session, 'proxy_endpoint', None) is not None:
+            return session
+        return RequestConfig.proxy_pool.acquire().session
+
+    @staticmethod
+    def get_token_manager(session: requests.Session):
+        """
+        Возвращает менеджер токена для сессии: у сессий прокси из пула свой токен,
+        для остальных используется RequestConfig.token_manager.
+
+        :param session: Активная сессия requests.Session.
+        :type session: requests.Session
+        :return: Менеджер токена или None.
+        :rtype: Optional[TokenManager]
+        """
+        return getattr(session, 'token_manager', None) or RequestConfig.token_manager
+
+    def send(self, session: requests.Session, method: str, headers: dict, data: dict = None,
+             **kwargs) -> requests.Response:
+        """
+        Отправляет один HTTP-запрос на self.url. Если задан RequestConfig.retry_policy, при временных ошибках
+        (429, 5xx, таймауты, ошибки соединения) повторяется только этот запрос, а не весь поиск.
+        Перед каждой попыткой запрос ждёт ограничитель частоты и адаптивный лимит одновременных запросов:
+        прокси из пула, если сессия принадлежит ему, иначе RequestConfig.rate_limiter и
+        RequestConfig.concurrency_controller. Для прокси из пула также учитываются время ответа и ошибки,
+        а если прокси исключён из пула, повтор выполняется через другой прокси.
+        Если сервер отклонил заголовок "master-token" (401/403), токен обновляется через менеджер токена сессии,
+        заголовок заменяется новым токеном и запрос повторяется.
+
+        :param session: Активная сессия requests.Session.
+        :type session: requests.Session
+        :param method: HTTP-метод ('GET' или 'POST').
+        :type method: str
+        :param headers: Заголовки запроса.
+        :type headers: dict
+        :param data: Данные для POST-запроса.
+        :type data: Optional[dict]
+        :param kwargs: Дополнительные параметры requests.Session.request (proxies, stream).
+        :return: Ответ сервера.
+        :rtype: requests.Response
+        """
+        endpoint = getattr(session, 'proxy_endpoint', None)
+        started: float = time.perf_counter()
+
+        def request() -> requests.Response:
+            nonlocal session, endpoint
+            # Если прокси исключён из пула после ошибок, повтор отправляется через другой прокси с его токеном
+            if endpoint is not None and not endpoint.is_available(time.monotonic()):
+                replacement = RequestConfig.proxy_pool.acquire()
+                if replacement is not endpoint:
+                    logger.warning(f'Switching request from proxy {endpoint.name} to {replacement.name}')
+                    endpoint, session = replacement, replacement.session
+                    if 'proxies' in kwargs:
+                        kwargs['proxies'] = session.proxies
+                    if headers.get('master-token'):
+                        headers['master-token'] = replacement.token_manager.get(session)
+
+            rate_limiter: TokenBucket | None = endpoint.rate_limiter if endpoint else RequestConfig.rate_limiter
+            controller: ConcurrencyController | None = endpoint.concurrency_controller if endpoint \
+                else RequestConfig.concurrency_controller
+
+            # Каждая попытка проходит через ограничитель частоты и адаптивный лимит одновременных запросов
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            if controller is None and endpoint is None:
+                return session.request(method, self.url, headers=headers, json=data, timeout=request_timeout,
+                                       **kwargs)
+
+            if controller is not None:
+                controller.acquire()
+            if endpoint is not None:
+                endpoint.start()
+            started: float = time.monotonic()
+            overloaded: bool = True
+            try:
+                response: requests.Response = session.request(method, self.url, headers=headers, json=data,
+                                                              timeout=request_timeout, **kwargs)
+                overloaded = response.status_code == 429 or response.status_code >= 500
+                if endpoint is not None:
+                    # 407 — прокси отклонил авторизацию, прокси считается неисправным
+                    endpoint.finish(overloaded or response.status_code == 407, time.monotonic() - started)
+                return response
+            except requests.exceptions.RequestException as e:
+                # Таймауты и обрывы соединения считаются признаком перегрузки, остальные ошибки — нет
+                overloaded = isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+                if endpoint is not None:
+                    endpoint.finish(overloaded, time.monotonic() - started)
+                raise
+            finally:
+                if controller is not None:
+                    controller.release(overloaded, time.monotonic() - started)
+
+        def request_with_retries() -> requests.Response:
+            if RequestConfig.retry_policy is None:
+                return request()
+            return RequestConfig.retry_policy.send(request, f'{method} {self.url}')
+
+        response: requests.Response = request_with_retries()
+
+        # Если сервер отклонил токен, токен обновляется (один раз на все потоки) и запрос повторяется
+        token: str | None = headers.get('master-token')
+        token_manager = self.get_token_manager(session)
+        if response.status_code in (401, 403) and token and token_manager is not None:
+            response.close()
+            registry.increment('token_rejections_total')
+            token_manager.invalidate(token)
+            headers['master-token'] = token_manager.get(session)
+            response = request_with_retries()
+
+        # Время запроса с учётом повторов и ожидания ограничителей, код ответа и объём полученных данных
+        name: str = get_endpoint(self.url)
+        registry.observe_since('request_seconds', started, endpoint=name)
+        registry.increment('responses_total', endpoint=name, status=response.status_code)
+        registry.increment('response_bytes_total', get_response_size(response, kwargs.get('stream', False)),
+                           endpoint=name)
+        return response
+
+    def prepare_context(self, session: requests.Session, context: SearchContext = None) -> SearchContext:
+        """
+        Подготавливает контекст задачи к выполнению запроса: сохраняет сессию, копирует заголовки и данные
+        из конфигурации и вызывает before_request_method.
 
-    def execute(self, session: requests.Session) -> requests.Response:
+        :param session: Активная сессия requests.Session для выполнения запроса.
+        :type session: requests.Session
+        :param context: Контекст задачи. Если не передан, создаётся пустой контекст.
+        :type context: Optional[SearchContext]
+        :return: Подготовленный контекст задачи.
+        :rtype: SearchContext
+        """
+        if context is None:
+            context = SearchContext()
+
+        # Сохраняет текущую сессию и копии заголовков и данных в контексте задачи,
+        # чтобы методы до и после запроса не изменяли общую конфигурацию.
+        # Если используется пул прокси, задача получает сессию выбранного прокси.
+        context.session = self.select_session(session) if self.use_proxies else session
+        context.headers = dict(self.headers)
+        context.data = dict(self.data) if self.data is not None else None
+
+        if self.before_request_method:
+            # Если указан метод, который должен выполняться перед запросом,
+            # получает ссылку на этот метод и вызывает его, если он существует и может быть вызван.
+            method_to_call: Callable = getattr(self, self.before_request_method, None)
+            if callable(method_to_call):
+                method_to_call(context)  # Вызывает метод для подготовки данных перед выполнением запроса
+
+        return context
+
+    def execute(self, session: requests.Session, context: SearchContext = None) -> requests.Response:
         """
         Выполняет запрос, используя requests.Session и конфигурацию объекта RequestConfig.
 
@@ -92,24 +368,23 @@ class RequestConfig:
         он будет выполнен перед отправкой запроса. Аналогично, after_request_method выполняется
         после получения ответа, и, если он возвращает новый ответ, то этот новый ответ будет возвращён.
 
+        Объект RequestConfig не хранит состояние конкретного запроса: заголовки, данные и результаты поиска
+        записываются в context, поэтому один объект можно выполнять параллельно из нескольких потоков.
+
         :param session: Активная сессия requests.Session для выполнения запроса.
         :type session: requests.Session
+        :param context: Контекст задачи. Если не передан, создаётся пустой контекст.
+        :type context: Optional[SearchContext]
         :return: Ответ от сервера в виде объекта requests.Response. Если метод after_request_method возвращает
                  новый response, то именно он будет возвращён.
         :rtype: requests.Response
         :raises ValueError: Если указан неподдерживаемый HTTP-метод (не GET и не POST).
         """
 
-        logger.info(f'Executing {self.method} request to {self.url}')
+        logger.debug('Executing %s request to %s', self.method, self.url)
 
-        self.session: requests.Session = session  # Сохраняет текущую сессию для использования в других методах
-
-        if self.before_request_method:
-            # Если указан метод, который должен выполняться перед запросом,
-            # получает ссылку на этот метод и вызывает его, если он существует и может быть вызван.
-            method_to_call: Callable = getattr(self, self.before_request_method, None)
-            if callable(method_to_call):
-                method_to_call()  # Вызывает метод для подготовки данных перед выполнением запроса
+        context: SearchContext = self.prepare_context(session, context)
+        session = context.session
 
         proxies: dict = session.proxies if self.use_proxies else {"http": "", "https": ""}
         # Если флаг self.use_proxies True (по умолчанию), используется прокси из сессии.
@@ -117,10 +392,10 @@ class RequestConfig:
 
         if self.method.upper() == 'GET':
             # Выполняет GET запрос с указанными параметрами.
-            response: requests.Response = session.get(self.url, headers=self.headers, proxies=proxies)
+            response: requests.Response = self.send(session, 'GET', context.headers, proxies=proxies)
         elif self.method.upper() == 'POST':
             # Выполняет POST запрос с указанными параметрами и данными.
-            response: requests.Response = session.post(self.url, headers=self.headers, json=self.data, proxies=proxies)
+            response: requests.Response = self.send(session, 'POST', context.headers, context.data, proxies=proxies)
         else:
             # Выбрасывает исключение, если метод не поддерживается.
             raise ValueError(f"Unsupported method: {self.method}")
@@ -129,70 +404,258 @@ class RequestConfig:
             # Если указан метод для обработки ответа, вызывает его.
             method_to_call: Callable = getattr(self, self.after_request_method, None)
             if callable(method_to_call):
-                new_response = method_to_call(response)
+                new_response = method_to_call(response, context)
                 # Если метод возвращает новый ответ, то возвращает его.
                 if new_response:
-                    logger.info(f'Received new response from after request method: {self.after_request_method}')
+                    logger.debug('Received new response from after request method: %s', self.after_request_method)
                     return new_response
         return response
 
     @staticmethod
-    def get_token(response: requests.Response) -> None:
+    def get_token(response: requests.Response, context: SearchContext) -> None:
         """
-        Парсит JSON-ответ и сохраняет в RequestConfig.token.
+        Парсит JSON-ответ и сохраняет токен в context.token.
         Вызывается после выполнения запроса get_token_response.
 
         :param response: Ответ от сервера в виде объекта requests.Response
         :type response: requests.Response
+        :param context: Контекст, в который сохраняется токен.
+        :type context: SearchContext
         :return: None
         """
-        logger.info('Getting token from response')
+        logger.debug('Getting token from response')
         json_data: dict = response.json()
-        RequestConfig.token = json_data.get("Token")
+        context.token = json_data.get("Token")
 
-    def add_token_to_headers(self) -> None:
+    @staticmethod
+    def add_token_to_headers(context: SearchContext) -> None:
         """
-        Добавляет заголовок "master-token" со значением RequestConfig.token в текущие заголовки запроса.
+        Добавляет заголовок "master-token" с действующим токеном сессии задачи
+        (токен прокси из пула или RequestConfig.token_manager) в заголовки запроса задачи.
         Вызывается перед выполнением запроса search_response.
+
+        :param context: Контекст задачи.
+        :type context: SearchContext
         :return: None
         """
-        logger.info('Adding token to headers')
-        self.headers.update({"master-token": f"{RequestConfig.token}"})
-
-    def search_loop(self, response: requests.Response) -> None:
+        logger.debug('Adding token to headers')
+        token_manager = RequestConfig.get_token_manager(context.session)
+        context.headers.update({"master-token": f"{token_manager.get(context.session)}"})
 
-        logger.info('Starting search loop')
-        for level, item in enumerate(RequestConfig.address):
-            # Используя уровень и кусок адреса (город, район, улица, дом, квартира) ищем ID объекта
-            logger.info(f'Searching {item} on level {level}')
-
-            # Получаем ID объекта из get_object_id_by_name
-            new_path: str = get_object_id_by_name(response.text, item, level)
-
-            # Дополняем path найденным ранее ID
-            self.path: str | None = f"{self.path}.{new_path}" if self.path else new_path
-            logger.info(f'New path: {self.path}')
+    def get_address_items(self, context: SearchContext, path: str = None) -> dict:
+        """
+        Выполняет POST-запрос GetAddressItems и возвращает декодированный список дочерних объектов для path.
+        Если path не указан, отправляются исходные данные конфигурации (список объектов первого уровня).
+        Если задан RequestConfig.local_resolver, ответ сначала ищется в локальном индексе ГАР,
+        затем, если задан RequestConfig.response_cache, в кэше.
+
+        Каждый ответ декодируется ровно один раз, дальше используются только декодированные данные.
+
+        :param context: Подготовленный контекст задачи (сессия и заголовки с токеном).
+        :type context: SearchContext
+        :param path: Строка из ID объектов, разделённых точкой.
+        :type path: Optional[str]
+        :return: Декодированный ответ сервера.
+        :rtype: dict
+        :raises requests.exceptions.HTTPError: Если сервер вернул ошибку.
+        """
+        # Время ответа по уровню иерархии и источнику ответа (локальный индекс, кэш или сеть)
+        started: float = time.perf_counter()
+        level: int = get_level(path)
+
+        # Подставляем path в POST-запрос
+        context.data = {"address_levels": ADDRESS_LEVELS, "address_type": 2, "path": f"{path}"} if path \
+            else dict(self.data)
+        logger.debug('New data: %s', context.data)
+
+        # Если объект есть в локальном индексе ГАР, ни кэш, ни сеть не используются
+        if RequestConfig.local_resolver is not None:
+            local_data: dict | None = RequestConfig.local_resolver.get_address_items(context.data)
+            if local_data is not None:
+                registry.observe_since('address_items_seconds', started, level=level, source='local')
+                return local_data
+
+        # Если ответ на такой же запрос уже есть в кэше, сеть не используется
+        cache: ResponseCache | None = RequestConfig.response_cache
+        if cache is not None:
+            body: str | None = cache.get(self.url, context.data)
+            if body is not None:
+                response_data: dict = json_loads(body)
+                registry.observe_since('address_items_seconds', started, level=level, source='cache')
+                return response_data
+
+        response: requests.Response = self.send(context.session, 'POST', context.headers, context.data)
+        response.raise_for_status()
+
+        # В кэш попадают только успешные ответы
+        if cache is not None:
+            cache.put(self.url, context.data, response.text)
+
+        response_data: dict = json_loads(response.content)
+        if RequestConfig.cadastral_index is not None:
+            RequestConfig.cadastral_index.add_addresses(response_data.get('addresses', []))
+        registry.observe_since('address_items_seconds', started, level=level, source='network')
+        return response_data
+
+    def iter_address_items(self, context: SearchContext, path: str) -> Iterator[dict]:
+        """
+        Выполняет POST-запрос GetAddressItems в потоковом режиме и перебирает адреса ответа по мере получения.
+        Ответ не собирается целиком ни в строку, ни в словарь, поэтому память не зависит от размера дома.
+        Потоковые ответы не записываются в кэш, но если ответ уже есть в кэше, он берётся оттуда.
+
+        :param context: Подготовленный контекст задачи (сессия и заголовки с токеном).
+        :type context: SearchContext
+        :param path: Строка из ID объектов, разделённых точкой.
+        :type path: str
+        :return: Итератор по адресам ответа.
+        :rtype: Iterator[dict]
+        :raises requests.exceptions.HTTPError: Если сервер вернул ошибку.
+        """
+        context.data = {"address_levels": ADDRESS_LEVELS, "address_type": 2, "path": f"{path}"}
+        logger.debug('New data (streaming): %s', context.data)
+
+        if RequestConfig.local_resolver is not None:
+            local_data: dict | None = RequestConfig.local_resolver.get_address_items(context.data)
+            if local_data is not None:
+                yield from local_data['addresses']
+                return
+
+        cache: ResponseCache | None = RequestConfig.response_cache
+        if cache is not None:
+            body: str | None = cache.get(self.url, context.data)
+            if body is not None:
+                yield from json_loads(body).get('addresses', [])
+                return
+
+        with self.send(context.session, 'POST', context.headers, context.data, stream=True) as response:
+            response.raise_for_status()
+            if RequestConfig.cadastral_index is None:
+                yield from iter_addresses(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+                return
+
+            # Адреса записываются в индекс кадастровых номеров частями, чтобы не накапливать ответ в памяти
+            batch: List[dict] = []
+            for address in iter_addresses(response.iter_content(chunk_size=STREAM_CHUNK_SIZE)):
+                batch.append(address)
+                if len(batch) >= 1000:
+                    RequestConfig.cadastral_index.add_addresses(batch)
+                    batch = []
+                yield address
+            RequestConfig.cadastral_index.add_addresses(batch)
+
+    def beam_search(self, response_data: dict, context: SearchContext) -> None:
+        """
+        Ищет элементы адреса context.address по нескольким путям одновременно (beam search).
 
-            # Подставляем path в POST-запрос
-            self.data: dict = {"address_levels": [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 17], "address_type": 2,
-                         "path": f"{self.path}"}
-            logger.info(f'New data: {self.data}')
+        На каждом уровне для каждого пути берутся до beam_width кандидатов, степень совпадения которых
+        отличается от лучшей не больше чем на beam_margin. Из всех путей остаются beam_width путей с наибольшей
+        суммой степеней совпадения, и списки дочерних объектов для них запрашиваются параллельно. Так выбирается путь,
+        у которого лучше совпадают следующие уровни адреса, а время поиска почти не растёт.
+        Если на уровне кандидат один (обычный случай — точное совпадение), поиск идёт как в search_loop.
 
-            # Выполняем POST-запрос, чтобы получить список объектов для следующий итерации поиска
-            logger.info('Executing search request for level ' + str(level))
-            response: requests.Response = self.session.post(self.url, headers=self.headers, json=self.data)
+        Найденный path записывается в context.path. Список дочерних объектов последнего уровня не запрашивается.
 
-        # Сбрасываем path и data к значениям по умолчанию для следующего поиска
-        self.path, self.data = None, {"address_level": 1}
+        :param response_data: Декодированный ответ со списком объектов первого уровня.
+        :type response_data: dict
+        :param context: Подготовленный контекст задачи, содержащий адрес.
+        :type context: SearchContext
+        :return: None
+        :raises LookupError: Если элемент адреса не найден ни на одном из путей.
+        """
+        # Пути поиска: (сумма степеней совпадения, path, ответ со списком дочерних объектов)
+        beam: List[Tuple[float, str, dict]] = [(0.0, '', response_data)]
+        last_level: int = len(context.address) - 1
+
+        for level, item in enumerate(context.address):
+            candidates: List[Tuple[float, str]] = rank_beam_candidates(beam, item, level)
+            if level == last_level:
+                context.path = candidates[0][1]
+                break
+
+            if len(candidates) == 1:
+                score, path = candidates[0]
+                beam = [(score, path, self.get_address_items(context, path))]
+                continue
+
+            # Каждый кандидат получает свою копию контекста: get_address_items записывает в контекст данные запроса
+            def fetch(candidate_path: str) -> dict:
+                candidate_context: SearchContext = copy.copy(context)
+                candidate_context.headers = dict(context.headers)
+                return self.get_address_items(candidate_context, candidate_path)
+
+            with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+                responses: List[dict] = list(executor.map(fetch, [path for _, path in candidates]))
+            beam = [(score, path, data) for (score, path), data in zip(candidates, responses)]
+
+        logger.debug('New path: %s', context.path)
+
+    def search_loop(self, response: requests.Response, context: SearchContext) -> None:
+        """
+        Последовательно ищет элементы адреса context.address, спускаясь по иерархии ФИАС.
+        Вызывается после выполнения запроса search_response.
+
+        :param response: Ответ со списком объектов первого уровня. Если None, список запрашивается
+                         через get_address_items (в том числе из локального индекса ГАР).
+        :type response: Optional[requests.Response]
+        :param context: Контекст задачи, содержащий адрес. В него записываются path и результат поиска.
+        :type context: SearchContext
+        :return: None
+        """
 
-        # Парсим результат поиска
-        search_result_data: dict = json.loads(response.text)
+        logger.debug('Starting search loop')
+        started: float = time.perf_counter()
 
-        # Создаем dataframe с результатами поиска
-        parse_json_to_dataframe(search_result_data)
+        # Ответ каждого уровня декодируется один раз
+        response_data: dict = json_loads(response.content) if response is not None \
+            else self.get_address_items(context)
 
-        # Создаем таблицу с результатами для вывода на экран
-        create_search_result_table(search_result_data)
+        # Поиск по нескольким путям, если на каком-то уровне есть почти одинаково подходящие объекты
+        if beam_width > 1 and context.address:
+            self.beam_search(response_data, context)
+            if not stream_final_level:
+                response_data = self.get_address_items(context, context.path)
+        else:
+            for level, item in enumerate(context.address):
+                # Используя уровень и кусок адреса (город, район, улица, дом, квартира) ищем ID объекта
+                logger.info('Searching %s on level %d', item, level)
+
+                # Получаем ID объекта из get_object_id_by_name
+                new_path: str | None = get_object_id_by_name(response_data, item, level,
+                                                               RequestConfig.match_min_ratio, context.path)
+                if new_path is None:
+                    raise LookupError(f'Address element {item} not found on level {level}')
+
+                # Дополняем path найденным ранее ID
+                context.path = f"{context.path}.{new_path}" if context.path else new_path
+                logger.debug('New path: %s', context.path)
+
+                # Ответ последнего уровня в потоковом режиме не декодируется целиком, а сразу превращается в записи
+                if stream_final_level and level == len(context.address) - 1:
+                    break
+
+                # Выполняем POST-запрос, чтобы получить список объектов для следующий итерации поиска
+                logger.debug('Executing search request for level %d', level)
+                response_data = self.get_address_items(context, context.path)
+
+        if stream_final_level and context.address:
+            logger.debug('Executing streaming search request for the final level')
+            if context.defer_output and not can_stream_output():
+                # Ответ нельзя передать дальше, не прочитав его, поэтому записи извлекаются по мере чтения
+                context.records = extract_address_records(self.iter_address_items(context, context.path))
+            elif context.defer_output:
+                # Записи выводятся частями по мере чтения ответа, дальше по конвейеру передаётся пустой список
+                save_search_result(self.iter_address_items(context, context.path), task=context.address,
+                                   path=context.path)
+                context.records = []
+            else:
+                save_search_result(self.iter_address_items(context, context.path), task=context.address,
+                                   path=context.path)
+        else:
+            context.result = response_data
 
-        logger.info('Search loop finished')
+            # Извлекаем записи один раз и сохраняем их в Excel и таблицу для вывода на экран
+            if not context.defer_output:
+                save_search_result(response_data, task=context.address, path=context.path)
 
+        registry.observe_since('address_seconds', started)
+        logger.debug('Search loop finished')
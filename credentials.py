@@ -1 +1,5 @@
-proxy_url = '' # "логин:пароль@ip:port", пример: "user:pass@192.168.1.1:8080"
\ No newline at end of file
+proxy_url = '' # "логин:пароль@ip:port", пример: "user:pass@192.168.1.1:8080"
+
+# Список прокси в том же формате. Если список не пустой, запросы распределяются между прокси (proxy_pool.py),
+# у каждого прокси свои соединения и свой токен, а proxy_url не используется.
+proxy_urls = []
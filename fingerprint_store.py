@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Колонка вывода изменений с видом изменения
+CHANGE_COLUMN = 'Изменение'
+
+# Виды изменений помещений между запусками, значения колонки CHANGE_COLUMN
+ADDED = 'Добавлено'
+REMOVED = 'Удалено'
+CHANGED = 'Изменено'
+
+# Поле записи, по которому помещения сопоставляются между запусками. Строка адреса для этого не подходит:
+# у разных помещений она может совпадать
+RECORD_KEY = 'Кадастровый номер'
+
+
+def make_record_hash(record: dict) -> str:
+    """
+    Хэш содержимого записи об адресе.
+
+    :param record: Запись из json_processing.extract_address_records.
+    :type record: dict
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def key_records(records: List[dict]) -> Dict[str, dict]:
+    """
+    Записи дома по ключу помещения: кадастровому номеру, а у помещений без номера — адресу. Если ключ
+    повторяется (помещения без номера с одинаковым адресом), к нему добавляется порядковый номер.
+
+    :param records: Записи дома из json_processing.extract_address_records.
+    :type records: List[dict]
+    :rtype: Dict[str, dict]
+    """
+    keyed: Dict[str, dict] = {}
+    for record in records:
+        key: str = record.get(RECORD_KEY) or f'\0{record.get("Адрес", "")}'
+        unique_key: str = key
+        number: int = 1
+        while unique_key in keyed:
+            number += 1
+            unique_key = f'{key}\0{number}'
+        keyed[unique_key] = record
+    return keyed
+
+
+def make_fingerprint(hashes: Dict[str, str]) -> str:
+    """
+    Отпечаток результата дома: хэш отсортированных пар (помещение, хэш записи).
+    Не зависит от порядка помещений в ответе сервера.
+
+    :param hashes: Хэши записей по ключу помещения.
+    :type hashes: Dict[str, str]
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for key in sorted(hashes):
+        digest.update(f'{key}\0{hashes[key]}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FingerprintStore:
+    """
+    Хранилище отпечатков результатов по домам для инкрементального режима (ключ запуска --incremental).
+
+    Для каждого path дома хранится отпечаток списка помещений и хэш каждой записи. При следующем запуске
+    отпечаток сравнивается с сохранённым: если дом не изменился, его записи не выводятся повторно,
+    иначе вычисляются добавленные, удалённые и изменённые помещения.
+
+    Новое состояние дома сохраняется только после того, как его записи выведены (commit): если запуск
+    прервётся между сравнением и выводом, следующий запуск снова увидит изменения и выведет дом.
+
+    Methods:
+        compare(path: str, records: List[dict]) -> Dict[str, List[dict]] | None:
+        Сравнивает записи дома с прошлым запуском.
+
+        commit(path: str) -> None:
+        Сохраняет новое состояние дома после вывода его записей.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Открывает (или создаёт) базу отпечатков.
+
+        :param db_path: Путь к файлу базы SQLite.
+        :type db_path: str
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # Соединение используется из нескольких потоков, доступ к нему защищён блокировкой
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS houses (path TEXT PRIMARY KEY, fingerprint TEXT, premises INTEGER, '
+            'updated_at REAL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS premises (path TEXT, premise TEXT, record_hash TEXT, record TEXT, '
+            'PRIMARY KEY (path, premise))'
+        )
+        self._connection.commit()
+
+        # Изменившиеся дома, новое состояние которых ещё не сохранено: path -> (отпечаток, хэши, записи)
+        self._pending: Dict[str, Tuple[str, Dict[str, str], Dict[str, dict]]] = {}
+
+        # Дома текущего запуска: неизменившиеся и изменившиеся, новое состояние которых уже сохранено.
+        # Если к одному дому ведут несколько задач, изменения выводятся один раз
+        self._unchanged: Set[str] = set()
+        self._committed: Set[str] = set()
+        self.counts: Dict[str, int] = {'unchanged': 0, 'changed': 0}
+
+    def compare(self, path: str, records: List[dict]) -> Dict[str, List[dict]] | None:
+        """
+        Сравнивает записи дома с сохранёнными в прошлом запуске. Новое состояние запоминается и сохраняется
+        в базе вызовом commit после вывода записей.
+
+        :param path: Path дома (строка из ID объектов, разделённых точкой).
+        :type path: str
+        :param records: Записи дома из json_processing.extract_address_records.
+        :type records: List[dict]
+        :return: None, если дом не изменился, иначе изменения: {ADDED: [...], REMOVED: [...], CHANGED: [...]}.
+                 Для дома, которого ещё нет в хранилище, все помещения считаются добавленными.
+                 Если дом уже сравнивался в этом запуске и изменился, возвращаются пустые списки изменений:
+                 записи выводятся для каждой задачи, а изменения — один раз.
+        :rtype: Dict[str, List[dict]] | None
+        """
+        with self._lock:
+            if path in self._unchanged:
+                return None
+            if path in self._committed or path in self._pending:
+                return {ADDED: [], REMOVED: [], CHANGED: []}
+
+            current: Dict[str, dict] = key_records(records)
+            hashes: Dict[str, str] = {key: make_record_hash(record) for key, record in current.items()}
+            fingerprint: str = make_fingerprint(hashes)
+
+            # Быстрая проверка: совпадение отпечатка означает, что дом не изменился
+            row = self._connection.execute('SELECT fingerprint FROM houses WHERE path = ?', (path,)).fetchone()
+            if row is not None and row[0] == fingerprint:
+                self._unchanged.add(path)
+                self.counts['unchanged'] += 1
+                return None
+
+            stored: Dict[str, tuple] = {
+                premise: (record_hash, record) for premise, record_hash, record in self._connection.execute(
+                    'SELECT premise, record_hash, record FROM premises WHERE path = ?', (path,))
+            }
+            changes: Dict[str, List[dict]] = {
+                ADDED: [current[key] for key in current if key not in stored],
+                REMOVED: [json.loads(stored[key][1]) for key in stored if key not in current],
+                CHANGED: [current[key] for key in current if key in stored and stored[key][0] != hashes[key]],
+            }
+
+            self._pending[path] = (fingerprint, hashes, current)
+            return changes
+
+    def commit(self, path: str) -> None:
+        """
+        Сохраняет новое состояние дома, запомненное compare. Вызывается после того, как записи дома выведены.
+        Если состояние уже сохранено или дом не изменился, ничего не делает.
+
+        :param path: Path дома.
+        :type path: str
+        :return: None
+        """
+        with self._lock:
+            pending: Tuple[str, Dict[str, str], Dict[str, dict]] | None = self._pending.pop(path, None)
+            if pending is None:
+                return
+            fingerprint, hashes, current = pending
+            self._connection.execute('DELETE FROM premises WHERE path = ?', (path,))
+            self._connection.executemany(
+                'INSERT INTO premises (path, premise, record_hash, record) VALUES (?, ?, ?, ?)',
+                [(path, key, hashes[key], json.dumps(record, ensure_ascii=False)) for key, record in current.items()]
+            )
+            self._connection.execute(
+                'INSERT OR REPLACE INTO houses (path, fingerprint, premises, updated_at) VALUES (?, ?, ?, ?)',
+                (path, fingerprint, len(current), time.time())
+            )
+            self._connection.commit()
+
+            self._committed.add(path)
+            self.counts['changed'] += 1
+
+    def close(self) -> None:
+        """
+        Закрывает базу отпечатков.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
+        logger.info(f'Incremental mode: {self.counts["changed"]} houses changed, '
+                    f'{self.counts["unchanged"]} unchanged')
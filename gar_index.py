@@ -0,0 +1,475 @@
+"""
+Локальный индекс ГАР (государственного адресного реестра) из официальной XML-выгрузки ФИАС.
+
+Построение индекса:
+
+    python gar_index.py gar_xml.zip --db cache/gar.sqlite3 --regions 77,50
+
+Выгрузку можно передать архивом или распакованной папкой. Файлы разбираются потоково (iterparse),
+поэтому память не зависит от размера выгрузки. В индекс попадают актуальные объекты, муниципальная иерархия
+(как address_type 2 в запросах GetAddressItems) и кадастровые номера.
+
+После построения LocalResolver отвечает на те же запросы, что и GetAddressItems (дочерние объекты path),
+без обращения к сети. RequestConfig.get_address_items использует его в первую очередь, а HTTP — если
+объекта в индексе нет.
+"""
+import argparse
+import contextlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, IO, Iterator, List, Tuple
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+# Вид файла выгрузки по имени: AS_<ВИД>_<дата>_<guid>.XML
+_FILE_KIND = re.compile(r'^AS_([A-Z_]+?)_\d{8}_', re.IGNORECASE)
+
+# Порядок разбора: сначала справочники типов, они нужны для названий объектов
+_KIND_ORDER: Dict[str, int] = {
+    'ADDR_OBJ_TYPES': 0, 'HOUSE_TYPES': 0, 'ADDHOUSE_TYPES': 0, 'APARTMENT_TYPES': 0, 'ROOM_TYPES': 0,
+    'ADDR_OBJ': 1, 'HOUSES': 1, 'APARTMENTS': 1, 'ROOMS': 1, 'STEADS': 1, 'CARPLACES': 1,
+    'MUN_HIERARCHY': 2,
+    'ADDR_OBJ_PARAMS': 3, 'HOUSES_PARAMS': 3, 'APARTMENTS_PARAMS': 3, 'ROOMS_PARAMS': 3, 'STEADS_PARAMS': 3,
+    'CARPLACES_PARAMS': 3,
+}
+
+# Уровни объектов, которые не указаны в самих записях
+LEVEL_STEAD = 9
+LEVEL_HOUSE = 10
+LEVEL_APARTMENT = 11
+LEVEL_ROOM = 12
+LEVEL_CARPLACE = 17
+
+# Тип параметра "кадастровый номер" в AS_*_PARAMS
+CADASTRAL_NUMBER_PARAM = '8'
+
+# Сколько строк вставляется в базу за один раз
+BATCH_SIZE = 50000
+
+SCHEMA: List[str] = [
+    'CREATE TABLE IF NOT EXISTS types ('
+    'kind TEXT, type_id TEXT, level INTEGER, name TEXT, short TEXT, PRIMARY KEY (kind, type_id, level))',
+    'CREATE TABLE IF NOT EXISTS objects ('
+    'object_id INTEGER PRIMARY KEY, level INTEGER, name TEXT, type_name TEXT, full_name TEXT, full_name_short TEXT)',
+    'CREATE TABLE IF NOT EXISTS hierarchy (object_id INTEGER PRIMARY KEY, parent_id INTEGER, path TEXT)',
+    'CREATE TABLE IF NOT EXISTS cadastral (object_id INTEGER PRIMARY KEY, cadastral_number TEXT)',
+    'CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)',
+]
+
+# Значение metadata.regions для индекса, построенного по всем регионам выгрузки
+ALL_REGIONS = '*'
+INDEXES: List[str] = [
+    'CREATE INDEX IF NOT EXISTS hierarchy_parent_id ON hierarchy (parent_id)',
+    'CREATE INDEX IF NOT EXISTS objects_level ON objects (level)',
+]
+
+
+def iter_elements(file: IO, tag: str) -> Iterator[Dict[str, str]]:
+    """
+    Потоково перебирает элементы tag XML-файла выгрузки и возвращает их атрибуты.
+    Разобранные элементы сразу удаляются из дерева, поэтому память не растёт с размером файла.
+
+    :param file: Открытый XML-файл (в двоичном режиме).
+    :type file: IO
+    :param tag: Имя элемента (OBJECT, HOUSE, ITEM, PARAM, ...).
+    :type tag: str
+    :return: Итератор по атрибутам элементов.
+    :rtype: Iterator[Dict[str, str]]
+    """
+    root = None
+    for event, element in ElementTree.iterparse(file, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event == 'end' and element.tag == tag:
+            yield element.attrib
+            # Удаляем уже разобранные элементы из корня
+            root.clear()
+
+
+def _is_actual(attributes: Dict[str, str]) -> bool:
+    return attributes.get('ISACTUAL', '1') == '1' and attributes.get('ISACTIVE', '1') == '1'
+
+
+def _join_type(type_name: str, name: str) -> str:
+    """
+    Собирает название объекта с типом: "ул. Ленина", "д. 1".
+
+    :rtype: str
+    """
+    if not type_name:
+        return name
+    if type_name[-1].isalpha() and '-' not in type_name and '/' not in type_name:
+        type_name += '.'
+    return f'{type_name} {name}'
+
+
+class GarIndexBuilder:
+    """
+    Построение локального индекса ГАР в базе SQLite из XML-выгрузки.
+
+    Methods:
+        ingest(source: str, regions: List[str]) -> None:
+        Разбирает выгрузку (архив или папку) и записывает объекты в индекс.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        :param db_path: Путь к файлу базы индекса. Если база есть, объекты добавляются и обновляются.
+        :type db_path: str
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        # Индекс всегда можно построить заново, поэтому на время загрузки надёжность записи не нужна
+        self.connection.execute('PRAGMA journal_mode=OFF')
+        self.connection.execute('PRAGMA synchronous=OFF')
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+        # Справочники типов: (вид, код или сокращение, уровень) -> (полное название, сокращение)
+        self.types: Dict[Tuple[str, str, int], Tuple[str, str]] = {
+            (kind, type_id, level): (name, short) for kind, type_id, level, name, short
+            in self.connection.execute('SELECT kind, type_id, level, name, short FROM types')
+        }
+        self.counts: Dict[str, int] = {}
+
+    @staticmethod
+    def list_files(source: str, regions: List[str] = None) -> Tuple[Callable[[str], IO], List[Tuple[str, str]]]:
+        """
+        Составляет список файлов выгрузки в порядке разбора.
+
+        :param source: Архив выгрузки (.zip) или папка с распакованной выгрузкой.
+        :type source: str
+        :param regions: Коды регионов (имена папок выгрузки). Если не указаны, разбираются все регионы.
+        :type regions: Optional[List[str]]
+        :return: Функция открытия файла по имени и список (вид файла, имя файла).
+        :rtype: Tuple[Callable[[str], IO], List[Tuple[str, str]]]
+        """
+        if zipfile.is_zipfile(source):
+            archive: zipfile.ZipFile = zipfile.ZipFile(source)
+            names: List[str] = archive.namelist()
+            opener: Callable[[str], IO] = archive.open
+        else:
+            names = [os.path.relpath(os.path.join(directory, file_name), source)
+                     for directory, _, file_names in os.walk(source) for file_name in file_names]
+            opener = lambda name: open(os.path.join(source, name), 'rb')  # noqa: E731
+
+        files: List[Tuple[str, str]] = []
+        for name in names:
+            match = _FILE_KIND.match(os.path.basename(name))
+            if not match or match.group(1).upper() not in _KIND_ORDER:
+                continue
+            folder: str = os.path.dirname(name).replace('\\', '/').split('/')[-1]
+            # Справочники лежат в корне выгрузки, данные — в папках регионов
+            if regions and folder and folder not in regions:
+                continue
+            files.append((match.group(1).upper(), name))
+        files.sort(key=lambda item: _KIND_ORDER[item[0]])
+        return opener, files
+
+    def _insert(self, statement: str, rows: Iterator[tuple]) -> int:
+        """
+        Вставляет строки пачками по BATCH_SIZE.
+
+        :return: Количество вставленных строк.
+        :rtype: int
+        """
+        count: int = 0
+        batch: List[tuple] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                self.connection.executemany(statement, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.connection.executemany(statement, batch)
+            count += len(batch)
+        self.connection.commit()
+        return count
+
+    def _type(self, kind: str, type_id: str | None, level: int = 0) -> Tuple[str, str]:
+        return self.types.get((kind, type_id or '', level), ('', ''))
+
+    def _ingest_types(self, kind: str, file: IO) -> int:
+        tag: str = {'ADDR_OBJ_TYPES': 'ADDRESSOBJECTTYPE', 'HOUSE_TYPES': 'HOUSETYPE', 'ADDHOUSE_TYPES': 'HOUSETYPE',
+                    'APARTMENT_TYPES': 'APARTMENTTYPE', 'ROOM_TYPES': 'ROOMTYPE'}[kind]
+        rows: List[tuple] = []
+        for attributes in iter_elements(file, tag):
+            if attributes.get('ISACTIVE', 'true').lower() not in ('true', '1'):
+                continue
+            name, short = attributes.get('NAME', ''), attributes.get('SHORTNAME', '')
+            if kind == 'ADDR_OBJ_TYPES':
+                # В записях адресных объектов тип указан сокращением, а не кодом
+                key: Tuple[str, str, int] = (kind, short, int(attributes.get('LEVEL', 0)))
+            else:
+                key = (kind, attributes.get('ID', ''), 0)
+            self.types[key] = (name, short)
+            rows.append((*key, name, short))
+        return self._insert('INSERT OR REPLACE INTO types (kind, type_id, level, name, short) VALUES (?, ?, ?, ?, ?)',
+                            iter(rows))
+
+    def _iter_objects(self, kind: str, file: IO) -> Iterator[tuple]:
+        """
+        Перебирает актуальные объекты файла в виде строк таблицы objects.
+
+        :rtype: Iterator[tuple]
+        """
+        if kind == 'ADDR_OBJ':
+            for attributes in iter_elements(file, 'OBJECT'):
+                if not _is_actual(attributes):
+                    continue
+                level: int = int(attributes.get('LEVEL', 0))
+                name, short = attributes.get('NAME', ''), attributes.get('TYPENAME', '')
+                full_type: str = self._type('ADDR_OBJ_TYPES', short, level)[0] or short
+                yield (int(attributes['OBJECTID']), level, name, full_type, f'{full_type} {name}'.strip(),
+                       _join_type(short, name))
+
+        elif kind == 'HOUSES':
+            for attributes in iter_elements(file, 'HOUSE'):
+                if not _is_actual(attributes):
+                    continue
+                full_type, short = self._type('HOUSE_TYPES', attributes.get('HOUSETYPE'))
+                number: str = attributes.get('HOUSENUM', '')
+                full_name, short_name = f'{full_type} {number}'.strip(), _join_type(short, number)
+                # Дополнительные номера дома: корпус, строение
+                for number_key, type_key in (('ADDNUM1', 'ADDTYPE1'), ('ADDNUM2', 'ADDTYPE2')):
+                    if attributes.get(number_key):
+                        add_full, add_short = self._type('ADDHOUSE_TYPES', attributes.get(type_key))
+                        full_name += f' {add_full} {attributes[number_key]}'
+                        short_name += ' ' + _join_type(add_short, attributes[number_key])
+                yield int(attributes['OBJECTID']), LEVEL_HOUSE, number, full_type, full_name, short_name
+
+        else:
+            tag, level, types_kind, type_key, default_type = {
+                'APARTMENTS': ('APARTMENT', LEVEL_APARTMENT, 'APARTMENT_TYPES', 'APARTTYPE', ('Помещение', 'пом')),
+                'ROOMS': ('ROOM', LEVEL_ROOM, 'ROOM_TYPES', 'ROOMTYPE', ('Комната', 'ком')),
+                'STEADS': ('STEAD', LEVEL_STEAD, None, None, ('Земельный участок', 'з/у')),
+                'CARPLACES': ('CARPLACE', LEVEL_CARPLACE, None, None, ('Машино-место', 'м/м')),
+            }[kind]
+            for attributes in iter_elements(file, tag):
+                if not _is_actual(attributes):
+                    continue
+                full_type, short = self._type(types_kind, attributes.get(type_key)) if types_kind else ('', '')
+                if not full_type:
+                    full_type, short = default_type
+                number = attributes.get('NUMBER', '')
+                yield (int(attributes['OBJECTID']), level, number, full_type, f'{full_type} {number}',
+                       _join_type(short, number))
+
+    def _iter_hierarchy(self, file: IO) -> Iterator[tuple]:
+        for attributes in iter_elements(file, 'ITEM'):
+            if attributes.get('ISACTIVE', '1') != '1':
+                continue
+            yield int(attributes['OBJECTID']), int(attributes.get('PARENTOBJID') or 0), attributes.get('PATH')
+
+    def _iter_cadastral_numbers(self, file: IO) -> Iterator[tuple]:
+        today: str = time.strftime('%Y-%m-%d')
+        for attributes in iter_elements(file, 'PARAM'):
+            if attributes.get('TYPEID') != CADASTRAL_NUMBER_PARAM or attributes.get('ENDDATE', '9999') < today:
+                continue
+            yield int(attributes['OBJECTID']), attributes.get('VALUE')
+
+    def ingest(self, source: str, regions: List[str] = None) -> None:
+        """
+        Разбирает выгрузку и записывает справочники типов, объекты, иерархию и кадастровые номера в индекс.
+
+        :param source: Архив выгрузки (.zip) или папка с распакованной выгрузкой.
+        :type source: str
+        :param regions: Коды регионов (имена папок выгрузки). Если не указаны, разбираются все регионы.
+        :type regions: Optional[List[str]]
+        :return: None
+        """
+        opener, files = self.list_files(source, regions)
+        logger.info(f'GAR files to ingest: {len(files)}')
+        self._record_regions(regions)
+
+        for kind, name in files:
+            started: float = time.monotonic()
+            with opener(name) as file:
+                if kind.endswith('_TYPES'):
+                    count: int = self._ingest_types(kind, file)
+                elif kind == 'MUN_HIERARCHY':
+                    count = self._insert('INSERT OR REPLACE INTO hierarchy (object_id, parent_id, path) '
+                                         'VALUES (?, ?, ?)', self._iter_hierarchy(file))
+                elif kind.endswith('_PARAMS'):
+                    count = self._insert('INSERT OR REPLACE INTO cadastral (object_id, cadastral_number) '
+                                         'VALUES (?, ?)', self._iter_cadastral_numbers(file))
+                else:
+                    count = self._insert('INSERT OR REPLACE INTO objects (object_id, level, name, type_name, '
+                                         'full_name, full_name_short) VALUES (?, ?, ?, ?, ?, ?)',
+                                         self._iter_objects(kind, file))
+            self.counts[kind] = self.counts.get(kind, 0) + count
+            logger.info(f'{name}: {count} rows in {time.monotonic() - started:.1f}s')
+
+        for statement in INDEXES:
+            self.connection.execute(statement)
+        self.connection.commit()
+        logger.info(f'GAR index built: {self.counts}')
+
+    def _record_regions(self, regions: List[str] | None) -> None:
+        """
+        Записывает в metadata, какие регионы загружены в индекс: ALL_REGIONS или коды через запятую
+        (к уже загруженным добавляются новые). По этой записи LocalResolver решает, можно ли отвечать
+        списком регионов без обращения к серверу.
+
+        :param regions: Коды загружаемых регионов или None, если загружаются все регионы.
+        :type regions: Optional[List[str]]
+        :return: None
+        """
+        row: tuple | None = self.connection.execute("SELECT value FROM metadata WHERE key = 'regions'").fetchone()
+        if not regions or (row is not None and row[0] == ALL_REGIONS):
+            value: str = ALL_REGIONS
+        else:
+            loaded: set = set(row[0].split(',')) if row is not None and row[0] else set()
+            value = ','.join(sorted(loaded | set(regions)))
+        self.connection.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('regions', ?)", (value,))
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class LocalResolver:
+    """
+    Отвечает на запросы GetAddressItems по локальному индексу ГАР. Ответ имеет ту же структуру, что и ответ
+    сервера ФИАС (addresses, hierarchy, address_details), поэтому дальше обрабатывается тем же кодом.
+
+    Соединение с базой открывается только для чтения, отдельно в каждом потоке.
+
+    Индекс отвечает только тогда, когда его ответ полный: список регионов — только если индекс построен
+    по всем регионам, дочерние объекты — только если они есть (например, квартиры дома, файл APARTMENTS
+    которого не загружен, запрашиваются у сервера).
+
+    Methods:
+        get_address_items(data: dict) -> dict | None:
+        Возвращает ответ на запрос или None, если объекта нет в индексе.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        :param db_path: Путь к файлу базы индекса.
+        :type db_path: str
+        :raises FileNotFoundError: Если базы индекса нет.
+        """
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(db_path)
+        self.db_path = db_path
+        self._local = threading.local()
+
+        # Список регионов индекса полный, только если индекс построен по всем регионам выгрузки.
+        # У индексов, построенных до появления metadata, набор регионов неизвестен.
+        row: tuple | None = None
+        with contextlib.closing(sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)) as connection:
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'metadata'").fetchone():
+                row = connection.execute("SELECT value FROM metadata WHERE key = 'regions'").fetchone()
+        self.all_regions: bool = row is not None and row[0] == ALL_REGIONS
+
+        # Количество запросов, на которые ответил индекс, для статистики
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _make_item(row: tuple) -> dict:
+        object_id, level, full_name, full_name_short, type_name = row[:5]
+        return {"object_id": object_id, "object_level_id": level, "full_name": full_name,
+                "full_name_short": full_name_short, "type_name": type_name}
+
+    def get_address_items(self, data: dict) -> dict | None:
+        """
+        Отвечает на запрос GetAddressItems: для запроса без path — список объектов первого уровня,
+        иначе — дочерние объекты последнего объекта path на уровнях address_levels.
+
+        :param data: Тело запроса GetAddressItems.
+        :type data: dict
+        :return: Ответ в формате сервера ФИАС или None, если объекта path нет в индексе.
+        :rtype: dict | None
+        """
+        path: str | None = data.get('path')
+        columns: str = 'o.object_id, o.level, o.full_name, o.full_name_short, o.type_name, c.cadastral_number'
+        if not path or path == 'None':
+            # Список из загруженных регионов неполный: адрес в другом регионе совпал бы с одним из них
+            if not self.all_regions:
+                self.misses += 1
+                return None
+            rows: List[tuple] = self.connection.execute(
+                f'SELECT {columns} FROM objects o LEFT JOIN cadastral c ON c.object_id = o.object_id '
+                f'WHERE o.level = ?', (data.get('address_level', 1),)
+            ).fetchall()
+            if not rows:
+                self.misses += 1
+                return None
+            chain: List[dict] = []
+        else:
+            object_ids: List[int] = [int(object_id) for object_id in path.split('.')]
+            found: Dict[int, tuple] = {
+                row[0]: row for row in self.connection.execute(
+                    f'SELECT object_id, level, full_name, full_name_short, type_name FROM objects '
+                    f'WHERE object_id IN ({",".join("?" * len(object_ids))})', object_ids
+                )
+            }
+            # Если какого-то объекта path нет в индексе (регион не загружен), запрос выполняется через сеть
+            if len(found) != len(set(object_ids)):
+                self.misses += 1
+                return None
+            chain = [self._make_item(found[object_id]) for object_id in object_ids]
+
+            levels: List[int] = data.get('address_levels') or []
+            level_filter: str = f' AND o.level IN ({",".join("?" * len(levels))})' if levels else ''
+            rows = self.connection.execute(
+                f'SELECT {columns} FROM hierarchy h JOIN objects o ON o.object_id = h.object_id '
+                f'LEFT JOIN cadastral c ON c.object_id = h.object_id WHERE h.parent_id = ?{level_filter}',
+                [object_ids[-1], *levels]
+            ).fetchall()
+            # Пустой список — скорее всего, дочерние объекты не загружены (например, файл APARTMENTS региона),
+            # поэтому ответ запрашивается у сервера
+            if not rows:
+                self.misses += 1
+                return None
+
+        self.hits += 1
+        return {"addresses": [
+            {"object_id": row[0], "hierarchy": [*chain, self._make_item(row)],
+             "address_details": {"cadastral_number": row[5] or ""}}
+            for row in rows
+        ]}
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+
+    :return: Аргументы командной строки.
+    :rtype: argparse.Namespace
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Построение локального индекса ГАР')
+    parser.add_argument('source', help='архив выгрузки ГАР XML (.zip) или папка с распакованной выгрузкой')
+    parser.add_argument('--db', default=None, help='файл базы индекса (по умолчанию settings.gar_index_path)')
+    parser.add_argument('--regions', type=lambda value: [code.strip() for code in value.split(',') if code.strip()],
+                        help='коды регионов через запятую, например 77,50')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from settings import gar_index_path
+
+    logging.basicConfig(format='%(asctime)s | %(levelname)s | %(message)s', datefmt='%d-%m-%Y %H:%M:%S',
+                        level=logging.INFO)
+    arguments: argparse.Namespace = parse_args()
+    builder: GarIndexBuilder = GarIndexBuilder(arguments.db or gar_index_path)
+    builder.ingest(arguments.source, arguments.regions)
+    builder.close()
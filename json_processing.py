@@ -1,57 +1,169 @@
 import json
 import os
 import re
-from difflib import SequenceMatcher
-import pandas as pd
-from prettytable import PrettyTable
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
+import itertools
 import logging
+import time
+
+from fingerprint_store import CHANGE_COLUMN
+from metrics import COUNT_BUCKETS, registry
+from name_matching import NameIndex
+from settings import log_sample_every, object_type_filter
+
+# pandas (с openpyxl) и prettytable нужны только для вывода в Excel и в консоль, поэтому импортируются
+# при первом таком выводе: без них запуск из планировщика или контейнера начинается заметно быстрее
+if TYPE_CHECKING:
+    import pandas as pd
+    from prettytable import PrettyTable
+
+# Быстрый JSON-декодер, если установлен: orjson, затем ujson, иначе стандартный json
+try:
+    import orjson as fast_json
+
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import ujson as fast_json
+
+        JSON_BACKEND = 'ujson'
+    except ImportError:
+        fast_json = json
+        JSON_BACKEND = 'json'
 
 logger = logging.getLogger(__name__)
 
+# Фильтр по типу объекта, если он не передан в extract_address_records, заменяется в main.configure_filter
+default_filter: str = object_type_filter
 
-def get_object_id_by_name(response_text: str, name: str, level: int) -> str or None:
-    """
-    Извлекает ID объекта по его имени из текста ответа JSON,
-    выбирая наилучшее совпадение по степени сходства на указанном уровне.
+# Счётчик объектов для выборочного логирования подробностей в extract_address_info
+_log_sample_counter: Iterator[int] = itertools.count()
 
-    :param response_text: Текст ответа JSON.
-    :param name: Имя объекта для поиска.
-    :param level: Уровень, на котором нужно искать (индекс в массиве hierarchy).
-    :return: Идентификатор объекта или None, если объект не найден.
+# Набор способов вывода (output_sinks.OutputWriter), заполняется в main.configure_output.
+# Если None, результат выводится как раньше: Excel-файл на адрес и таблица в консоли.
+output_writer = None
+
+# Инкрементальный режим (ключ запуска --incremental), заполняется в main.configure_incremental:
+# хранилище отпечатков домов (fingerprint_store.FingerprintStore) и вывод изменений (output_sinks.CsvSink).
+# Записи неизменившихся домов не выводятся, изменения помещений дописываются в changes_writer.
+fingerprint_store = None
+changes_writer = None
+
+# Сколько записей за раз передаётся в способы вывода, когда ответ последнего уровня читается потоково
+STREAM_BATCH_SIZE = 1000
+
+# Индексы названий последних NAME_INDEX_CACHE_SIZE ответов: (path родителя, уровень) -> (отпечаток ответа, индекс).
+# Список дочерних объектов одного path одинаков для всех задач, поэтому, как и в префиксном дереве, индекс
+# строится один раз, а не при каждом поиске. Отпечаток (количество объектов, первый и последний ID) защищает
+# от устаревшего индекса, если ответ для path изменился.
+NAME_INDEX_CACHE_SIZE = 256
+_name_indexes: OrderedDict = OrderedDict()
+_name_indexes_lock = threading.Lock()
+
+
+def json_loads(raw: bytes | str) -> dict:
+    """
+    Декодирует JSON быстрым декодером (orjson/ujson), если он установлен, иначе стандартным json.
+    Ошибки декодирования всех декодеров приводятся к json.JSONDecodeError.
+
+    :param raw: Тело ответа (байты или строка).
+    :type raw: bytes | str
+    :return: Декодированные данные.
+    :rtype: dict
+    :raises json.JSONDecodeError: Если тело ответа не является корректным JSON.
     """
     try:
-        # Разбор JSON-ответа для извлечения информации об адресах
-        response_data: dict = json.loads(response_text)
-        addresses: list = response_data.get('addresses', [])
-
-        best_match_id: str | None = None  # Идентификатор с наилучшим совпадением
-        best_match_ratio: float = 0  # Степень совпадения
+        return fast_json.loads(raw)
+    except json.JSONDecodeError:
+        raise
+    except ValueError as e:
+        raise json.JSONDecodeError(str(e), raw if isinstance(raw, str) else raw.decode('utf-8', 'replace'), 0)
 
-        # Проход по всем объектам в "addresses" и поиск совпадений на указанном уровне
-        for address in addresses:
-            hierarchy: list = address.get('hierarchy', [])
 
-            # Проверка, существует ли элемент с нужным индексом в "hierarchy"
-            if level < len(hierarchy):
-                item: dict = hierarchy[level]
-                full_name: str = item.get('full_name', '')
+def get_name_index(addresses: List[dict], level: int, path: str = None) -> NameIndex:
+    """
+    Возвращает индекс названий объектов ответа: из кэша индексов, если ответ для path уже встречался,
+    иначе строит новый и запоминает его.
 
-                # Оценка степени совпадения между name и full_name
-                match_ratio: float = SequenceMatcher(None, name.lower(), full_name.lower()).ratio()
+    :param addresses: Объекты из ответа GetAddressItems.
+    :param level: Уровень, на котором нужно искать (индекс в массиве hierarchy).
+    :param path: Path родителя, для которого получен ответ. None — объекты первого уровня.
+    :return: Индекс названий.
+    """
+    key: Tuple[str | None, int] = (path, level)
+    fingerprint: tuple = (len(addresses), addresses[0].get('object_id') if addresses else None,
+                          addresses[-1].get('object_id') if addresses else None)
+    with _name_indexes_lock:
+        cached: tuple | None = _name_indexes.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            _name_indexes.move_to_end(key)
+            registry.increment('name_index_cache_total', result='hit')
+            return cached[1]
+
+    # Индекс строится без блокировки: другие потоки в это время ищут в своих ответах
+    name_index: NameIndex = NameIndex(addresses, level)
+    registry.increment('name_index_cache_total', result='miss')
+    with _name_indexes_lock:
+        _name_indexes[key] = (fingerprint, name_index)
+        _name_indexes.move_to_end(key)
+        while len(_name_indexes) > NAME_INDEX_CACHE_SIZE:
+            _name_indexes.popitem(last=False)
+    return name_index
+
+
+def get_object_id_by_name(response_data: dict | str, name: str, level: int, min_ratio: float = 0.0,
+                          path: str = None) -> str or None:
+    """
+    Извлекает ID объекта по его имени из ответа JSON,
+    выбирая наилучшее совпадение по степени сходства на указанном уровне (см. name_matching.NameIndex).
 
-                # Если совпадение лучше предыдущего, обновляем лучшее совпадение
-                if match_ratio > best_match_ratio:
-                    best_match_ratio: float = match_ratio
-                    best_match_id: str = item.get('object_id')
+    :param response_data: Декодированный ответ JSON. Для совместимости принимается и текст ответа.
+    :param name: Имя объекта для поиска.
+    :param level: Уровень, на котором нужно искать (индекс в массиве hierarchy).
+    :param min_ratio: Наименьшая степень совпадения, при которой объект считается найденным.
+    :param path: Path родителя, для которого получен ответ (None — объекты первого уровня), ключ кэша индексов.
+    :return: Идентификатор объекта или None, если объект не найден (совпадение хуже min_ratio).
+    """
+    try:
+        # Разбор JSON-ответа, если передан текст, а не уже декодированные данные
+        if isinstance(response_data, (str, bytes)):
+            response_data = json_loads(response_data)
+        addresses: list = response_data.get('addresses', [])
 
-        # Возвращаем идентификатор с наилучшим совпадением
-        return best_match_id
+        # Индекс названий объектов уровня: точное и нормализованное совпадение по словарю,
+        # затем нечёткий поиск с тем же результатом, что и перебор через SequenceMatcher
+        started: float = time.perf_counter()
+        object_id: str | None = get_name_index(addresses, level, path).best_match(name, min_ratio)
+        registry.observe_since('match_seconds', started, level=level)
+        registry.observe('match_candidates', len(addresses), COUNT_BUCKETS, level=level)
+        return object_id
     except json.JSONDecodeError as e:
         # Обработка ошибки декодирования JSON
-        print(f"Error decoding JSON: {e}")
+        logger.error('Error decoding JSON: %s', e)
         return None
 
 
+def get_object_candidates(response_data: dict, name: str, level: int, count: int,
+                          margin: float, min_ratio: float = 0.0, path: str = None) -> List[Tuple[str, float]]:
+    """
+    Возвращает несколько лучших кандидатов на указанном уровне, если их степень совпадения почти одинакова
+    (см. name_matching.NameIndex.top_matches). Используется поиском по нескольким путям (beam search).
+
+    :param response_data: Декодированный ответ JSON.
+    :param name: Имя объекта для поиска.
+    :param level: Уровень, на котором нужно искать (индекс в массиве hierarchy).
+    :param count: Максимальное количество кандидатов.
+    :param margin: Допустимое отставание степени совпадения от лучшего кандидата.
+    :param min_ratio: Наименьшая степень совпадения, при которой объект считается найденным.
+    :param path: Path родителя, для которого получен ответ (None — объекты первого уровня), ключ кэша индексов.
+    :return: Пары (ID объекта, степень совпадения) по убыванию степени совпадения.
+    """
+    return get_name_index(response_data.get('addresses', []), level, path).top_matches(name, count, margin,
+                                                                                        min_ratio)
+
+
 def extract_address_info(address: dict, object_type_filter: str = 'all') -> dict or None:
     """
     Извлечение информации об адресе из JSON-данных.
@@ -66,7 +178,6 @@ def extract_address_info(address: dict, object_type_filter: str = 'all') -> dict
     :return: Словарь с кадастровым номером, строкой адреса и типом объекта или None, если объект не прошел фильтр.
     :rtype: dict or None
     """
-    logger.info('Extracting address info')
     address_details: dict = address.get("address_details", {})  # Тут берём кадастровый номер
     hierarchy: list = address.get("hierarchy", [])  # Тут берём куски адреса и тип объекта
 
@@ -76,35 +187,36 @@ def extract_address_info(address: dict, object_type_filter: str = 'all') -> dict
 
     address_type: str = hierarchy[-1]["type_name"]
 
+    # Подробности по объектам пишутся только на уровне DEBUG и только для каждого log_sample_every-го объекта:
+    # на доме с тысячами помещений строки лога по каждому объекту занимали заметную долю времени разбора
+    log_details: bool = logger.isEnabledFor(logging.DEBUG) and next(_log_sample_counter) % log_sample_every == 0
+
     # Применение фильтра по типу объекта
     if object_type_filter != 'all' and address_type != object_type_filter:
-        logger.info(f'Object {address_details.get("cadastral_number", "")} has type {address_type} '
-                    f'does not match the filter {object_type_filter}')
+        if log_details:
+            logger.debug('Object %s has type %s does not match the filter %s',
+                         address_details.get("cadastral_number", ""), address_type, object_type_filter)
         return None
 
     # Извлечение информации кадастрового номера
     cadastral_number: str = address_details.get("cadastral_number", "")
-    logger.info(f"Cadastral number: {cadastral_number}")
 
     # hierarchy[0] - город или область
     city: str = hierarchy[0]["full_name_short"] if "full_name_short" in hierarchy[0] else None
-    logger.info(f"City: {city}")
 
     # hierarchy[-3] - улица, -3, потому что 3 с конца объект hierarchy
     street: str = hierarchy[-3]["full_name_short"] if "full_name_short" in hierarchy[-3] else None
-    logger.info(f"Street: {street}")
 
     # hierarchy[-2] - номер дома, -2, потому что 2 с конца объект hierarchy
     house_number: str = hierarchy[-2]["full_name_short"] if "full_name_short" in hierarchy[-2] else None
-    logger.info(f"House number: {house_number}")
 
     # hierarchy[-1] - номер помещения, -1, потому что последний объект hierarchy
     apartment_number: str = hierarchy[-1]["full_name_short"] if "full_name_short" in hierarchy[-1] else None
-    logger.info(f"Apartment number: {apartment_number}")
 
     # Формирование строки адреса
     address_str: str = f"{city}, {street}, {house_number}, {apartment_number}"
-    logger.info(f"Address: {address_str}")
+    if log_details:
+        logger.debug('Object %s: type %s, address %s', cadastral_number, address_type, address_str)
 
     return {
         "Кадастровый номер": cadastral_number,
@@ -113,75 +225,131 @@ def extract_address_info(address: dict, object_type_filter: str = 'all') -> dict
     }
 
 
-def parse_json_to_dataframe(json_data: dict, object_type_filter: str = 'Помещение'):
+def iter_address_records(json_data: dict | Iterable[dict], object_type_filter: str = None) -> Iterator[dict]:
     """
-    Преобразует JSON-данные в DataFrame и сохраняет в Excel-файл.
-    Формирует имя файла из адреса, очищает недопустимые символы и сохраняет в папку "output".
-    object_type_filter может принимать значения 'Помещение', 'Квартира', 'all'.
-    Если фильтр не 'all', в файл будут сохранены только объекты с указанным типом.
+    Перебирает записи об адресах результата поиска, прошедших фильтр, по мере чтения адресов.
+
+    :param json_data: Декодированный ответ GetAddressItems или итератор по его адресам (потоковый режим).
+    :type json_data: dict | Iterable[dict]
+    :param object_type_filter: Фильтр по типу объекта ('Помещение', 'Квартира', 'all'). По умолчанию — default_filter.
+    :type object_type_filter: Optional[str]
+    :return: Итератор по словарям с кадастровым номером, строкой адреса и типом объекта.
+    :rtype: Iterator[dict]
+    """
+    object_type_filter = object_type_filter or default_filter
+    addresses: Iterable[dict] = json_data.get("addresses", []) if isinstance(json_data, dict) else json_data
+    for address in addresses:
 
-    :param json_data: JSON-данные в виде списка словарей.
-    :type json_data: list[dict]
-    :param object_type_filter: Фильтр по типу объекта ('Помещение', 'Квартира', 'all').
-    :type object_type_filter: str
+        # Извлекаем информацию о конкретном помещении
+        info: dict | None = extract_address_info(address, object_type_filter)
+
+        # Если в info ничего нет, значит, объект не прошел фильтр
+        if info is not None:
+            yield info
+
+
+def log_filtered_out(object_type_filter: str = None) -> None:
+    """
+    Сообщает, что ни один объект результата не прошёл фильтр.
 
+    :param object_type_filter: Фильтр по типу объекта. По умолчанию — default_filter.
+    :type object_type_filter: Optional[str]
     :return: None
     """
+    logger.error(f'All objects did not pass the filter {object_type_filter or default_filter}, change the filter '
+                 f'(settings.object_type_filter or --filter).')
 
-    logger.info('Parsing JSON to DataFrame')
-    data: list = []
-    file_name: str | None = None
 
-    # Проход по списку словарей и извлечение информации
-    for address in json_data.get("addresses", []):
+def observe_extract(records: List[dict], seconds: float, object_type_filter: str = None) -> None:
+    """
+    Записывает метрики извлечения записей и сообщает, если ни один объект не прошёл фильтр. Вызывается отдельно
+    от извлечения, когда записи извлекались в пуле процессов: метрики дочернего процесса в основной не попадают.
+
+    :param records: Извлечённые записи.
+    :type records: List[dict]
+    :param seconds: Время извлечения в секундах.
+    :type seconds: float
+    :param object_type_filter: Фильтр по типу объекта. По умолчанию — default_filter.
+    :type object_type_filter: Optional[str]
+    :return: None
+    """
+    if not records:
+        log_filtered_out(object_type_filter)
+    registry.observe('extract_seconds', seconds)
+    registry.observe('extract_records', len(records), COUNT_BUCKETS)
 
-        # Извлекаем информацию о конкретном помещении
-        info: dict = extract_address_info(address, object_type_filter)
 
-        # Если в info ничего нет, значит, объект не прошел фильтр
-        if info is None:
-            continue
+def extract_address_records(json_data: dict | Iterable[dict], object_type_filter: str = None) -> List[dict]:
+    """
+    Извлекает информацию обо всех адресах результата поиска за один проход.
+    Полученные записи используются всеми способами вывода (Excel, таблица в консоли),
+    поэтому extract_address_info вызывается для каждого адреса один раз.
+    object_type_filter может принимать значения 'Помещение', 'Квартира', 'all'.
+
+    :param json_data: Декодированный ответ GetAddressItems или итератор по его адресам (потоковый режим).
+    :type json_data: dict | Iterable[dict]
+    :param object_type_filter: Фильтр по типу объекта ('Помещение', 'Квартира', 'all'). По умолчанию — default_filter.
+    :type object_type_filter: Optional[str]
+
+    :return: Список словарей с кадастровым номером, строкой адреса и типом объекта.
+    :rtype: List[dict]
+    """
+    logger.debug('Extracting address records')
+    started: float = time.perf_counter()
+    records: List[dict] = list(iter_address_records(json_data, object_type_filter))
+    observe_extract(records, time.perf_counter() - started, object_type_filter)
+    return records
 
-        # Добавляем информацию в список
-        data.append(info)
 
-        # Берём объект из info, извлекаем адрес, отрезаем номер помещения
-        if file_name is None:
-            file_name: str = ", ".join(info["Адрес"].split(", ")[:-1])
+def parse_json_to_dataframe(records: List[dict]):
+    """
+    Преобразует записи об адресах в DataFrame и сохраняет в Excel-файл.
+    Формирует имя файла из адреса, очищает недопустимые символы и сохраняет в папку "output".
+
+    :param records: Записи, полученные из extract_address_records.
+    :type records: List[dict]
+
+    :return: None
+    """
 
-    if not data:
-        logger.error('All objects did not pass the filter, change the filter in parse_json_to_dataframe.')
+    logger.info('Parsing JSON to DataFrame')
+    if not records:
         return None
 
+    # Берём первую запись, извлекаем адрес, отрезаем номер помещения
+    file_name: str = ", ".join(records[0]["Адрес"].split(", ")[:-1])
+
     # Заменяем слеш, и на всякий пожарный, обратный слеш на "др."
     file_name: str = file_name.replace('/', 'др.').replace('\\', 'др.')
 
     # Заменяем недопустимые символы на "_".
     file_name: str = re.sub(r'[<>:"/\\|?*]', '_', file_name)
 
+    import pandas as pd
+
     # Создаем DataFrame и сохраняем в Excel-файл, в папку "output"
-    df: pd.DataFrame = pd.DataFrame(data)
+    df: pd.DataFrame = pd.DataFrame(records)
     os.makedirs('output', exist_ok=True)
 
     logger.info(f'Saving to Excel: {file_name}.xlsx')
     df.to_excel(f"output/{file_name}.xlsx", index=False)
 
 
-def create_search_result_table(search_result_data: dict, object_type_filter: str = 'Помещение') -> PrettyTable:
+def create_search_result_table(records: List[dict]) -> 'PrettyTable':
     """
     Создаёт таблицу с результатами поиска и выводит ее в консоль.
-    object_type_filter может принимать значения 'Помещение', 'Квартира', 'all'.
-    Если фильтр не 'all', в таблицу будут добавлены только объекты с указанным типом.
 
-    :param search_result_data: JSON-данные в виде словаря.
-    :type search_result_data: dict
-    :param object_type_filter: Фильтр по типу объекта ('Помещение', 'Квартира', 'all').
-    :type object_type_filter: str
+    :param records: Записи, полученные из extract_address_records.
+    :type records: List[dict]
 
     :return: PrettyTable
     """
 
     logger.info('Creating search result table')
+    if not records:
+        return None
+    from prettytable import PrettyTable
+
     # Создаём объект PrettyTable
     search_result_table: PrettyTable = PrettyTable()
 
@@ -191,16 +359,118 @@ def create_search_result_table(search_result_data: dict, object_type_filter: str
     # Устанавливаем выравнивание по левому краю
     search_result_table.align = 'l'
 
-    for address in search_result_data.get("addresses", []):
+    for info in records:
+        # Добавляем информацию в таблицу
+        search_result_table.add_row([info["Кадастровый номер"], info["Адрес"], info["Тип"]])
 
-        # Извлекаем информацию о конкретном помещении
-        info: dict | None = extract_address_info(address, object_type_filter)
-        if info:
-            # Добавляем информацию в таблицу
-            search_result_table.add_row([info["Кадастровый номер"], info["Адрес"], info["Тип"]])
+    print(search_result_table)
+    return search_result_table
 
-    if search_result_table.rowcount == 0:
-        logger.error('All objects did not pass the filter, change the filter in create_search_result_table.')
-        return None
+
+def save_records(records: List[dict], task: List[str] = None, path: str = None) -> None:
+    """
+    Передаёт записи об адресах во все способы вывода: в output_writer, если он задан,
+    иначе в Excel-файл и таблицу в консоли.
+
+    В инкрементальном режиме (задан fingerprint_store) записи дома сравниваются с прошлым запуском:
+    если дом не изменился, записи не выводятся, иначе изменения помещений дописываются в changes_writer,
+    а после вывода записей новое состояние дома сохраняется (fingerprint_store.commit).
+
+    :param records: Записи, полученные из extract_address_records.
+    :type records: List[dict]
+    :param task: Исходная задача, записывается вместе с записями.
+    :type task: Optional[List[str]]
+    :param path: Path дома, по нему сравниваются результаты в инкрементальном режиме.
+    :type path: Optional[str]
+    :return: None
+    """
+    started: float = time.perf_counter()
+    if fingerprint_store is not None and path is not None:
+        changes: Dict[str, List[dict]] | None = fingerprint_store.compare(path, records)
+        if changes is None:
+            logger.info('House %s has not changed since the last run, output skipped', path)
+            registry.increment('output_skipped_houses_total')
+            return
+        if changes_writer is not None:
+            changes_writer.write([{CHANGE_COLUMN: change, **record}
+                                  for change, change_records in changes.items() for record in change_records], task)
+
+    if output_writer is not None:
+        output_writer.write(records, task)
     else:
-        print(search_result_table)
+        # Создаем dataframe с результатами поиска
+        parse_json_to_dataframe(records)
+
+        # Создаем таблицу с результатами для вывода на экран
+        create_search_result_table(records)
+
+    # Новое состояние дома сохраняется только после вывода: если вывод не удался, дом выводится в следующий раз
+    if fingerprint_store is not None and path is not None:
+        fingerprint_store.commit(path)
+
+    registry.observe_since('output_seconds', started)
+    registry.increment('output_records_total', len(records))
+
+
+def can_stream_output() -> bool:
+    """
+    Проверяет, можно ли выводить записи частями по мере чтения ответа: все способы вывода дописывают записи
+    (output_sinks.OutputSink.streaming), а инкрементальный режим, которому нужны все записи дома сразу, выключен.
+
+    :rtype: bool
+    """
+    return output_writer is not None and output_writer.streaming and fingerprint_store is None
+
+
+def save_record_stream(records: Iterable[dict], tasks: List[List[str]]) -> int:
+    """
+    Выводит записи частями по STREAM_BATCH_SIZE по мере их получения, не собирая в один список.
+    Вызывается только если can_stream_output().
+
+    :param records: Записи, например из iter_address_records по потоковому ответу.
+    :type records: Iterable[dict]
+    :param tasks: Задачи, для каждой из которых выводятся записи (задачи узла префиксного дерева).
+    :type tasks: List[List[str]]
+    :return: Количество записей.
+    :rtype: int
+    """
+    started: float = time.perf_counter()
+    count: int = 0
+    iterator: Iterator[dict] = iter(records)
+    while batch := list(itertools.islice(iterator, STREAM_BATCH_SIZE)):
+        for task in tasks:
+            output_writer.write(batch, task)
+        count += len(batch)
+
+    if not count:
+        log_filtered_out()
+    # Время вывода включает чтение ответа: записи выводятся по мере его получения
+    registry.observe_since('output_seconds', started)
+    registry.observe('extract_records', count, COUNT_BUCKETS)
+    registry.increment('output_records_total', count * len(tasks))
+    return count
+
+
+def save_search_result(search_result_data: dict | Iterable[dict], object_type_filter: str = None,
+                       task: List[str] = None, path: str = None) -> int:
+    """
+    Извлекает записи из результата поиска один раз и передаёт их во все способы вывода (см. save_records).
+    Если результат — итератор по адресам потокового ответа и вывод это позволяет (can_stream_output),
+    записи выводятся частями по мере чтения ответа и не собираются в один список.
+
+    :param search_result_data: Декодированный ответ GetAddressItems последнего уровня или итератор по его адресам.
+    :type search_result_data: dict | Iterable[dict]
+    :param object_type_filter: Фильтр по типу объекта ('Помещение', 'Квартира', 'all'). По умолчанию — default_filter.
+    :type object_type_filter: Optional[str]
+    :param task: Исходная задача, записывается вместе с записями.
+    :type task: Optional[List[str]]
+    :param path: Path дома (для инкрементального режима).
+    :type path: Optional[str]
+    :return: Количество извлечённых записей.
+    :rtype: int
+    """
+    if not isinstance(search_result_data, dict) and can_stream_output():
+        return save_record_stream(iter_address_records(search_result_data, object_type_filter), [task])
+    records: List[dict] = extract_address_records(search_result_data, object_type_filter)
+    save_records(records, task, path)
+    return len(records)
@@ -0,0 +1,104 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+# ijson разбирает JSON потоково на C, если установлен. Иначе используется встроенный инкрементальный разборщик.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Начало массива "addresses" в ответе GetAddressItems
+_ADDRESSES_START = re.compile(r'"addresses"\s*:\s*\[')
+
+# Сколько символов с конца буфера сохраняется, пока начало массива не найдено
+_SEEK_TAIL = 64
+
+
+class _ChunkReader:
+    """
+    Файлоподобная обёртка над итератором байтовых фрагментов для ijson.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+
+    def read(self, size: int = -1) -> bytes:
+        # Пустой фрагмент означает конец файла, поэтому пустые фрагменты пропускаются
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b''
+
+
+def _iter_addresses_builtin(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Инкрементальный разборщик массива "addresses" на стандартном json.
+
+    В памяти держится только текущий фрагмент ответа и один недочитанный элемент массива:
+    каждый элемент декодируется json.JSONDecoder.raw_decode, как только он полностью получен.
+
+    :param chunks: Фрагменты тела ответа.
+    :type chunks: Iterable[bytes]
+    :return: Итератор по элементам массива "addresses".
+    :rtype: Iterator[dict]
+    :raises json.JSONDecodeError: Если ответ оборвался или не является корректным JSON.
+    """
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer: str = ''
+    in_array: bool = False
+    finished: bool = False
+
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+
+        if not in_array:
+            match = _ADDRESSES_START.search(buffer)
+            if match is None:
+                # Начало массива ещё не пришло, храним только хвост буфера на случай разрыва ключа
+                buffer = buffer[-_SEEK_TAIL:]
+                continue
+            buffer = buffer[match.end():]
+            in_array = True
+
+        position: int = 0
+        while True:
+            # Пропускаем пробелы и запятые между элементами
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == ']':
+                finished = True
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Элемент получен не полностью, ждём следующий фрагмент
+                break
+            yield item
+
+        buffer = buffer[position:]
+        if finished:
+            return
+
+    if in_array and not finished:
+        raise json.JSONDecodeError('Unexpected end of addresses array', buffer, 0)
+
+
+def iter_addresses(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Потоково перебирает элементы массива "addresses" ответа GetAddressItems, не собирая ответ целиком
+    ни в строку, ни в словарь. Использует ijson, если он установлен, иначе встроенный разборщик.
+
+    :param chunks: Фрагменты тела ответа (например, response.iter_content()).
+    :type chunks: Iterable[bytes]
+    :return: Итератор по адресам.
+    :rtype: Iterator[dict]
+    """
+    if ijson is not None:
+        yield from ijson.items(_ChunkReader(chunks), 'addresses.item', use_float=True)
+    else:
+        yield from _iter_addresses_builtin(chunks)
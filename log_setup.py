@@ -0,0 +1,100 @@
+"""
+Настройка логирования: текстовый или структурированный (JSON) формат и запись лога в фоновом потоке.
+
+При записи в фоновом потоке потоки поиска только кладут запись в очередь (logging.handlers.QueueHandler),
+а форматирование времени и запись в консоль выполняет отдельный поток (QueueListener). Медленная консоль
+(особенно в Windows) перестаёт задерживать поиск.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+from settings import log_level, log_format, log_background
+
+# Формат текстового лога
+TEXT_FORMAT = '%(asctime)s | %(levelname)s | %(message)s'
+DATE_FORMAT = '%d-%m-%Y %H:%M:%S'
+
+# Уровни логирования, которые можно задать в settings.log_level и ключом запуска --log-level
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+# Библиотеки, которые на уровне INFO пишут строку на каждый запрос: их лог ограничивается предупреждениями
+QUIET_LOGGERS = ['httpx', 'httpcore']
+
+# Обработчик, установленный configure_logging, и поток записи лога, если он запущен
+_handler: logging.Handler | None = None
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирует запись лога как одну строку JSON: время, уровень, модуль, поток и сообщение.
+    Подходит для систем сбора логов, которым не нужно разбирать текстовый формат.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def stop_logging() -> None:
+    """
+    Останавливает поток записи лога, предварительно записав все записи из очереди.
+
+    :return: None
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(level: str = log_level, structured: bool = log_format == 'json',
+                      background: bool = log_background) -> None:
+    """
+    Настраивает корневой логгер. Повторный вызов заменяет обработчик, установленный предыдущим вызовом.
+
+    :param level: Уровень логирования ('DEBUG', 'INFO', 'WARNING', ...).
+    :type level: str
+    :param structured: Если True, каждая запись выводится строкой JSON (JsonFormatter).
+    :type structured: bool
+    :param background: Если True, записи выводятся в консоль фоновым потоком через очередь.
+    :type background: bool
+    :return: None
+    """
+    global _handler, _listener
+    root: logging.Logger = logging.getLogger()
+    stop_logging()
+    if _handler is not None:
+        root.removeHandler(_handler)
+
+    stream_handler: logging.Handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if structured else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    if background:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _handler = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+    else:
+        _handler = stream_handler
+
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+# Записи, оставшиеся в очереди, выводятся при завершении программы
+atexit.register(stop_logging)
@@ -1,24 +1,68 @@
+import argparse
+import asyncio
+import contextlib
 import logging
-from typing import List
-import msvcrt
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from typing import Callable, Iterable, Iterator, List, Set, Tuple
+import itertools
 import requests
+from requests.adapters import HTTPAdapter
 
-from credentials import proxy_url
+from address_trie import AddressTrie, AddressTrieNode
+from cadastral_index import CadastralIndex, normalize_cadastral_number
+from async_classes import AsyncRequestConfig, get_async_client
+from classes import SearchContext
+from gar_index import LocalResolver
+import json_processing
+from json_processing import iter_address_records, observe_extract, save_records
+from log_setup import LOG_LEVELS, configure_logging
+from fingerprint_store import FingerprintStore
+from metrics import profile_run, registry
+from output_sinks import OutputWriter, create_changes_sink
+from pipeline import Pipeline, Stage
+from proxy_pool import ProxyEndpoint, ProxyPool
+from rate_limiter import ConcurrencyController, TokenBucket
+from response_cache import ResponseCache
+from task_journal import TaskJournal
+from task_reader import STDIN, Task, deduplicate, iter_chunks, iter_tasks
+from work_queue import LeaseKeeper, WorkQueue
+from token_manager import AsyncTokenManager, TokenManager
+from credentials import proxy_url, proxy_urls
 from common_headers import session_headers
 from requests_config import *
+from settings import max_workers, use_prefix_trie, cache_enabled, cache_path, cache_ttl_by_level, cache_default_ttl, \
+    cache_max_entries, token_cache_path, token_ttl, rate_limit_per_second, rate_limit_burst, adaptive_concurrency, \
+    concurrency_initial, concurrency_min, concurrency_max, concurrency_latency_target, proxy_max_consecutive_failures, \
+    proxy_max_error_rate, proxy_ejection_time, proxy_max_ejection_time, async_max_in_flight, output_sinks, output_dir, \
+    journal_enabled, journal_path, tasks_path, tasks_columns, task_chunk_size, deduplicate_tasks, gar_index_enabled, \
+    gar_index_path, cadastral_index_enabled, cadastral_index_path, fingerprint_path, pipeline_enabled, \
+    pipeline_queue_size, pipeline_extract_workers, pipeline_extract_processes, pipeline_output_workers, \
+    pipeline_stats_interval, metrics_enabled, metrics_export_path, queue_chunk_size, queue_lease_time, \
+    queue_max_attempts, queue_poll_interval, log_level, log_format, object_type_filter
 
-# Настройка форматтера для логов
-formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s',
-                              datefmt='%d-%m-%Y %H:%M:%S')
-
-handler = logging.StreamHandler()
-handler.setFormatter(formatter)
+# Настройка логирования: лог выводится в консоль фоновым потоком (settings.log_*)
+configure_logging()
 logger = logging.getLogger()
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+
+# Журнал выполнения задач из файла, заполняется в configure_journal
+task_journal: TaskJournal | None = None
+
+# Файл, в который выгружаются метрики после каждого пакета задач, заполняется в configure_metrics
+metrics_path: str | None = None
+
+# Функция, которой сообщается результат каждой задачи: (задача, найденный path, текст ошибки)
+ResultCallback = Callable[[List[str], str | None, str | None], None]
+
+# Количество потоков по умолчанию. При адаптивном лимите одновременных запросов потоков должно быть не меньше
+# его потолка (concurrency_max), иначе лимит упирается в размер пула и не может вырасти
+default_workers: int = max(max_workers, concurrency_max) if adaptive_concurrency else max_workers
 
 
-def get_session() -> requests.Session:
+def get_session(pool_size: int = default_workers, proxy: str = proxy_url) -> requests.Session:
     """
     Инициализирует и возвращает сессию с обновленными заголовками и прокси.
 
@@ -26,8 +70,14 @@ def get_session() -> requests.Session:
     и прокси, после чего возвращает готовую сессию.
 
     Заголовки берутся из глобальной переменной session_headers (определена в модуле common_headers).
-    Прокси устанавливаются на основе глобальной переменной proxy_url (определена в модуле credentials).
+    Прокси по умолчанию устанавливаются на основе глобальной переменной proxy_url (определена в модуле credentials).
+    Размер пула соединений подбирается под количество потоков, чтобы параллельные задачи
+    не ждали свободного соединения.
 
+    :param pool_size: Максимальное количество одновременных соединений с одним хостом.
+    :type pool_size: int
+    :param proxy: Адрес прокси.
+    :type proxy: str
 
     :return:  Сессия с обновленными заголовками и прокси
     :rtype: requests.Session
@@ -38,26 +88,284 @@ def get_session() -> requests.Session:
         # Обновляем заголовки сессии из common_headers
         session.headers.update(session_headers)
 
+        # Увеличиваем пул соединений под количество потоков
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
         # Настраиваем прокси из credentials
         session.proxies.update({
-            'http': proxy_url,
-            'https': proxy_url
+            'http': proxy,
+            'https': proxy
         })
 
         return session
 
 
-def get_token(session: requests.Session) -> None:
+def configure_cache(no_cache: bool = False, refresh: bool = False) -> None:
     """
-    Функция для получения токена. Инициализирует последовательность запросов get_token_sequence и передаёт их в
-    функцию send_requests.
+    Открывает постоянный кэш ответов GetAddressItems и подключает его к RequestConfig.
+    Параметры кэша берутся из модуля settings.
 
-    :param session: Активная сессия для выполнения запроса. :type session: requests.Session :return: None :rtype:
-    None :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одного из запросов из
-    get_token_sequence
+    :param no_cache: Если True, кэш не используется.
+    :type no_cache: bool
+    :param refresh: Если True, кэш не читается, но обновляется свежими ответами.
+    :type refresh: bool
+    :return: None
+    """
+    if no_cache or not cache_enabled:
+        logger.info('Response cache disabled')
+        RequestConfig.response_cache = None
+        return
+
+    RequestConfig.response_cache = ResponseCache(cache_path, cache_ttl_by_level, cache_default_ttl,
+                                                 cache_max_entries, refresh)
+
+
+def configure_local_index(disabled: bool = False) -> None:
+    """
+    Подключает локальный индекс ГАР (gar_index.py) к RequestConfig, если он построен.
+    Тогда запросы GetAddressItems выполняются по индексу, а к серверу ФИАС — только для объектов,
+    которых нет в индексе.
+
+    :param disabled: Если True, индекс не используется.
+    :type disabled: bool
+    :return: None
+    """
+    if disabled or not gar_index_enabled or not os.path.exists(gar_index_path):
+        RequestConfig.local_resolver = None
+        return
+
+    RequestConfig.local_resolver = LocalResolver(gar_index_path)
+    logger.info(f'Local GAR index: {gar_index_path}')
+
+
+def configure_cadastral_index() -> None:
+    """
+    Открывает индекс кадастровых номеров и подключает его к RequestConfig: объекты из каждого ответа
+    GetAddressItems записываются в индекс.
+
+    :return: None
+    """
+    if not cadastral_index_enabled:
+        RequestConfig.cadastral_index = None
+        return
+
+    RequestConfig.cadastral_index = CadastralIndex(cadastral_index_path)
+
+
+def configure_filter(name: str | None = None) -> None:
+    """
+    Задаёт тип объектов, которые попадают в вывод (json_processing.default_filter).
+
+    :param name: 'Помещение', 'Квартира' или 'all'. Если не передан, используется settings.object_type_filter.
+    :type name: Optional[str]
+    :return: None
+    """
+    json_processing.default_filter = name or object_type_filter
+
+
+def configure_metrics(path: str | None = None) -> None:
+    """
+    Включает или выключает сбор метрик производительности (metrics.registry) по settings.metrics_enabled
+    и задаёт файл, в который метрики выгружаются после каждого пакета задач.
+
+    :param path: Файл выгрузки (.prom — формат Prometheus, иначе JSON). Если не передан,
+                 берётся settings.metrics_export_path.
+    :type path: Optional[str]
+    :return: None
+    """
+    global metrics_path
+    registry.enabled = metrics_enabled
+    metrics_path = (path or metrics_export_path) if metrics_enabled else None
+
+
+def report_metrics() -> None:
+    """
+    Выводит в лог сводку метрик производительности и выгружает их в файл, если он задан.
+
+    :return: None
+    """
+    if not registry.enabled:
+        return
+    summary: str = registry.summary()
+    if summary:
+        logger.info('Performance summary:\n' + summary)
+    if metrics_path:
+        registry.export(metrics_path)
+
+
+def configure_journal(restart: bool = False, tasks_file: str = tasks_path) -> None:
+    """
+    Открывает журнал выполнения задач (task_journal.TaskJournal), если он включён в settings.
+
+    :param restart: Если True, записи файла задач удаляются и все задачи выполняются заново.
+    :type restart: bool
+    :param tasks_file: Файл задач.
+    :type tasks_file: str
+    :return: None
+    """
+    global task_journal
+    if not journal_enabled:
+        return
+    task_journal = TaskJournal(journal_path)
+    if restart:
+        task_journal.reset(os.path.abspath(tasks_file))
+
+
+def prepare_tasks(tasks: List[Task], source: str | None) -> Tuple[List[Task], ResultCallback | None]:
+    """
+    Готовит часть задач к выполнению: отбирает по журналу невыполненные задачи, схлопывает дубликаты
+    и создаёт функцию, которая записывает результат задачи в журнал для неё и всех её дубликатов.
+
+    :param tasks: Задачи из файла или введённые вручную.
+    :type tasks: List[Task]
+    :param source: Файл задач. Если None (адрес введён вручную) или журнал отключён, журнал не используется.
+    :type source: Optional[str]
+    :return: Задачи, которые нужно выполнить, и функция для записи результатов (или None).
+    :rtype: Tuple[List[Task], Optional[ResultCallback]]
+    """
+    journal: TaskJournal | None = task_journal if source is not None else None
+    if journal is not None:
+        tasks = journal.pending(source, tasks)
+    if deduplicate_tasks:
+        tasks = deduplicate(tasks)
+    if journal is None:
+        return tasks, None
+
+    def on_result(task: Task, path: str | None, error: str | None) -> None:
+        for source_task in task.all_tasks():
+            if error is None:
+                journal.mark_done(source, source_task.line_number, source_task, path)
+            else:
+                journal.mark_failed(source, source_task.line_number, source_task, error)
+
+    return tasks, on_result
+
+
+def count_failures(on_result: ResultCallback | None, failures: List[List[str]]) -> ResultCallback:
+    """
+    Оборачивает функцию записи результатов: задачи, завершившиеся ошибкой (в том числе ненайденные адреса
+    префиксного дерева), добавляются в failures.
+
+    :param on_result: Функция записи результатов в журнал или None.
+    :type on_result: Optional[ResultCallback]
+    :param failures: Список, в который добавляются задачи с ошибкой.
+    :type failures: List[List[str]]
+    :return: Функция, которую нужно передать в поиск вместо on_result.
+    :rtype: ResultCallback
+    """
+    def on_task_result(task: List[str], path: str | None, error: str | None) -> None:
+        if error is not None:
+            failures.append(task)
+        if on_result is not None:
+            on_result(task, path, error)
+
+    return on_task_result
+
+
+def count_tasks(tasks: List[List[str]]) -> int:
+    """
+    Количество исходных строк задач с учётом дубликатов (task_reader.deduplicate).
+
+    :rtype: int
+    """
+    return sum(len(task.all_tasks()) if isinstance(task, Task) else 1 for task in tasks)
+
+
+def configure_output(names: List[str] = None, base_name: str = 'results') -> None:
+    """
+    Создаёт способы вывода результата (output_sinks.OutputWriter) и подключает их к json_processing.save_records.
+
+    :param names: Имена способов вывода. Если не переданы, берутся из settings.output_sinks.
+    :type names: Optional[List[str]]
+    :param base_name: Имя файлов вывода без расширения.
+    :type base_name: str
+    :return: None
     """
+    json_processing.output_writer = OutputWriter.create(names or output_sinks, output_dir, base_name)
 
-    logger.info('Token request started')
+
+def configure_incremental() -> None:
+    """
+    Включает инкрементальный режим: результаты домов сравниваются с прошлым запуском по отпечаткам
+    (fingerprint_store.FingerprintStore), записи неизменившихся домов не выводятся повторно,
+    а добавленные, удалённые и изменённые помещения записываются в отдельный CSV-файл изменений.
+
+    :return: None
+    """
+    json_processing.fingerprint_store = FingerprintStore(fingerprint_path)
+    json_processing.changes_writer = create_changes_sink(output_dir)
+
+
+def close_output() -> None:
+    """
+    Закрывает способы вывода: дописывает буферы и закрывает файлы.
+
+    :return: None
+    """
+    if json_processing.output_writer is not None:
+        json_processing.output_writer.close()
+        json_processing.output_writer = None
+    if json_processing.changes_writer is not None:
+        json_processing.changes_writer.close()
+        json_processing.changes_writer = None
+    if json_processing.fingerprint_store is not None:
+        json_processing.fingerprint_store.close()
+        json_processing.fingerprint_store = None
+
+
+def configure_proxy_pool(workers: int = default_workers) -> int:
+    """
+    Создаёт пул прокси из списка credentials.proxy_urls и подключает его к RequestConfig.
+    Каждый прокси получает свою сессию с пулом соединений, свой токен (хранится в отдельном файле),
+    свой ограничитель частоты и адаптивный лимит одновременных запросов. Если список пуст, пул не используется.
+
+    Лимиты действуют для каждого прокси отдельно, поэтому потоков нужно столько, чтобы загрузить все прокси:
+    workers потоков на каждый прокси. Пул соединений каждой сессии рассчитан на все потоки, так как при
+    исключении прокси из пула его запросы уходят через оставшиеся.
+
+    :param workers: Количество потоков на один прокси (без пула прокси — всего).
+    :type workers: int
+    :return: Количество потоков с учётом пула прокси.
+    :rtype: int
+    """
+    if RequestConfig.proxy_pool is not None:
+        return workers * len(RequestConfig.proxy_pool)
+    if not proxy_urls:
+        return workers
+
+    workers *= len(proxy_urls)
+    endpoints: List[ProxyEndpoint] = []
+    root, extension = os.path.splitext(token_cache_path)
+    for index, url in enumerate(proxy_urls):
+        endpoints.append(ProxyEndpoint(
+            url,
+            get_session(workers, url),
+            TokenManager(fetch_token, f'{root}-{index}{extension}', token_ttl),
+            TokenBucket(rate_limit_per_second, rate_limit_burst) if rate_limit_per_second else None,
+            ConcurrencyController(concurrency_initial, concurrency_min, concurrency_max,
+                                  concurrency_latency_target) if adaptive_concurrency else None,
+            proxy_max_consecutive_failures, proxy_max_error_rate, proxy_ejection_time, proxy_max_ejection_time
+        ))
+
+    RequestConfig.proxy_pool = ProxyPool(endpoints)
+    logger.info(f'Proxy pool configured: {len(endpoints)} proxies')
+    return workers
+
+
+def fetch_token(session: requests.Session) -> str | None:
+    """
+    Получает новый токен: выполняет последовательность запросов get_token_sequence через функцию send_requests.
+    Вызывается менеджером токена, только когда сохранённого токена нет, он устарел или отклонён сервером.
+
+    :param session: Активная сессия для выполнения запроса.
+    :type session: requests.Session
+    :return: Токен или None, если сервер его не вернул.
+    :rtype: str | None
+    :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одного из запросов из
+    get_token_sequence
+    """
 
     # Список с объектами класса RequestConfig, которые содержат параметры запросов
     # Объекты RequestConfig определены в модуле requests_config
@@ -68,54 +376,400 @@ def get_token(session: requests.Session) -> None:
     ]
 
     try:
-        # Выполнение последовательности запросов
-        send_requests(session, get_token_sequence)
-        logger.info('Token received')
+        # Выполнение последовательности запросов, токен сохраняется в контексте методом RequestConfig.get_token
+        context: SearchContext = SearchContext()
+        send_requests(session, get_token_sequence, context)
+        return context.token
     except requests.exceptions.RequestException as e:
         raise requests.exceptions.RequestException('Token request failed with error: ' + str(e))
 
 
-def search_objects(session: requests.Session, task_list: List[List[str]]) -> None:
+def get_token(session: requests.Session) -> None:
+    """
+    Функция для получения токена. Создаёт менеджер токена, если его ещё нет, и получает действующий токен.
+    Сохранённый в памяти или на диске токен используется повторно, запросы получения токена выполняются,
+    только если токена нет или он устарел. С пулом прокси токены получаются для каждого прокси при первой задаче.
+
+    :param session: Активная сессия для выполнения запроса. :type session: requests.Session :return: None :rtype:
+    None :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одного из запросов из
+    get_token_sequence
     """
-    Функция для поиска. Отправляет запрос используя метод execute класса RequestConfig.
 
-    :param task_list: Список задач, где каждая задача представлена списком строк. :type task_list: list :param
-    :param session: Активная сессия для выполнения запроса. :type session: requests.Session :return: None :rtype: None
+    if RequestConfig.proxy_pool is not None:
+        return
+
+    if RequestConfig.token_manager is None:
+        RequestConfig.token_manager = TokenManager(fetch_token, token_cache_path, token_ttl)
+
+    RequestConfig.token_manager.get(session)
+
+
+def search_object(session: requests.Session, task: List[str], defer_output: bool = False) -> SearchContext:
+    """
+    Выполняет поиск одного адреса. Всё состояние поиска хранится в отдельном контексте задачи,
+    поэтому функцию можно вызывать одновременно из нескольких потоков с общей сессией.
+
+    :param session: Активная сессия для выполнения запроса.
+    :type session: requests.Session
+    :param task: Адрес, разбитый на элементы.
+    :type task: List[str]
+    :param defer_output: Если True, результат не выводится, а только сохраняется в контексте (для конвейера).
+    :type defer_output: bool
+    :return: Контекст задачи с найденным path и результатом поиска.
+    :rtype: SearchContext
+    """
+    logger.info('Processing address: %s', task)
+    context: SearchContext = SearchContext(task)
+    context.defer_output = defer_output
+    # Список объектов первого уровня запрашивается так же, как остальные уровни (get_address_items):
+    # из локального индекса ГАР или кэша, если ответ там есть, и с проверкой статуса ответа сервера
+    search_response.search_loop(None, search_response.prepare_context(session, context))
+    logger.info('Successfully parsed address: %s', task)
+    return context
+
+
+def is_task_error(error: BaseException, skip_failed: bool) -> bool:
+    """
+    Проверяет, относится ли ошибка только к своей задаче и можно ли продолжить поиск остальных.
+
+    :param error: Ошибка задачи.
+    :type error: BaseException
+    :param skip_failed: Продолжать ли поиск после ошибок отдельных задач.
+    :type skip_failed: bool
+    :return: True, если skip_failed и ошибка не сетевая (адрес не найден, неожиданный ответ сервера).
+    :rtype: bool
+    """
+    return skip_failed and not isinstance(error, requests.exceptions.RequestException)
+
+
+def search_objects(session: requests.Session, task_list: List[List[str]], workers: int = default_workers,
+                   on_result: ResultCallback = None, skip_failed: bool = False) -> None:
+    """
+    Функция для поиска. Отправляет запросы используя метод execute класса RequestConfig.
+    Независимые адреса обрабатываются параллельно в пуле из workers потоков через общую сессию.
+
+    :param session: Активная сессия для выполнения запроса.
+    :type session: requests.Session
+    :param task_list: Список задач, где каждая задача представлена списком строк.
+    :type task_list: list
+    :param workers: Количество потоков. При значении 1 задачи выполняются последовательно.
+    :type workers: int
+    :param on_result: Функция, которой сообщается результат каждой задачи (для журнала).
+    :type on_result: Optional[ResultCallback]
+    :param skip_failed: Если True, ошибка отдельной задачи (адрес не найден, неожиданный ответ) сообщается
+                        через on_result, и поиск продолжается. Сетевые ошибки по-прежнему прерывают поиск.
+    :type skip_failed: bool
+    :return: None
+    :rtype: None
     :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одного из запросов из
     search_sequence
+    """
+
+    if pipeline_enabled:
+        search_objects_pipelined(session, task_list, workers, on_result, skip_failed)
+        return
 
+    logger.info(f'Search process started, workers: {workers}')
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures: dict[Future, List[str]] = {executor.submit(search_object, session, task): task
+                                            for task in task_list}
+        for future in as_completed(futures):
+            try:
+                context: SearchContext = future.result()
+            except (requests.exceptions.RequestException, Exception) as e:
+                if on_result is not None:
+                    on_result(futures[future], None, str(e))
+                if is_task_error(e, skip_failed):
+                    logger.error('Address %s failed: %s', futures[future], e)
+                    continue
+                # Отменяем задачи, которые ещё не начали выполняться, и поднимаем исключение
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise requests.exceptions.RequestException(
+                    f'Parse process failed for address {futures[future]} with error: ' + str(e))
+            if on_result is not None:
+                on_result(futures[future], context.path, None)
+
+    logger.info('Parse process completed successfully')
+
+
+def extract_result(item: tuple) -> tuple:
+    """
+    Стадия конвейера "extract": извлекает записи из результата поиска. Функция верхнего уровня и принимает
+    только сериализуемые данные, поэтому может выполняться в пуле процессов (settings.pipeline_extract_processes).
+    Дочерний процесс не видит изменений модуля json_processing в основном процессе и пишет метрики в свой
+    реестр, поэтому фильтр передаётся в элементе, а время извлечения возвращается для observe_extract.
+
+    :param item: (ключ задачи, path, результат поиска, уже извлечённые записи или None, фильтр по типу объекта).
+    :type item: tuple
+    :return: (ключ задачи, path, записи, время извлечения в секундах или None, если записи уже были извлечены).
+    :rtype: tuple
     """
+    key, path, response_data, records, object_type = item
+    if records is not None:
+        return key, path, records, None
+    started: float = time.perf_counter()
+    records = list(iter_address_records(response_data, object_type))
+    return key, path, records, time.perf_counter() - started
 
-    logger.info('Search process started')
 
-    for task in task_list:
-        logger.info(f'Processing address: {task}')
-        # Устанавливаем текущий адрес для RequestConfig
-        RequestConfig.address = task
+def create_pipeline(stages: List[Stage]) -> Pipeline:
+    """
+    Создаёт конвейер из стадий stages с размером очередей и интервалом статистики из модуля settings.
+
+    :param stages: Стадии конвейера по порядку.
+    :type stages: List[Stage]
+    :return: Конвейер.
+    :rtype: Pipeline
+    """
+    return Pipeline(stages, pipeline_queue_size, pipeline_stats_interval)
+
+
+def search_objects_pipelined(session: requests.Session, task_list: List[List[str]], workers: int = default_workers,
+                             on_result: ResultCallback = None, skip_failed: bool = False) -> None:
+    """
+    Поиск в виде конвейера из трёх стадий, соединённых ограниченными очередями (pipeline.py):
+    "resolve" — спуск по иерархии ФИАС в workers потоках, "extract" — извлечение записей из ответа
+    (в потоках или в пуле процессов), "output" — вывод записей и запись результата в журнал.
+    Пока одни адреса ждут ответа сервера, результаты других разбираются и записываются.
+
+    :param session: Активная сессия для выполнения запроса.
+    :type session: requests.Session
+    :param task_list: Список задач, где каждая задача представлена списком строк.
+    :type task_list: list
+    :param workers: Количество потоков стадии поиска.
+    :type workers: int
+    :param on_result: Функция, которой сообщается результат каждой задачи (для журнала).
+    :type on_result: Optional[ResultCallback]
+    :param skip_failed: Если True, ошибка отдельной задачи сообщается через on_result, и поиск продолжается.
+    :type skip_failed: bool
+    :return: None
+    :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одной из задач
+    """
+    logger.info(f'Pipelined search process started, workers: {workers}')
+
+    def resolve(index: int) -> tuple | None:
+        task: List[str] = task_list[index]
         try:
-            search_response.execute(session)
-            logger.info(f'Successfully parsed address: {RequestConfig.address}')
-        except (requests.exceptions.RequestException, Exception) as e:
-            # Поднимаем исключение с сообщением об ошибке
-            raise requests.exceptions.RequestException('Parse process failed with error: ' + str(e))
+            context: SearchContext = search_object(session, task, defer_output=True)
+        except Exception as e:
+            if on_result is not None:
+                on_result(task, None, str(e))
+            if is_task_error(e, skip_failed):
+                # Задача не передаётся дальше по конвейеру
+                logger.error('Address %s failed: %s', task, e)
+                return None
+            raise requests.exceptions.RequestException(f'Parse process failed for address {task} with error: '
+                                                       + str(e))
+        return index, context.path, context.result, context.records, json_processing.default_filter
+
+    def output(item: tuple) -> None:
+        index, path, records, extract_seconds = item
+        if extract_seconds is not None:
+            observe_extract(records, extract_seconds)
+        save_records(records, task_list[index], path)
+        if on_result is not None:
+            on_result(task_list[index], path, None)
+
+    create_pipeline([
+        Stage('resolve', resolve, workers),
+        Stage('extract', extract_result, pipeline_extract_workers, pipeline_extract_processes),
+        Stage('output', output, pipeline_output_workers),
+    ]).run(range(len(task_list)))
+
+    logger.info('Parse process completed successfully')
+
+
+def search_objects_batched(session: requests.Session, task_list: List[List[str]], workers: int = default_workers,
+                           on_result: ResultCallback = None) -> None:
+    """
+    Пакетный поиск через префиксное дерево. Общие префиксы адресов (регион → город → улица → дом)
+    разрешаются один раз на весь пакет, результаты выводятся по мере готовности узлов.
+
+    :param session: Активная сессия для выполнения запроса.
+    :type session: requests.Session
+    :param task_list: Список задач, где каждая задача представлена списком строк.
+    :type task_list: list
+    :param workers: Количество потоков.
+    :type workers: int
+    :param on_result: Функция, которой сообщается результат каждой задачи (для журнала). Задачи, адрес которых
+                      не найден, сообщаются с ошибкой после разрешения всего дерева.
+    :type on_result: Optional[ResultCallback]
+    :return: None
+    :rtype: None
+    :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одного из запросов
+    """
+
+    logger.info(f'Batched search process started, workers: {workers}')
+    trie: AddressTrie = AddressTrie(task_list, search_response)
+    resolved: set[int] = set()
+
+    # Узлы, переданные в конвейер, по ключу: через стадию извлечения записей передаются только сериализуемые данные
+    nodes: dict[int, AddressTrieNode] = {}
+
+    def resolved_nodes() -> Iterator[tuple]:
+        for resolved_node in trie.resolve(session, workers):  # type: AddressTrieNode
+            nodes[id(resolved_node)] = resolved_node
+            yield id(resolved_node), resolved_node.path, resolved_node.response_data, resolved_node.records, \
+                json_processing.default_filter
+
+    def output(item: tuple) -> None:
+        key, path, records, extract_seconds = item
+        if extract_seconds is not None:
+            observe_extract(records, extract_seconds)
+        node: AddressTrieNode = nodes.pop(key)
+        # Задачи одного узла имеют одинаковый адрес, поэтому записи извлекаются один раз
+        for task in node.tasks:
+            save_records(records, task, path)
+        logger.info('Successfully parsed address: %s (tasks: %d)', node.tasks[0], len(node.tasks))
+        if on_result is not None:
+            for task in node.tasks:
+                resolved.add(id(task))
+                on_result(task, path, None)
+
+    try:
+        if pipeline_enabled:
+            # Разрешение дерева идёт в своих потоках, а извлечение записей и вывод — в стадиях конвейера
+            create_pipeline([
+                Stage('extract', extract_result, pipeline_extract_workers, pipeline_extract_processes),
+                Stage('output', output, pipeline_output_workers),
+            ]).run(resolved_nodes())
         else:
-            # Если запрос успешен, ждем перед следующим заказом
-            logger.info('Parse process completed successfully')
+            for item in resolved_nodes():
+                output(extract_result(item))
+    except (requests.exceptions.RequestException, Exception) as e:
+        raise requests.exceptions.RequestException('Parse process failed with error: ' + str(e))
 
+    # Задачи пропущенных поддеревьев (объект не найден) отмечаются ошибкой
+    if on_result is not None:
+        for task in task_list:
+            if id(task) not in resolved:
+                on_result(task, None, 'Address not found')
 
-def send_requests(session: requests.Session, request_list: List[RequestConfig], max_url_length: int = 100,
-                  url: str = 'Unknown URL') -> None:
+    logger.info('Parse process completed successfully')
+
+
+async def fetch_token_async(client) -> str | None:
+    """
+    Асинхронный вариант fetch_token: выполняет последовательность запросов получения токена через httpx.
+
+    :param client: Асинхронный HTTP-клиент.
+    :type client: httpx.AsyncClient
+    :return: Токен или None, если сервер его не вернул.
+    :rtype: str | None
+    :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одного из запросов
+    """
+    context: SearchContext = SearchContext()
+    for request_config in (initial_response, get_token_response):
+        response = await AsyncRequestConfig(request_config).execute(client, context)
+        if response.status_code != 200:
+            raise requests.exceptions.RequestException(
+                'Token request failed with status code: ' + str(response.status_code))
+    return context.token
+
+
+async def search_objects_async(client, task_list: List[List[str]], on_result: ResultCallback = None,
+                               skip_failed: bool = False) -> None:
+    """
+    Асинхронный поиск. Все задачи запускаются сразу как корутины, количество одновременных
+    HTTP-запросов ограничивает AsyncRequestConfig.semaphore, частоту — RequestConfig.rate_limiter.
+
+    :param client: Асинхронный HTTP-клиент.
+    :type client: httpx.AsyncClient
+    :param task_list: Список задач, где каждая задача представлена списком строк.
+    :type task_list: list
+    :param on_result: Функция, которой сообщается результат каждой задачи (для журнала).
+    :type on_result: Optional[ResultCallback]
+    :param skip_failed: Если True, ошибка отдельной задачи (адрес не найден, неожиданный ответ) сообщается
+                        через on_result, и поиск продолжается. Сетевые ошибки по-прежнему прерывают поиск.
+    :type skip_failed: bool
+    :return: None
+    :raises requests.exceptions.RequestException: Возникает при неудачном выполнении одной из задач
+    """
+    logger.info(f'Async search process started, tasks: {len(task_list)}')
+    config: AsyncRequestConfig = AsyncRequestConfig(search_response)
+
+    async def search(task: List[str]) -> None:
+        logger.info('Processing address: %s', task)
+        context: SearchContext = SearchContext(task)
+        try:
+            # Список объектов первого уровня запрашивается через get_address_items, как в search_object
+            await config.search_loop(None, await config.prepare_context(client, context))
+        except Exception as e:
+            if on_result is not None:
+                on_result(task, None, str(e))
+            if is_task_error(e, skip_failed):
+                logger.error('Address %s failed: %s', task, e)
+                return
+            raise requests.exceptions.RequestException(
+                f'Parse process failed for address {task} with error: ' + str(e))
+        if on_result is not None:
+            on_result(task, context.path, None)
+        logger.info('Successfully parsed address: %s', task)
+
+    # TaskGroup отменяет остальные задачи при первой ошибке, как search_objects
+    try:
+        async with asyncio.TaskGroup() as group:
+            for task in task_list:
+                group.create_task(search(task))
+    except* requests.exceptions.RequestException as errors:
+        raise errors.exceptions[0]
+
+    logger.info('Parse process completed successfully')
+
+
+async def start_async(tasks: Iterable[Task], source: str = None) -> int:
+    """ Запускает обработку задач в асинхронном режиме. Задачи читаются и выполняются частями по task_chunk_size.
+
+    :param tasks: Задачи.
+    :type tasks: Iterable[Task]
+    :param source: Файл задач, если задачи прочитаны из файла. Выполненные по журналу задачи пропускаются.
+    :type source: Optional[str]
+    :return: Количество задач, завершившихся ошибкой.
+    :rtype: int
+    """
+    # Менеджер токена и семафор привязаны к циклу событий, поэтому создаются на каждый запуск.
+    # Токен при этом берётся из того же файла, что и в синхронном режиме.
+    AsyncRequestConfig.token_manager = AsyncTokenManager(fetch_token_async, token_cache_path, token_ttl)
+    AsyncRequestConfig.semaphore = asyncio.Semaphore(async_max_in_flight)
+
+    client = None
+    failures: List[List[str]] = []
+    try:
+        for chunk in iter_chunks(tasks, task_chunk_size):
+            chunk, on_result = prepare_tasks(chunk, source)
+            if not chunk:
+                continue
+            # Клиент и токен нужны, только если есть невыполненные задачи
+            if client is None:
+                client = get_async_client(session_headers, proxy_url, async_max_in_flight)
+                await AsyncRequestConfig.token_manager.get_async(client)
+            await search_objects_async(client, chunk, count_failures(on_result, failures), skip_failed=True)
+    finally:
+        if client is not None:
+            await client.aclose()
+
+    if client is None:
+        logger.info('All tasks are already done')
+    report_metrics()
+    return count_tasks(failures)
+
+
+def send_requests(session: requests.Session, request_list: List[RequestConfig], context: SearchContext = None,
+                  max_url_length: int = 100, url: str = 'Unknown URL') -> None:
     """
     Выполняет последовательность HTTP-запросов, используя requests.Session.
 
     Функция проходит по списку запросов, выполняя их через сессию.
     Логирует успешные и неуспешные запросы, ограничивает длину URL до max_url_length.
-    При возникновении ошибки запросов вызывает исключение и перезапускает скрипт.
+    Временные ошибки повторяются внутри RequestConfig.execute, при окончательной ошибке поднимается исключение.
 
     :param session: Активная сессия для выполнения запросов.
     :type session: requests.Session
     :param request_list: Список объектов RequestConfig с конфигурациями запросов.
     :type request_list: List[RequestConfig]
+    :param context: Общий контекст последовательности, в него методы запросов сохраняют результаты (токен).
+    :type context: Optional[SearchContext]
     :param max_url_length: Максимальная длина отображаемого URL для логирования (по умолчанию 100).
     :type max_url_length: int
     :param url: URL для логирования в случае отсутствия URL в запросе.
@@ -129,7 +783,7 @@ def send_requests(session: requests.Session, request_list: List[RequestConfig],
         try:
             # Выполняем запрос используя параметры запросов из объектов класса RequestConfig и метод
             # RequestConfig.execute
-            response: requests.Response = request_config.execute(session)
+            response: requests.Response = request_config.execute(session, context)
             # Проверяем наличие URL в конфигурации запроса. Используется в логах.
             url: str = request_config.url if hasattr(request_config, 'url') else 'Unknown URL'
 
@@ -139,7 +793,7 @@ def send_requests(session: requests.Session, request_list: List[RequestConfig],
 
             # Проверяем, является ли статус-код успешным
             if response.status_code == 200:
-                logger.info(f'{response.status_code} Request successful {url}')
+                logger.debug('%s Request successful %s', response.status_code, url)
             else:
                 # Логируем и вызываем исключение, если запрос неуспешен
                 response_text: str = response.text if hasattr(response, 'text') else 'No response text'
@@ -149,78 +803,448 @@ def send_requests(session: requests.Session, request_list: List[RequestConfig],
                     'Request failed with status code: ' + str(response.status_code))
 
         except requests.exceptions.RequestException as e:
-            # Логируем ошибку и поднимаем исключение с дополнительной информацией
+            # Логируем ошибку и поднимаем исключение с дополнительной информацией.
+            # Временные ошибки к этому моменту уже повторены RequestConfig.retry_policy.
             logger.error(f"Request failed {url} with error: {e}")
+            raise
 
-            main()  # Перезапускаем скрипт
 
+def fetch_cadastral_number(session: requests.Session, number: str) -> dict | None:
+    """
+    Ищет объект по кадастровому номеру на сервере ФИАС. Найденный объект записывается в индекс кадастровых номеров.
 
-def read_tasks() -> List[List[str]] | None:
+    :param session: Активная сессия для выполнения запроса.
+    :type session: requests.Session
+    :param number: Кадастровый номер.
+    :type number: str
+    :return: Найденный объект (object_id, path, адрес и тип) или None, если сервер его не нашёл.
+    :rtype: dict | None
+    :raises requests.exceptions.HTTPError: Если сервер вернул ошибку.
     """
-    Читает файл, где каждая строка представляет адрес, разделенный запятыми,
-    и возвращает список списков с элементами адреса.
+    context: SearchContext = cadastral_search_response.prepare_context(session)
+    response: requests.Response = cadastral_search_response.send(
+        context.session, 'GET', context.headers, params={"search_string": number, "address_type": 2})
+    response.raise_for_status()
+
+    # Поиск по строке может вернуть и похожие объекты, нужны только объекты с этим кадастровым номером
+    addresses: List[dict] = [
+        address for address in json_processing.json_loads(response.content).get('addresses', [])
+        if normalize_cadastral_number(address.get('address_details', {}).get('cadastral_number') or '') == number
+    ]
+    if not addresses:
+        return None
+    RequestConfig.cadastral_index.add_addresses(addresses)
+    return RequestConfig.cadastral_index.lookup([number]).get(number)
 
-    :return: Список задач, где каждая задача представлена списком строк.
+
+def lookup_cadastral(path: str, columns: List[str] = tasks_columns) -> None:
     """
-    logger.info('Reading tasks from file')
-    tasks: List[List[str]] = []
+    Пакетный поиск адресов по кадастровым номерам. Номера читаются из файла задач (txt — номер в каждой строке,
+    csv и jsonl — номер в колонке columns) частями по task_chunk_size. Номера, которые уже есть в индексе
+    кадастровых номеров, находятся без обращения к сети, остальные ищутся на сервере в workers потоках.
+    Результат выводится через json_processing.save_records, задачей считается исходный номер.
+
+    :param path: Файл с кадастровыми номерами.
+    :type path: str
+    :param columns: Колонка с кадастровым номером для файлов csv и jsonl.
+    :type columns: Optional[List[str]]
+    :return: None
+    """
+    tasks: Iterator[Task] | None = read_tasks(path, columns)
+    if tasks is None:
+        return
+    if RequestConfig.cadastral_index is None:
+        RequestConfig.cadastral_index = CadastralIndex(cadastral_index_path)
+
+    session: requests.Session | None = None
+    counts: dict = {'index': 0, 'server': 0, 'not found': 0}
+    for chunk in iter_chunks(tasks, task_chunk_size):
+        # Одинаковые номера ищутся один раз, результат записывается для каждой строки
+        numbers: dict[str, List[Task]] = {}
+        for task in chunk:
+            numbers.setdefault(normalize_cadastral_number(''.join(task)), []).append(task)
+        found: dict[str, dict] = RequestConfig.cadastral_index.lookup(numbers)
+        counts['index'] += len(found)
+
+        unknown: List[str] = [number for number in numbers if number not in found]
+        if unknown:
+            # Сессия и токен нужны, только если каких-то номеров нет в индексе
+            if session is None:
+                session = get_session()
+                get_token(session)
+            with ThreadPoolExecutor(max_workers=max(1, default_workers)) as executor:
+                for number, item in zip(unknown, executor.map(lambda n: fetch_cadastral_number(session, n),
+                                                              unknown)):
+                    if item is None:
+                        counts['not found'] += 1
+                        logger.warning(f'Cadastral number {number} not found')
+                        continue
+                    counts['server'] += 1
+                    found[number] = item
+
+        for number, item in found.items():
+            for task in numbers[number]:
+                save_records([{"Кадастровый номер": number, "Адрес": item['address'], "Тип": item['type']}],
+                             task=task)
+
+    logger.info(f'Cadastral lookup finished: {counts}')
+    report_metrics()
+
+
+def read_tasks(path: str = tasks_path, columns: List[str] = tasks_columns) -> Iterator[Task] | None:
+    """
+    Открывает файл задач для потокового чтения (task_reader.iter_tasks): задачи читаются по мере обработки,
+    файл целиком в память не загружается. Поддерживаются форматы txt (адрес через запятую в каждой строке),
+    csv и jsonl (адрес собирается из колонок columns).
+
+    :param path: Путь к файлу задач.
+    :type path: str
+    :param columns: Колонки с элементами адреса для csv и jsonl.
+    :type columns: Optional[List[str]]
+    :return: Итератор по задачам или None, если файла нет или он пуст.
+    :rtype: Iterator[Task] | None
+    """
+    logger.info(f'Reading tasks from file {path}')
     try:
-        with open('tasks.txt', 'r', encoding='utf-8') as file:
-            for line in file:  # Читаем каждую строку
-                # Разбиваем строку на элементы, разделитель - запятая
-                task: List[str] = [element.strip() for element in line.strip().split(',')]
-                tasks.append(task)
+        tasks: Iterator[Task] = iter_tasks(path, columns)
+        first: Task | None = next(tasks, None)
     except FileNotFoundError:
-        logger.error("File 'tasks.txt' not found.")
+        logger.error(f"File '{path}' not found.")
+        return None
+    except (ValueError, KeyError) as e:
+        logger.error(f"File '{path}' can not be read: {e}")
         return None
 
-    if not tasks:
-        logger.error("File 'tasks.txt' is empty.")
+    if first is None:
+        logger.error(f"File '{path}' is empty.")
         return None
-    else:
-        logger.info(f"{len(tasks)} tasks read from file")
-        return tasks
+    return itertools.chain([first], tasks)
 
 
-def main() -> None:
+def run_batch(tasks_file: str = tasks_path, columns: List[str] = tasks_columns, use_async: bool = False,
+              workers: int = default_workers) -> int:
+    """ Обрабатывает файл задач без вопросов пользователю (ключ запуска --batch): для планировщика, контейнеров
+    и скриптов. В отличие от main не ждёт нажатия клавиши и работает не только в Windows.
+
+    :param tasks_file: Файл задач или '-' — задачи из стандартного ввода (журнал выполнения для них не ведётся).
+    :type tasks_file: str
+    :param columns: Колонки с элементами адреса для файлов csv и jsonl.
+    :type columns: Optional[List[str]]
+    :param use_async: Если True, задачи обрабатываются в асинхронном режиме (start_async).
+    :type use_async: bool
+    :param workers: Количество потоков.
+    :type workers: int
+    :return: Код завершения: 0 — все задачи выполнены, 1 — задач нет, обработка прервана ошибкой
+             или часть задач не выполнена (например, адрес не найден).
+    :rtype: int
+    """
+    tasks: Iterable[Task] | None = read_tasks(tasks_file, columns)
+    if tasks is None:
+        return 1
+    source: str | None = os.path.abspath(tasks_file) if tasks_file != STDIN else None
+
+    try:
+        if use_async:
+            failed: int = asyncio.run(start_async(tasks, source))
+        else:
+            failed: int = start(tasks, source, workers)
+    except requests.exceptions.RequestException as e:
+        logger.error(f'Processing failed with error: {e}')
+        return 1
+
+    if source is not None and task_journal is not None:
+        logger.info(f'Task journal: {task_journal.counts(source)}')
+    if failed:
+        logger.error(f'Tasks failed: {failed}')
+        return 1
+    return 0
+
+
+def main(use_async: bool = False, tasks_file: str = tasks_path, columns: List[str] = tasks_columns,
+         workers: int = default_workers) -> None:
     """ Запускает скрипт. Позволяет пользователю выбрать обработку задач из файла или ввод адреса вручную.
 
+    :param use_async: Если True, задачи обрабатываются в асинхронном режиме (start_async).
+    :type use_async: bool
+    :param tasks_file: Файл задач.
+    :type tasks_file: str
+    :param columns: Колонки с элементами адреса для файлов csv и jsonl.
+    :type columns: Optional[List[str]]
+    :param workers: Количество потоков.
+    :type workers: int
     :return: None
     """
+    # msvcrt есть только в Windows и нужен только для выбора задач с клавиатуры, поэтому импортируется здесь:
+    # остальные функции модуля (бенчмарки, поиск по кадастровым номерам) работают и в других системах
+    import msvcrt
+
     while True:
         print("Нажмите любую кнопку для обработки задач из файла или Escape для ввода адреса вручную.")
         key: bytes = msvcrt.getch()  # Возвращает один символ, считанный с клавиатуры, в виде байтового объекта
+        source: str | None = None  # Файл задач, по нему ведётся журнал выполнения
         if key == b'\x1b':  # Если нажата клавиша Escape, то пользователь может ввести адрес вручную
-            tasks: List[List[str]] = []
             user_input: str = input("Введите адрес: ")
-            if user_input == '':  # Если ввод пустой строки, возвращаемся к началу цикла.
+            if user_input == '':  # Если ввод пустой строки, возвращаемся к началу цикла.
                 logger.error("Input is empty.")
                 continue
 
             # Разбиваем строку на элементы, разделитель - запятая
-            task = [element.strip() for element in user_input.strip().split(',')]
-            tasks.append(task)  # Добавляем задачу в список задач
-            start(tasks)  # Запускаем обработку задач
+            tasks: Iterable[Task] = [Task.from_line(user_input)]
         else:  # Если нажата какая-то другая клавиша, то обрабатываем задачи из файла
-            tasks: List[List[str]] = read_tasks()  # Читаем задачи из файла
-            if tasks is None:  # Если список задач пустой, возвращаемся к началу цикла.
+            tasks: Iterable[Task] = read_tasks(tasks_file, columns)  # Открываем файл задач
+            if tasks is None:  # Если список задач пустой, возвращаемся к началу цикла.
                 continue
+            source = os.path.abspath(tasks_file)
+
+        try:
+            if use_async:
+                asyncio.run(start_async(tasks, source))  # Запускаем обработку задач в асинхронном режиме
             else:
-                start(tasks)  # Запускаем обработку задач
+                start(tasks, source, workers)  # Запускаем обработку задач
+        except requests.exceptions.RequestException as e:
+            # Ошибка, оставшаяся после повторов, не перезапускает скрипт рекурсивно:
+            # сообщаем о ней и возвращаемся к выбору задач. Выполненные задачи уже записаны в журнал,
+            # при следующем запуске обработка продолжится с невыполненных.
+            logger.error(f'Processing failed with error: {e}')
+
+        if source is not None and task_journal is not None:
+            logger.info(f'Task journal: {task_journal.counts(source)}')
+
+
+def start(tasks: Iterable[Task], source: str = None, workers: int = default_workers) -> int:
+    """ Запускает обработку задач. Задачи читаются и выполняются частями по task_chunk_size,
+    дубликаты внутри части ищутся один раз.
+
+    :param tasks: Задачи.
+    :type tasks: Iterable[Task]
+    :param source: Файл задач, если задачи прочитаны из файла. Выполненные по журналу задачи пропускаются.
+    :type source: Optional[str]
+    :param workers: Количество потоков (на каждый прокси, если задан пул прокси).
+    :type workers: int
+    :return: Количество задач, завершившихся ошибкой (например, адрес не найден).
+    :rtype: int
+    """
+
+    workers = configure_proxy_pool(workers)  # Подключаем пул прокси, если задан список прокси
+    session: requests.Session | None = None
+    failures: List[List[str]] = []
+
+    for chunk in iter_chunks(tasks, task_chunk_size):
+        # Задачи, выполненные в прошлых запусках, пропускаются без обращения к сети
+        chunk, on_result = prepare_tasks(chunk, source)
+        if not chunk:
+            continue
 
+        # Сессия и токен нужны, только если есть невыполненные задачи
+        if session is None:
+            session = get_session(workers)  # Получаем активную сессию
+            get_token(session)  # Получаем токен
 
-def start(tasks: List[List[str]]) -> None:
-    """ Запускает обработку задач.
+        # Обрабатываем задачи. Ненайденный адрес отмечается ошибкой своей задачи, как в префиксном дереве,
+        # а сетевая ошибка прерывает обработку
+        search_chunk(session, chunk, workers, count_failures(on_result, failures), skip_failed=True)
 
-    :param tasks: Список задач, где каждая задача представлена списком строк.
-    :type tasks: list
+    if session is None:
+        logger.info('All tasks are already done')
+
+    if RequestConfig.proxy_pool is not None:
+        RequestConfig.proxy_pool.log_stats()
+    if RequestConfig.local_resolver is not None:
+        logger.info(f'Local GAR index: {RequestConfig.local_resolver.hits} requests answered locally, '
+                    f'{RequestConfig.local_resolver.misses} sent to the server')
+    report_metrics()
+    return count_tasks(failures)
+
+
+def search_chunk(session: requests.Session, chunk: List[Task], workers: int, on_result: ResultCallback = None,
+                 skip_failed: bool = False) -> None:
+    """
+    Выполняет часть задач: через префиксное дерево, если оно включено и задач больше одной, иначе по одной.
+
+    :param session: Активная сессия.
+    :type session: requests.Session
+    :param chunk: Задачи.
+    :type chunk: List[Task]
+    :param workers: Количество потоков.
+    :type workers: int
+    :param on_result: Функция, которой сообщается результат каждой задачи (для журнала).
+    :type on_result: Optional[ResultCallback]
+    :param skip_failed: Если True, ошибки отдельных задач сообщаются через on_result и не прерывают поиск.
+                        Префиксное дерево и так пропускает ненайденные адреса.
+    :type skip_failed: bool
+    :return: None
+    :raises requests.exceptions.RequestException: Возникает при неудачном выполнении задачи
+    """
+    if use_prefix_trie and len(chunk) > 1:
+        search_objects_batched(session, chunk, workers, on_result)  # Обрабатываем задачи через префиксное дерево
+    else:
+        search_objects(session, chunk, workers, on_result, skip_failed)
+
+
+def get_worker_name() -> str:
+    """
+    Имя обработчика общей очереди задач: имя машины и номер процесса.
+
+    :rtype: str
+    """
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_queue_worker(queue_path: str, tasks_file: str = tasks_path, columns: List[str] = tasks_columns,
+                     worker: str = None, workers: int = default_workers) -> None:
+    """
+    Обработчик общей очереди задач (work_queue.py). Загружает файл задач в очередь, если его там ещё нет,
+    затем забирает части задач с арендой и выполняет их, пока в очереди не останется ни свободных,
+    ни арендованных частей. Аренда продлевается, пока часть выполняется.
+
+    Результат каждой задачи записывается в очередь. Ошибка отдельной задачи (адрес не найден) не прерывает
+    часть; при сетевой ошибке часть возвращается в очередь, и при повторе выполняются только задачи без
+    записанного результата, поэтому записи уже выведенных задач не дублируются.
+
+    Журнал выполнения (task_journal) в этом режиме не используется: состояние задач хранится в очереди.
+
+    :param queue_path: База очереди на общем диске.
+    :type queue_path: str
+    :param tasks_file: Файл задач. Очередь различает файлы по имени без папки, поэтому на разных машинах
+                       файл может лежать в разных местах.
+    :type tasks_file: str
+    :param columns: Колонки с элементами адреса для файлов csv и jsonl.
+    :type columns: Optional[List[str]]
+    :param worker: Имя обработчика. Если не передано, используется get_worker_name().
+    :type worker: Optional[str]
+    :param workers: Количество потоков (на каждый прокси, если задан пул прокси).
+    :type workers: int
     :return: None
     """
+    worker = worker or get_worker_name()
+    queue: WorkQueue = WorkQueue(queue_path, queue_lease_time, queue_max_attempts)
+    if os.path.exists(tasks_file):
+        queue.enqueue(os.path.basename(tasks_file), iter_tasks(tasks_file, columns), queue_chunk_size)
+
+    workers = configure_proxy_pool(workers)
+    session: requests.Session | None = None
+    completed: int = 0
+    logger.info(f'Queue worker {worker} started: {queue_path}')
+    try:
+        while True:
+            claimed: Tuple[int, List[Task]] | None = queue.claim(worker)
+            if claimed is None:
+                if queue.is_finished():
+                    break
+                # Остальные части обрабатываются другими обработчиками: ждём, не истечёт ли чья-то аренда
+                time.sleep(queue_poll_interval)
+                continue
+
+            chunk_id, chunk = claimed
+            # Задачи, результат которых записан в прошлой попытке, не выполняются повторно
+            finished: Set[int] = queue.finished_lines(chunk_id)
+            tasks: List[Task] = prepare_tasks([task for task in chunk if task.line_number not in finished], None)[0]
+            if session is None and tasks:
+                session = get_session(workers)
+                get_token(session)
+            logger.info(f'Worker {worker} processing chunk {chunk_id} ({len(tasks)} of {len(chunk)} tasks)')
+
+            def on_result(task: Task, path: str | None, error: str | None) -> None:
+                queue.record(chunk_id, [source_task.line_number for source_task in task.all_tasks()], path, error)
+
+            with LeaseKeeper(queue, chunk_id, worker):
+                try:
+                    if tasks:
+                        search_chunk(session, tasks, workers, on_result, skip_failed=True)
+                except requests.exceptions.RequestException as e:
+                    logger.error(f'Chunk {chunk_id} failed: {e}')
+                    queue.fail(chunk_id, worker, str(e))
+                    continue
+            queue.complete(chunk_id, worker)
+            completed += 1
+    finally:
+        logger.info(f'Queue worker {worker} finished, chunks completed: {completed}, queue: {queue.counts()}, '
+                    f'tasks: {queue.task_counts()}')
+        queue.close()
+        report_metrics()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
 
-    session = get_session()  # Получаем активную сессию
-    get_token(session)  # Получаем токен
-    search_objects(session, tasks)  # Обрабатываем задачи
+    :return: Аргументы командной строки.
+    :rtype: argparse.Namespace
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Парсер ФИАС')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать кэш ответов')
+    parser.add_argument('--refresh', action='store_true', help='заново запросить ответы и обновить кэш')
+    parser.add_argument('--tasks', default=tasks_path,
+                        help='файл задач: txt, csv или jsonl; "-" — задачи из стандартного ввода (включает --batch)')
+    parser.add_argument('--batch', action='store_true',
+                        help='обработать файл задач без вопросов и завершиться (для планировщика и скриптов)')
+    parser.add_argument('--workers', type=int, default=default_workers,
+                        help='количество потоков поиска (на каждый прокси, если задан пул прокси)')
+    parser.add_argument('--filter', dest='object_type', default=object_type_filter,
+                        help="тип объектов в выводе: 'Помещение', 'Квартира' или all")
+    parser.add_argument('--columns', type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+                        default=tasks_columns, help='колонки с элементами адреса для csv и jsonl через запятую')
+    parser.add_argument('--restart', action='store_true',
+                        help='забыть журнал выполнения и обработать tasks.txt заново целиком')
+    parser.add_argument('--output', type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+                        help='способы вывода через запятую: csv, jsonl, sqlite, parquet, excel, table')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='асинхронный режим: сотни поисков одновременно в одном потоке (нужен httpx)')
+    parser.add_argument('--no-local-index', action='store_true',
+                        help='не использовать локальный индекс ГАР, все запросы отправлять на сервер')
+    parser.add_argument('--incremental', action='store_true',
+                        help='выводить только изменившиеся дома и записать изменения помещений в output/changes-*.csv; '
+                             'задачи из файла выполняются заново, как с --restart')
+    parser.add_argument('--lookup-cadastral', metavar='FILE',
+                        help='найти адреса по кадастровым номерам из файла '
+                             '(номер в каждой строке или в колонке --columns)')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='выгружать метрики производительности в файл после каждого пакета задач: '
+                             '.prom — формат Prometheus, иначе JSON')
+    parser.add_argument('--profile', action='store_true',
+                        help='выполнить запуск под cProfile и tracemalloc и записать отчёты в папку вывода')
+    parser.add_argument('--log-level', type=str.upper, choices=LOG_LEVELS, default=log_level.upper(),
+                        help='уровень логирования')
+    parser.add_argument('--log-format', choices=['text', 'json'], default=log_format,
+                        help='формат лога: text или json (строка JSON на каждую запись)')
+    parser.add_argument('--queue', metavar='DB',
+                        help='обработчик общей очереди задач на общем диске: загрузить --tasks в очередь '
+                             '(если ещё не загружен) и выполнять части задач вместе с другими обработчиками')
+    parser.add_argument('--fias-url', metavar='URL',
+                        help='отправлять запросы на другой сервер, например на локальный заменитель ФИАС '
+                             '(mock_fias.py): http://127.0.0.1:8080')
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    main()
+    arguments: argparse.Namespace = parse_args()
+    exit_code: int = 0
+    configure_logging(arguments.log_level, arguments.log_format == 'json')
+    if arguments.fias_url:
+        use_base_url(arguments.fias_url)
+    configure_cache(arguments.no_cache, arguments.refresh)
+    configure_local_index(arguments.no_local_index)
+    configure_cadastral_index()
+    # Инкрементальный запуск заново проверяет все дома, поэтому журнал выполнения начинается сначала
+    configure_journal(arguments.restart or arguments.incremental, arguments.tasks)
+    # В режиме общей очереди у каждого обработчика свои файлы вывода в общей папке
+    worker_name: str = get_worker_name()
+    configure_output(arguments.output, f'results-{worker_name}' if arguments.queue else 'results')
+    configure_filter(arguments.object_type)
+    if arguments.incremental:
+        configure_incremental()
+    configure_metrics(arguments.metrics)
+    try:
+        with profile_run(output_dir) if arguments.profile else contextlib.nullcontext():
+            if arguments.lookup_cadastral:
+                lookup_cadastral(arguments.lookup_cadastral, arguments.columns)
+            elif arguments.queue:
+                run_queue_worker(arguments.queue, arguments.tasks, arguments.columns, worker_name,
+                                 arguments.workers)
+            elif arguments.batch or arguments.tasks == STDIN:
+                exit_code = run_batch(arguments.tasks, arguments.columns, arguments.use_async, arguments.workers)
+            else:
+                main(arguments.use_async, arguments.tasks, arguments.columns, arguments.workers)
+    finally:
+        close_output()
+    sys.exit(exit_code)
@@ -0,0 +1,364 @@
+"""
+Метрики производительности парсера и режим профилирования.
+
+Модули парсера записывают в общий реестр registry время запросов по запросам ФИАС и уровням иерархии,
+объём полученных данных, количество кандидатов при поиске по названию, попадания в кэш и повторы.
+Сводка выводится в лог по завершении пакета задач, а полные данные можно выгрузить в файл
+в текстовом формате Prometheus (.prom) или в JSON (ключ запуска --metrics).
+
+Режим профилирования (ключ запуска --profile) выполняет запуск под cProfile и tracemalloc
+и записывает отчёты в папку вывода.
+"""
+import bisect
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Префикс имён метрик в выгрузке Prometheus
+PREFIX = 'fias_parser_'
+
+# Границы интервалов гистограмм времени, секунды
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Границы интервалов гистограмм количества (кандидатов, записей)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+
+# Ключ метрики: имя и отсортированные пары меток
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами интервалов, как в Prometheus: хранит только количество значений
+    в каждом интервале, сумму и максимум, поэтому память не растёт с количеством наблюдений.
+
+    Attributes:
+    buckets Tuple[float]: Верхние границы интервалов.
+    counts List[int]: Количество значений в каждом интервале (последний — больше всех границ).
+    count int: Количество значений.
+    total float: Сумма значений.
+    maximum float: Наибольшее значение.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Оценка квантиля: линейная интерполяция внутри интервала, в который он попадает.
+
+        :param fraction: Доля от 0 до 1 (0.5 — медиана, 0.99 — 99-й процентиль).
+        :type fraction: float
+        :rtype: float
+        """
+        if not self.count:
+            return 0.0
+        rank: float = fraction * self.count
+        seen: int = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower: float = self.buckets[index - 1] if index > 0 else 0.0
+                upper: float = self.buckets[index] if index < len(self.buckets) else self.maximum
+                return min(lower + (upper - lower) * (rank - seen) / count, self.maximum)
+            seen += count
+        return self.maximum
+
+
+class Metrics:
+    """
+    Реестр метрик: счётчики и гистограммы с метками (например, запрос ФИАС и уровень иерархии).
+    Все методы потокобезопасны. Если реестр выключен (enabled = False), наблюдения не записываются.
+
+    Methods:
+        increment(name: str, value: float = 1, **labels) -> None:
+        Увеличивает счётчик.
+
+        observe(name: str, value: float, buckets: Tuple[float] = LATENCY_BUCKETS, **labels) -> None:
+        Записывает значение в гистограмму.
+
+        observe_since(name: str, started: float, **labels) -> None:
+        Записывает в гистограмму время, прошедшее с момента started.
+
+        summary() -> str:
+        Сводка для лога.
+
+        export(path: str) -> None:
+        Выгружает метрики в файл Prometheus (.prom) или JSON.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counters: Dict[MetricKey, float] = {}
+        self.histograms: Dict[MetricKey, Histogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name: str, labels: dict) -> MetricKey:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Увеличивает счётчик name с метками labels на value.
+
+        :return: None
+        """
+        if not self.enabled:
+            return
+        key: MetricKey = self.make_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels) -> None:
+        """
+        Записывает значение value в гистограмму name с метками labels.
+
+        :param buckets: Границы интервалов, используются при первом наблюдении.
+        :return: None
+        """
+        if not self.enabled:
+            return
+        key: MetricKey = self.make_key(name, labels)
+        with self._lock:
+            histogram: Histogram | None = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_since(self, name: str, started: float, **labels) -> None:
+        """
+        Записывает в гистограмму name время, прошедшее с started (значение time.perf_counter()).
+
+        :return: None
+        """
+        self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """
+        Записывает время выполнения блока with в гистограмму name.
+        """
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    @staticmethod
+    def format_key(key: MetricKey) -> str:
+        name, labels = key
+        return name + ('{' + ','.join(f'{label}="{value}"' for label, value in labels) + '}' if labels else '')
+
+    def summary(self) -> str:
+        """
+        Сводка для лога: для гистограмм — количество, среднее, p50, p99 и максимум, для счётчиков — значение.
+
+        :rtype: str
+        """
+        lines: List[str] = []
+        with self._lock:
+            for key in sorted(self.histograms):
+                histogram: Histogram = self.histograms[key]
+                lines.append(f'{self.format_key(key)}: count {histogram.count}, '
+                             f'avg {histogram.total / histogram.count:.4g}, p50 {histogram.quantile(0.5):.4g}, '
+                             f'p99 {histogram.quantile(0.99):.4g}, max {histogram.maximum:.4g}')
+            for key in sorted(self.counters):
+                lines.append(f'{self.format_key(key)}: {self.counters[key]:g}')
+        return '\n'.join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        Метрики в текстовом формате Prometheus (для node_exporter textfile collector).
+
+        :rtype: str
+        """
+        lines: List[str] = []
+        typed: set = set()
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f'# TYPE {PREFIX}{name} counter')
+                lines.append(f'{PREFIX}{self.format_key((name, labels))} {value:g}')
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f'# TYPE {PREFIX}{name} histogram')
+                cumulative: int = 0
+                for bound, count in zip([*histogram.buckets, '+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}{self.format_key((name + "_bucket", labels + (("le", f"{bound}"),)))} '
+                                 f'{cumulative}')
+                lines.append(f'{PREFIX}{self.format_key((name + "_sum", labels))} {histogram.total:g}')
+                lines.append(f'{PREFIX}{self.format_key((name + "_count", labels))} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> dict:
+        """
+        Метрики в виде словаря для выгрузки в JSON.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count,
+                                "sum": histogram.total, "max": histogram.maximum,
+                                "p50": histogram.quantile(0.5), "p90": histogram.quantile(0.9),
+                                "p99": histogram.quantile(0.99),
+                                "buckets": dict(zip([*map(str, histogram.buckets), '+Inf'], histogram.counts))}
+                               for (name, labels), histogram in sorted(self.histograms.items())],
+            }
+
+    def export(self, path: str) -> None:
+        """
+        Выгружает метрики в файл: текстовый формат Prometheus для расширения .prom, иначе JSON.
+        Файл записывается через временный, поэтому сборщик метрик не прочитает его наполовину записанным.
+
+        :param path: Путь к файлу.
+        :type path: str
+        :return: None
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        content: str = self.to_prometheus() if path.endswith('.prom') \
+            else json.dumps(self.to_json(), ensure_ascii=False, indent=2)
+        temporary_path: str = f'{path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+        logger.info(f'Metrics exported: {path}')
+
+
+# Общий реестр метрик парсера
+registry: Metrics = Metrics()
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Имя запроса ФИАС для меток метрик: последняя часть пути URL без параметров (GetAddressItems, ...).
+
+    :param url: URL запроса.
+    :type url: str
+    :rtype: str
+    """
+    return url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def get_response_size(response, streamed: bool = False) -> int:
+    """
+    Размер тела ответа в байтах. Тело потокового ответа ещё не прочитано, поэтому для него
+    используется заголовок Content-Length (0, если сервер его не передал).
+
+    :param response: Ответ requests или httpx.
+    :param streamed: Ответ получен в потоковом режиме.
+    :type streamed: bool
+    :rtype: int
+    """
+    if streamed:
+        return int(response.headers.get('Content-Length') or 0)
+    return len(response.content)
+
+
+def get_level(path: str | None) -> int:
+    """
+    Уровень запроса GetAddressItems: количество ID в path (0 — список объектов первого уровня).
+
+    :param path: Строка из ID объектов, разделённых точкой.
+    :type path: Optional[str]
+    :rtype: int
+    """
+    return path.count('.') + 1 if path else 0
+
+
+@contextmanager
+def profile_run(output_dir: str = 'output', top: int = 50) -> Iterator[None]:
+    """
+    Выполняет блок with под cProfile и tracemalloc и записывает отчёты в output_dir:
+    profile-<время>.prof (статистика cProfile для pstats и snakeviz), profile-<время>.txt (top функций
+    по суммарному времени) и memory-<время>.txt (пик памяти и top строк по выделенной памяти).
+
+    До Python 3.12 cProfile профилирует каждый поток отдельно, поэтому профилировщик устанавливается и в потоки,
+    созданные внутри блока (потоки поиска), а их статистика объединяется.
+
+    :param output_dir: Папка для отчётов.
+    :type output_dir: str
+    :param top: Количество строк в текстовых отчётах.
+    :type top: int
+    """
+    profilers: List[cProfile.Profile] = []
+    profilers_lock: threading.Lock = threading.Lock()
+
+    def enable_in_thread(*_) -> None:
+        # Вызывается при первом событии в новом потоке: профилировщик потока заменяет эту функцию
+        profiler: cProfile.Profile = cProfile.Profile()
+        with profilers_lock:
+            profilers.append(profiler)
+        profiler.enable()
+
+    main_profiler: cProfile.Profile = cProfile.Profile()
+    tracemalloc.start(10)
+    # Начиная с Python 3.12 cProfile использует sys.monitoring и сам видит вызовы во всех потоках,
+    # а второй профилировщик включить нельзя
+    per_thread: bool = sys.version_info < (3, 12)
+    if per_thread:
+        threading.setprofile(enable_in_thread)
+    started: float = time.perf_counter()
+    main_profiler.enable()
+    try:
+        yield
+    finally:
+        main_profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+        elapsed: float = time.perf_counter() - started
+        snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        os.makedirs(output_dir, exist_ok=True)
+        stamp: str = time.strftime('%Y%m%d-%H%M%S')
+        stats: pstats.Stats = pstats.Stats(main_profiler)
+        with profilers_lock:
+            if profilers:
+                stats.add(*profilers)
+        profile_path: str = os.path.join(output_dir, f'profile-{stamp}.prof')
+        stats.dump_stats(profile_path)
+        with open(os.path.join(output_dir, f'profile-{stamp}.txt'), 'w', encoding='utf-8') as file:
+            file.write(f'Wall time: {elapsed:.3f} s, threads profiled: {len(profilers) + 1}\n\n')
+            stats.stream = file
+            stats.sort_stats('cumulative').print_stats(top)
+            stats.sort_stats('tottime').print_stats(top)
+        with open(os.path.join(output_dir, f'memory-{stamp}.txt'), 'w', encoding='utf-8') as file:
+            file.write(f'Peak traced memory: {peak / 1024 / 1024:.1f} MiB, '
+                       f'at exit: {current / 1024 / 1024:.1f} MiB\n\n')
+            for statistic in snapshot.statistics('lineno')[:top]:
+                file.write(f'{statistic}\n')
+        logger.info(f'Profile written to {output_dir}: profile-{stamp}.prof, profile-{stamp}.txt, '
+                    f'memory-{stamp}.txt (peak memory {peak / 1024 / 1024:.1f} MiB)')
@@ -0,0 +1,507 @@
+"""
+Локальный заменитель сервера ФИАС для бенчмарков и проверок без обращения к fias.nalog.ru.
+
+Сервер отвечает на те же запросы, что и настоящий: /ExtendedSearch, /Home/GetSpasSettings
+и /api/spas/v2.0/GetAddressItems. Ответы строятся по синтетической иерархии (регион → город → улица → дом →
+помещения) или берутся из записанного кэша ответов (response_cache.py). Задержка ответа, доля ошибок
+и ограничение частоты запросов (429 с Retry-After) настраиваются.
+
+    python mock_fias.py --port 8080 --latency 0.05 --error-rate 0.01 --rate-limit 50
+    python main.py --fias-url http://127.0.0.1:8080
+
+Нагрузочный бенчмарк поверх сервера: python benchmarks.py load
+"""
+import argparse
+import collections
+import functools
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Уровни синтетической иерархии: (object_level_id, type_name, краткое название, полное название)
+LEVELS = [
+    (1, 'Область', '{name} обл.', '{name} область'),
+    (5, 'Город', 'г. {name}', 'город {name}'),
+    (8, 'Улица', 'ул. {name}', 'улица {name}'),
+    (10, 'Дом', 'д. {number}', 'дом {number}'),
+    (11, 'Помещение', 'кв. {number}', 'квартира {number}'),
+]
+
+# Буквы для генерации названий
+LETTERS = 'абвгдежзийклмнопрстуфхцчшщэюя'
+
+# ID дочернего объекта: ID родителя * ID_BASE + номер объекта среди дочерних (с 1).
+# Поэтому path восстанавливается по ID без хранения всей иерархии в памяти
+ID_BASE = 1000
+
+# URL GetAddressItems, с которым ответы записаны в кэш ответов
+SEARCH_URL = 'https://fias-public-service.nalog.ru/api/spas/v2.0/GetAddressItems'
+
+
+class SyntheticHierarchy:
+    """
+    Синтетическая иерархия ФИАС. Объекты не хранятся, а строятся по ID при каждом запросе: названия
+    генерируются генератором случайных чисел с начальным значением из seed и ID объекта,
+    поэтому при одинаковых параметрах ответы всегда одинаковые.
+
+    Methods:
+        get_address_items(data: dict) -> dict:
+        Ответ GetAddressItems на тело запроса.
+
+        sample_tasks(count: int, seed: int) -> List[List[str]]:
+        Случайные адреса домов иерархии в виде задач.
+    """
+
+    def __init__(self, regions: int = 2, cities: int = 3, streets: int = 50, houses: int = 20, premises: int = 40,
+                 seed: int = 1):
+        """
+        :param regions: Количество регионов.
+        :type regions: int
+        :param cities: Количество городов в регионе.
+        :type cities: int
+        :param streets: Количество улиц в городе.
+        :type streets: int
+        :param houses: Количество домов на улице.
+        :type houses: int
+        :param premises: Количество помещений в доме.
+        :type premises: int
+        :param seed: Начальное значение генератора названий.
+        :type seed: int
+        """
+        self.counts: List[int] = [min(max(1, count), ID_BASE - 1)
+                                  for count in (regions, cities, streets, houses, premises)]
+        self.seed = seed
+
+        # Сервер работает в том же процессе, что и бенчмарк, поэтому готовые объекты запоминаются,
+        # чтобы генерация названий не отнимала время у измеряемого кода
+        self.make_item = functools.lru_cache(maxsize=100000)(self.make_item)
+
+    def make_item(self, object_id: int, depth: int) -> dict:
+        """
+        Элемент массива hierarchy для объекта.
+
+        :param object_id: ID объекта.
+        :type object_id: int
+        :param depth: Глубина объекта в иерархии (0 — регион).
+        :type depth: int
+        :rtype: dict
+        """
+        level_id, type_name, short_template, full_template = LEVELS[depth]
+        number: int = object_id % ID_BASE
+        rng: random.Random = random.Random(f'{self.seed}:{object_id}')
+        name: str = ''.join(rng.choice(LETTERS) for _ in range(rng.randint(5, 12))).capitalize()
+        return {
+            "object_id": object_id,
+            "object_level_id": level_id,
+            "type_name": type_name,
+            "full_name": full_template.format(name=name, number=number),
+            "full_name_short": short_template.format(name=name, number=number),
+        }
+
+    def parse_path(self, path: str | None) -> List[int] | None:
+        """
+        Разбирает path и проверяет, что каждый объект — дочерний объект предыдущего.
+
+        :param path: Строка из ID объектов, разделённых точкой. None — список регионов.
+        :type path: Optional[str]
+        :return: ID объектов path или None, если такого path в иерархии нет.
+        :rtype: Optional[List[int]]
+        """
+        try:
+            ids: List[int] = [int(part) for part in path.split('.')] if path else []
+        except ValueError:
+            return None
+        if len(ids) >= len(self.counts):
+            return None
+        parent: int = 0
+        for depth, object_id in enumerate(ids):
+            if object_id // ID_BASE != parent or not 1 <= object_id % ID_BASE <= self.counts[depth]:
+                return None
+            parent = object_id
+        return ids
+
+    def get_address_items(self, data: dict) -> dict:
+        """
+        Ответ GetAddressItems: дочерние объекты path из тела запроса с полной иерархией каждого объекта.
+        Для неизвестного path возвращается пустой список, как у сервера ФИАС.
+
+        :param data: Тело запроса GetAddressItems.
+        :type data: dict
+        :rtype: dict
+        """
+        ids: List[int] | None = self.parse_path(data.get('path'))
+        if ids is None:
+            return {"addresses": []}
+
+        parents: List[dict] = [self.make_item(object_id, depth) for depth, object_id in enumerate(ids)]
+        parent_id: int = ids[-1] if ids else 0
+        depth: int = len(ids)
+        addresses: List[dict] = []
+        for number in range(1, self.counts[depth] + 1):
+            item: dict = self.make_item(parent_id * ID_BASE + number, depth)
+            address: dict = {**item, "hierarchy": parents + [item], "address_details": {}}
+            if depth >= 3:
+                # Кадастровые номера есть у домов и помещений
+                address["address_details"]["cadastral_number"] = f'77:{ids[0]:02d}:{parent_id:012d}:{number}'
+            addresses.append(address)
+        return {"addresses": addresses}
+
+    def sample_tasks(self, count: int, seed: int = 1) -> List[List[str]]:
+        """
+        Случайные адреса домов иерархии в виде задач (регион, город, улица, дом).
+
+        :param count: Количество задач.
+        :type count: int
+        :param seed: Начальное значение генератора случайных чисел.
+        :type seed: int
+        :rtype: List[List[str]]
+        """
+        rng: random.Random = random.Random(seed)
+        tasks: List[List[str]] = []
+        for _ in range(count):
+            object_id: int = 0
+            task: List[str] = []
+            for depth in range(len(self.counts) - 1):
+                object_id = object_id * ID_BASE + rng.randint(1, self.counts[depth])
+                task.append(self.make_item(object_id, depth)["full_name_short"])
+            tasks.append(task)
+        return tasks
+
+
+class RecordedHierarchy:
+    """
+    Иерархия из записанных ответов: тело ответа ищется в кэше ответов (response_cache.py) по телу запроса.
+    Время жизни записей не проверяется. Для запросов, которых нет в кэше, возвращается пустой список.
+
+    Methods:
+        get_address_items(data: dict) -> dict:
+        Ответ GetAddressItems на тело запроса.
+    """
+
+    def __init__(self, cache_path: str, url: str = SEARCH_URL):
+        """
+        :param cache_path: Путь к базе кэша ответов.
+        :type cache_path: str
+        :param url: URL GetAddressItems, с которым ответы записаны в кэш.
+        :type url: str
+        """
+        self.url = url
+        self._local = threading.local()
+        self._cache_path = cache_path
+
+    def get_address_items(self, data: dict) -> dict | str:
+        """
+        Записанный ответ GetAddressItems на тело запроса.
+
+        :param data: Тело запроса GetAddressItems.
+        :type data: dict
+        :return: Тело ответа (как записано в кэше) или пустой список.
+        :rtype: dict | str
+        """
+        # Соединение открывается только для чтения, отдельное для каждого потока сервера
+        connection: sqlite3.Connection | None = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f'file:{self._cache_path}?mode=ro', uri=True)
+            self._local.connection = connection
+        row = connection.execute('SELECT body FROM responses WHERE key = ?',
+                                 (ResponseCache.make_key(self.url, data),)).fetchone()
+        return row[0] if row is not None else {"addresses": []}
+
+
+class MockFiasServer:
+    """
+    HTTP-сервер, который отвечает на запросы парсера вместо сервера ФИАС. Каждый запрос обрабатывается
+    в отдельном потоке, соединения поддерживаются (keep-alive), как у настоящего сервера.
+
+    Токен выдаётся запросом /Home/GetSpasSettings, запросы GetAddressItems без выданного сервером токена
+    получают 401. Перед ответом GetAddressItems выдерживается задержка latency + случайная добавка до jitter
+    + latency_per_item на каждый объект ответа. С вероятностью error_rate запрос завершается ошибкой 503.
+    Если запросов за последнюю секунду больше rate_limit, возвращается 429 с заголовком Retry-After.
+
+    Attributes:
+    url str: Адрес сервера, например http://127.0.0.1:8080.
+    counts Counter: Количество ответов по (запрос, код ответа).
+
+    Methods:
+        start() -> MockFiasServer:
+        Запускает сервер в фоновом потоке.
+
+        serve() -> None:
+        Обслуживает запросы в текущем потоке.
+
+        stop() -> None:
+        Останавливает сервер.
+    """
+
+    def __init__(self, hierarchy: SyntheticHierarchy | RecordedHierarchy = None, host: str = '127.0.0.1',
+                 port: int = 0, latency: float = 0.0, jitter: float = 0.0, latency_per_item: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0, seed: int = 1):
+        """
+        :param hierarchy: Источник ответов GetAddressItems. По умолчанию синтетическая иерархия.
+        :type hierarchy: SyntheticHierarchy | RecordedHierarchy
+        :param host: Адрес, на котором слушает сервер.
+        :type host: str
+        :param port: Порт. 0 — любой свободный.
+        :type port: int
+        :param latency: Задержка каждого ответа GetAddressItems, секунды.
+        :type latency: float
+        :param jitter: Наибольшая случайная добавка к задержке, секунды.
+        :type jitter: float
+        :param latency_per_item: Добавка к задержке на каждый объект ответа, секунды.
+        :type latency_per_item: float
+        :param error_rate: Доля запросов GetAddressItems, которые завершаются ошибкой 503.
+        :type error_rate: float
+        :param rate_limit: Наибольшее количество запросов GetAddressItems в секунду. 0 — без ограничения.
+        :type rate_limit: float
+        :param seed: Начальное значение генератора задержек и ошибок.
+        :type seed: int
+        """
+        self.hierarchy = hierarchy if hierarchy is not None else SyntheticHierarchy()
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_item = latency_per_item
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+
+        self.counts: collections.Counter = collections.Counter()
+        self._tokens: set = set()
+        self._recent: collections.deque = collections.deque()
+        self._rng: random.Random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self.url = f'http://{host}:{self._server.server_address[1]}'
+
+    def _make_handler(self) -> type:
+        server: MockFiasServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Заголовки и тело ответа отправляются отдельно, без этого каждый ответ ждал бы подтверждения TCP
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                server.handle(self, 'GET')
+
+            def do_POST(self) -> None:
+                server.handle(self, 'POST')
+
+            def log_message(self, message_format: str, *args) -> None:
+                logger.debug(f'{self.address_string()} {message_format % args}')
+
+        return Handler
+
+    def _throttled(self) -> bool:
+        """
+        Проверяет ограничение частоты: учитывает запрос в окне последней секунды.
+
+        :return: True, если запрос нужно отклонить с кодом 429.
+        :rtype: bool
+        """
+        if not self.rate_limit:
+            return False
+        now: float = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    def _delay(self, items: int) -> float:
+        with self._lock:
+            jitter: float = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + jitter + self.latency_per_item * items
+
+    def _fails(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        """
+        Обрабатывает один запрос.
+
+        :param request: Обработчик запроса http.server.
+        :type request: BaseHTTPRequestHandler
+        :param method: HTTP-метод.
+        :type method: str
+        :return: None
+        """
+        path: str = urlsplit(request.path).path.rstrip('/')
+        length: int = int(request.headers.get('Content-Length') or 0)
+        body: bytes = request.rfile.read(length) if length else b''
+
+        if path == '/ExtendedSearch':
+            self.respond(request, 'ExtendedSearch', 200, b'<html><body>ExtendedSearch</body></html>', 'text/html')
+        elif path == '/Home/GetSpasSettings':
+            token: str = uuid.uuid4().hex
+            with self._lock:
+                self._tokens.add(token)
+            self.respond(request, 'GetSpasSettings', 200, {"Token": token})
+        elif path == '/api/spas/v2.0/GetAddressItems' and method == 'POST':
+            self.handle_address_items(request, body)
+        else:
+            self.respond(request, 'unknown', 404, {"error": f'Unknown endpoint {method} {path}'})
+
+    def handle_address_items(self, request: BaseHTTPRequestHandler, body: bytes) -> None:
+        """
+        Обрабатывает запрос GetAddressItems: проверяет токен, ограничение частоты и ошибки,
+        выдерживает задержку и отвечает объектами иерархии.
+
+        :param request: Обработчик запроса http.server.
+        :type request: BaseHTTPRequestHandler
+        :param body: Тело запроса.
+        :type body: bytes
+        :return: None
+        """
+        endpoint: str = 'GetAddressItems'
+        with self._lock:
+            authorized: bool = request.headers.get('master-token') in self._tokens
+        if not authorized:
+            self.respond(request, endpoint, 401, {"error": 'Invalid master-token'})
+            return
+        if self._throttled():
+            self.respond(request, endpoint, 429, {"error": 'Too many requests'}, headers={'Retry-After': '1'})
+            return
+
+        try:
+            data: dict = json.loads(body or b'{}')
+        except ValueError:
+            self.respond(request, endpoint, 400, {"error": 'Invalid JSON'})
+            return
+        response_data: dict | str = self.hierarchy.get_address_items(data)
+        items: int = len(response_data["addresses"]) if isinstance(response_data, dict) else 0
+
+        time.sleep(self._delay(items))
+        if self._fails():
+            self.respond(request, endpoint, 503, {"error": 'Service unavailable'})
+            return
+        self.respond(request, endpoint, 200, response_data)
+
+    def respond(self, request: BaseHTTPRequestHandler, endpoint: str, status: int, body: dict | str | bytes,
+                content_type: str = 'application/json', headers: Dict[str, str] = None) -> None:
+        """
+        Отправляет ответ и учитывает его в статистике.
+
+        :param request: Обработчик запроса http.server.
+        :type request: BaseHTTPRequestHandler
+        :param endpoint: Имя запроса для статистики.
+        :type endpoint: str
+        :param status: Код ответа.
+        :type status: int
+        :param body: Тело ответа: данные для JSON, готовый JSON (str) или байты.
+        :type body: dict | str | bytes
+        :param content_type: Тип содержимого.
+        :type content_type: str
+        :param headers: Дополнительные заголовки.
+        :type headers: Optional[Dict[str, str]]
+        :return: None
+        """
+        if isinstance(body, dict):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._lock:
+            self.counts[(endpoint, status)] += 1
+
+        request.send_response(status)
+        request.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def start(self) -> 'MockFiasServer':
+        """
+        Запускает сервер в фоновом потоке.
+
+        :return: Этот же сервер.
+        :rtype: MockFiasServer
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-fias', daemon=True)
+        self._thread.start()
+        logger.info(f'Mock FIAS server started: {self.url}')
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер.
+
+        :return: None
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve(self) -> None:
+        """
+        Обслуживает запросы в текущем потоке до прерывания (Ctrl+C).
+
+        :return: None
+        """
+        logger.info(f'Mock FIAS server listening on {self.url}, press Ctrl+C to stop')
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self) -> 'MockFiasServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+
+    :return: Аргументы командной строки.
+    :rtype: argparse.Namespace
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Локальный заменитель сервера ФИАС')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--recorded', metavar='CACHE',
+                        help='отвечать записанными ответами из кэша ответов, например cache/responses.sqlite3')
+    parser.add_argument('--size', type=lambda value: [int(part) for part in value.split(',')],
+                        default=[2, 3, 50, 20, 40],
+                        help='синтетическая иерархия: регионов, городов, улиц, домов, помещений через запятую')
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа, секунды')
+    parser.add_argument('--jitter', type=float, default=0.0, help='наибольшая случайная добавка к задержке, секунды')
+    parser.add_argument('--latency-per-item', type=float, default=0.0,
+                        help='добавка к задержке на каждый объект ответа, секунды')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='доля запросов, завершающихся ошибкой 503')
+    parser.add_argument('--rate-limit', type=float, default=0, help='наибольшее количество запросов в секунду')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s | %(levelname)s | %(message)s', datefmt='%d-%m-%Y %H:%M:%S',
+                        level=logging.INFO)
+    arguments: argparse.Namespace = parse_args()
+    source = RecordedHierarchy(arguments.recorded) if arguments.recorded else SyntheticHierarchy(*arguments.size)
+    server: MockFiasServer = MockFiasServer(source, arguments.host, arguments.port, arguments.latency,
+                                            arguments.jitter, arguments.latency_per_item, arguments.error_rate,
+                                            arguments.rate_limit)
+    server.serve()
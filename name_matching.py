@@ -0,0 +1,354 @@
+import logging
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Сокращения ФИАС и их полные формы. Сокращение и полная форма нормализуются к одному слову,
+# поэтому "ул. Ленина" и "улица Ленина" считаются одним и тем же названием.
+ABBREVIATIONS: Dict[str, str] = {
+    'г': 'город',
+    'обл': 'область',
+    'респ': 'республика',
+    'р-н': 'район',
+    'мр-н': 'район',
+    'пгт': 'поселок',
+    'п': 'поселок',
+    'пос': 'поселок',
+    'рп': 'поселок',
+    'с': 'село',
+    'дер': 'деревня',
+    'х': 'хутор',
+    'ул': 'улица',
+    'пр-кт': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'ш': 'шоссе',
+    'б-р': 'бульвар',
+    'наб': 'набережная',
+    'проезд': 'проезд',
+    'пр-д': 'проезд',
+    'туп': 'тупик',
+    'мкр': 'микрорайон',
+    'тер': 'территория',
+    'д': 'дом',
+    'влд': 'владение',
+    'двлд': 'домовладение',
+    'зд': 'здание',
+    'соор': 'сооружение',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+    'пом': 'помещение',
+    'ком': 'комната',
+    'помещ': 'помещение',
+    'м/м': 'машино-место',
+}
+
+# Слова типов объектов после замены сокращений: без них остаётся собственное название
+# ("улица Ленина" -> "ленина", "д. 1" -> "1")
+TYPE_WORDS = set(ABBREVIATIONS.values())
+
+# Всё, кроме букв, цифр, дефиса и слеша, считается разделителем
+_SEPARATORS = re.compile(r'[^\w\-/]+')
+
+
+def normalize_name(name: str) -> str:
+    """
+    Приводит название объекта ФИАС к нормальной форме: нижний регистр, "ё" заменяется на "е",
+    знаки препинания убираются, сокращения типов ("ул.", "пр-кт") заменяются полными словами.
+    Порядок слов сохраняется: "дом 1 корпус 2" и "дом 2 корпус 1" — разные объекты.
+
+    :param name: Название объекта.
+    :type name: str
+    :return: Нормализованное название.
+    :rtype: str
+    """
+    text: str = name.lower().replace('ё', 'е')
+
+    words: List[str] = []
+    for word in _SEPARATORS.split(text):
+        if not word:
+            continue
+        words.append(ABBREVIATIONS.get(word, word))
+    return ' '.join(words)
+
+
+def strip_type_words(normalized_name: str) -> str:
+    """
+    Убирает слова типа объекта в начале и в конце нормализованного названия: "улица ленина" -> "ленина",
+    "квартира 1" -> "1". Слова типа в середине ("дом 1 корпус 2") остаются.
+
+    :param normalized_name: Название после normalize_name.
+    :type normalized_name: str
+    :return: Название без слов типа.
+    :rtype: str
+    """
+    words: List[str] = normalized_name.split()
+    while words and words[0] in TYPE_WORDS:
+        words.pop(0)
+    while words and words[-1] in TYPE_WORDS:
+        words.pop()
+    return ' '.join(words)
+
+
+def get_trigrams(text: str) -> set:
+    """
+    Возвращает множество триграмм строки. Строка дополняется пробелами по краям,
+    чтобы короткие названия (номера домов и квартир) тоже давали триграммы.
+
+    :param text: Строка.
+    :type text: str
+    :return: Множество триграмм.
+    :rtype: set
+    """
+    padded: str = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    Индекс названий объектов одного уровня из ответа GetAddressItems.
+
+    Индекс строится один раз на ответ и затем используется для всех запросов к нему. Сначала проверяется точное
+    совпадение без учёта регистра и совпадение нормализованных названий (поиск по словарю), и только если их нет,
+    выполняется нечёткий поиск. Нечёткий поиск даёт тот же результат, что и перебор всех кандидатов
+    через SequenceMatcher.ratio(): кандидаты перебираются в порядке убывания числа общих триграмм,
+    а кандидаты, у которых верхняя оценка сходства не лучше уже найденного, пропускаются без вычисления ratio().
+
+    Если степень совпадения лучшего кандидата меньше min_ratio, объект считается не найденным. Перед этим
+    проверяется совпадение названий без слов типа ("1" и "квартира 1"): у коротких названий степень
+    совпадения с полным названием низкая, хотя объект указан однозначно.
+
+    Methods:
+        best_match(name: str, min_ratio: float) -> str | None:
+        Возвращает ID объекта с наилучшим совпадением.
+
+        top_matches(name: str, count: int, margin: float, min_ratio: float) -> List[Tuple[str, float]]:
+        Возвращает несколько лучших кандидатов, если они почти не отличаются по степени совпадения.
+    """
+
+    def __init__(self, addresses: List[dict], level: int):
+        """
+        Строит индекс по объектам уровня level из списка адресов ответа.
+
+        :param addresses: Список адресов из ответа GetAddressItems (поле "addresses").
+        :type addresses: List[dict]
+        :param level: Уровень, на котором нужно искать (индекс в массиве hierarchy).
+        :type level: int
+        """
+        # Кандидаты в исходном порядке: ID объекта, название в нижнем регистре и количество символов названия
+        self.object_ids: List[str] = []
+        self.names: List[str] = []
+        self.char_counts: List[Counter] = []
+
+        # Первый кандидат для каждого названия и для каждого нормализованного названия
+        self.exact: Dict[str, int] = {}
+        self.normalized: Dict[str, int] = {}
+
+        # Все кандидаты с одинаковым нормализованным названием (одноимённые улицы и населённые пункты)
+        self.normalized_groups: Dict[str, List[int]] = {}
+
+        # Первый кандидат для каждого названия без слов типа (используется, если нечёткий поиск не нашёл объект)
+        self.bare: Dict[str, int] = {}
+
+        # Инвертированный индекс: триграмма -> номера кандидатов
+        self.trigrams: Dict[str, List[int]] = {}
+
+        for address in addresses:
+            hierarchy: list = address.get('hierarchy', [])
+
+            # Проверка, существует ли элемент с нужным индексом в "hierarchy"
+            if level >= len(hierarchy):
+                continue
+
+            item: dict = hierarchy[level]
+            full_name: str = item.get('full_name', '').lower()
+            index: int = len(self.names)
+
+            self.object_ids.append(item.get('object_id'))
+            self.names.append(full_name)
+            self.char_counts.append(Counter(full_name))
+            self.exact.setdefault(full_name, index)
+            normalized_name: str = normalize_name(full_name)
+            if normalized_name:
+                self.normalized.setdefault(normalized_name, index)
+                self.normalized_groups.setdefault(normalized_name, []).append(index)
+                bare_name: str = strip_type_words(normalized_name)
+                if bare_name:
+                    self.bare.setdefault(bare_name, index)
+            for trigram in get_trigrams(full_name):
+                self.trigrams.setdefault(trigram, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _ranked_candidates(self, name: str) -> List[int]:
+        """
+        Упорядочивает кандидатов по убыванию количества общих с name триграмм.
+        Кандидаты без общих триграмм идут в конце в исходном порядке.
+
+        :param name: Название в нижнем регистре.
+        :type name: str
+        :return: Номера кандидатов.
+        :rtype: List[int]
+        """
+        scores: Counter = Counter()
+        for trigram in get_trigrams(name):
+            for index in self.trigrams.get(trigram, ()):
+                scores[index] += 1
+
+        ranked: List[int] = sorted(scores, key=lambda i: (-scores[i], i))
+        return ranked + [i for i in range(len(self.names)) if i not in scores]
+
+    def fuzzy_match(self, name: str) -> Tuple[int | None, float]:
+        """
+        Ищет кандидата с наибольшим SequenceMatcher(None, name, candidate).ratio(). При равенстве ratio побеждает
+        кандидат, который стоит раньше в ответе, кандидаты с нулевым сходством не учитываются.
+
+        :param name: Название в нижнем регистре.
+        :type name: str
+        :return: Номер лучшего кандидата (или None) и степень совпадения.
+        :rtype: Tuple[int | None, float]
+        """
+        best_index: int | None = None
+        best_ratio: float = 0
+        name_length: int = len(name)
+        name_counts: Counter = Counter(name)
+
+        matcher: SequenceMatcher = SequenceMatcher(None, name)
+        for index in self._ranked_candidates(name):
+            candidate: str = self.names[index]
+            total: int = name_length + len(candidate)
+            if total == 0:
+                # Две пустые строки SequenceMatcher считает полностью совпадающими
+                if best_ratio < 1.0 or index < best_index:
+                    best_ratio, best_index = 1.0, index
+                continue
+
+            # Верхние оценки ratio: по длинам строк и по общему набору символов (как real_quick_ratio
+            # и quick_ratio у SequenceMatcher). Если оценка не лучше найденного, ratio() не вычисляем.
+            bound: float = 2.0 * min(name_length, len(candidate)) / total
+            if bound < best_ratio or (bound == best_ratio and best_index is not None and index > best_index):
+                continue
+            bound = 2.0 * sum((name_counts & self.char_counts[index]).values()) / total
+            if bound < best_ratio or (bound == best_ratio and best_index is not None and index > best_index):
+                continue
+
+            matcher.set_seq2(candidate)
+            match_ratio: float = matcher.ratio()
+            if match_ratio > best_ratio or (match_ratio == best_ratio and best_index is not None
+                                            and match_ratio > 0 and index < best_index):
+                best_ratio, best_index = match_ratio, index
+
+        return best_index, best_ratio
+
+    def _bare_match(self, normalized_name: str) -> int | None:
+        """
+        Ищет кандидата, название которого без слов типа совпадает с названием без слов типа.
+
+        :param normalized_name: Название после normalize_name.
+        :type normalized_name: str
+        :return: Номер кандидата или None.
+        :rtype: int | None
+        """
+        bare_name: str = strip_type_words(normalized_name)
+        return self.bare.get(bare_name) if bare_name else None
+
+    def best_match(self, name: str, min_ratio: float = 0.0) -> str | None:
+        """
+        Возвращает ID объекта, название которого лучше всего совпадает с name.
+
+        :param name: Имя объекта для поиска.
+        :type name: str
+        :param min_ratio: Наименьшая степень совпадения, при которой объект считается найденным.
+        :type min_ratio: float
+        :return: Идентификатор объекта или None, если подходящих объектов нет.
+        :rtype: str | None
+        """
+        lowered: str = name.lower()
+
+        # Точное совпадение без учёта регистра
+        index: int | None = self.exact.get(lowered)
+        if index is not None:
+            return self.object_ids[index]
+
+        # Совпадение нормализованных названий ("ул. Ленина" и "улица Ленина")
+        normalized_name: str = normalize_name(lowered)
+        index = self.normalized.get(normalized_name) if normalized_name else None
+        if index is not None:
+            return self.object_ids[index]
+
+        index, match_ratio = self.fuzzy_match(lowered)
+        logger.debug('Fuzzy match for %s: %s (%.2f)', name, self.names[index] if index is not None else None,
+                     match_ratio)
+        if match_ratio < min_ratio:
+            index = self._bare_match(normalized_name)
+        return self.object_ids[index] if index is not None else None
+
+    def top_matches(self, name: str, count: int, margin: float, min_ratio: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Возвращает до count кандидатов, степень совпадения которых отличается от лучшей не больше чем на margin.
+        Первый кандидат всегда тот же, что возвращает best_match.
+
+        Совпадение по словарю (точное или нормализованное) считается однозначным, кроме случая, когда одно и то же
+        нормализованное название есть у нескольких объектов: тогда возвращаются они все (до count).
+
+        :param name: Имя объекта для поиска.
+        :type name: str
+        :param count: Максимальное количество кандидатов.
+        :type count: int
+        :param margin: Допустимое отставание степени совпадения от лучшего кандидата.
+        :type margin: float
+        :param min_ratio: Наименьшая степень совпадения, при которой объект считается найденным.
+        :type min_ratio: float
+        :return: Пары (ID объекта, степень совпадения от 0 до 1) по убыванию степени совпадения.
+        :rtype: List[Tuple[str, float]]
+        """
+        lowered: str = name.lower()
+        normalized_name: str = normalize_name(lowered)
+
+        index: int | None = self.exact.get(lowered)
+        if index is None and normalized_name:
+            index = self.normalized.get(normalized_name)
+        if index is not None:
+            group: List[int] = self.normalized_groups.get(normalize_name(self.names[index]), [index])
+            indexes: List[int] = [index] + [other for other in group if other != index]
+            return [(self.object_ids[other], 1.0) for other in indexes[:count]]
+
+        best_index, best_ratio = self.fuzzy_match(lowered)
+        if best_ratio < min_ratio:
+            # Совпадение без слов типа однозначно, как совпадение по словарю; иначе объект не найден
+            index = self._bare_match(normalized_name)
+            return [(self.object_ids[index], 1.0)] if index is not None else []
+        if best_index is None:
+            return []
+        matches: List[Tuple[float, int]] = [(best_ratio, best_index)]
+
+        if count > 1:
+            # Остальные кандидаты с той же проверкой верхних оценок, что и в fuzzy_match, но относительно порога
+            threshold: float = max(best_ratio - margin, 0.0)
+            name_counts: Counter = Counter(lowered)
+            matcher: SequenceMatcher = SequenceMatcher(None, lowered)
+            for index in self._ranked_candidates(lowered):
+                if index == best_index:
+                    continue
+                candidate: str = self.names[index]
+                total: int = len(lowered) + len(candidate)
+                if total == 0 or 2.0 * min(len(lowered), len(candidate)) / total < threshold:
+                    continue
+                if 2.0 * sum((name_counts & self.char_counts[index]).values()) / total < threshold:
+                    continue
+                matcher.set_seq2(candidate)
+                match_ratio: float = matcher.ratio()
+                if match_ratio > 0 and match_ratio >= threshold:
+                    matches.append((match_ratio, index))
+
+        # Лучший кандидат остаётся первым, остальные — по убыванию совпадения и порядку в ответе
+        matches[1:] = sorted(matches[1:], key=lambda match: (-match[0], match[1]))
+        return [(self.object_ids[index], match_ratio) for match_ratio, index in matches[:count]]
@@ -0,0 +1,308 @@
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Type
+
+from fingerprint_store import CHANGE_COLUMN
+from json_processing import create_search_result_table, parse_json_to_dataframe
+from task_reader import Task
+
+logger = logging.getLogger(__name__)
+
+# Колонки записей из json_processing.extract_address_info и колонка с исходной задачей
+TASK_COLUMN = 'Задача'
+COLUMNS = [TASK_COLUMN, 'Кадастровый номер', 'Адрес', 'Тип']
+
+
+def format_task(task: List[str] | None) -> str:
+    """
+    Превращает задачу в строку для колонки TASK_COLUMN — в том же виде, в каком она записана в файле задач.
+
+    :param task: Адрес, разбитый на элементы.
+    :type task: Optional[List[str]]
+    :rtype: str
+    """
+    if isinstance(task, Task):
+        return task.raw
+    return ', '.join(task) if task else ''
+
+
+class OutputSink:
+    """
+    Базовый класс способа вывода. Записи дописываются по мере поступления, write вызывается из нескольких потоков.
+    Если у задачи есть дубликаты (task_reader.deduplicate), записи дописываются для каждой исходной строки,
+    кроме способов вывода с fan_out = False. Способы вывода с streaming = True принимают записи одной задачи
+    несколькими частями (потоковое чтение ответа), остальным нужны все записи задачи за один вызов.
+
+    Methods:
+        write(records: List[dict], task: List[str]) -> None:
+        Дописывает записи одной задачи.
+
+        close() -> None:
+        Завершает вывод.
+    """
+
+    fan_out: bool = True
+    streaming: bool = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def write(self, records: List[dict], task: List[str] = None) -> None:
+        """
+        Дописывает записи одной задачи.
+
+        :param records: Записи, полученные из extract_address_records.
+        :type records: List[dict]
+        :param task: Исходная задача (адрес, разбитый на элементы).
+        :type task: Optional[List[str]]
+        :return: None
+        """
+        if not records:
+            return
+        tasks: List[List[str] | None] = task.all_tasks() if self.fan_out and isinstance(task, Task) else [task]
+        with self._lock:
+            for source_task in tasks:
+                self._write(records, format_task(source_task))
+
+    def _write(self, records: List[dict], task: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class CsvSink(OutputSink):
+    """
+    Вывод в один CSV-файл (UTF-8 с BOM, чтобы Excel открывал кириллицу). Файл дописывается между запусками.
+    """
+
+    def __init__(self, path: str, columns: List[str] = None):
+        super().__init__()
+        self.path = path
+        write_header: bool = not os.path.exists(path) or os.path.getsize(path) == 0
+        # При дописывании в непустой файл utf-8-sig не пишет BOM повторно
+        self._file = open(path, 'a', encoding='utf-8-sig', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns or COLUMNS, extrasaction='ignore')
+        if write_header:
+            self._writer.writeheader()
+
+    def _write(self, records: List[dict], task: str) -> None:
+        self._writer.writerows({TASK_COLUMN: task, **record} for record in records)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonlSink(OutputSink):
+    """
+    Вывод в один файл JSON Lines: одна запись на строку. Файл дописывается между запусками.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _write(self, records: List[dict], task: str) -> None:
+        self._file.writelines(json.dumps({TASK_COLUMN: task, **record}, ensure_ascii=False) + '\n'
+                              for record in records)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SqliteSink(OutputSink):
+    """
+    Вывод в таблицу results базы SQLite. База дописывается между запусками.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'task TEXT, cadastral_number TEXT, address TEXT, type TEXT, created_at REAL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS results_task ON results (task)')
+        self._connection.commit()
+
+    def _write(self, records: List[dict], task: str) -> None:
+        now: float = time.time()
+        self._connection.executemany(
+            'INSERT INTO results (task, cadastral_number, address, type, created_at) VALUES (?, ?, ?, ?, ?)',
+            [(task, record['Кадастровый номер'], record['Адрес'], record['Тип'], now) for record in records]
+        )
+        self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class ParquetSink(OutputSink):
+    """
+    Вывод в Parquet (нужен pyarrow). Записи накапливаются и записываются группами строк по batch_size.
+    Parquet нельзя дописывать, поэтому каждый запуск создаёт отдельный файл с временем запуска в имени.
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000):
+        super().__init__()
+        # pyarrow нужен только для вывода в Parquet, поэтому он необязательный и импортируется здесь
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError('Parquet output requires pyarrow: pip install pyarrow')
+        root, extension = os.path.splitext(path)
+        self.path = f'{root}-{time.strftime("%Y%m%d-%H%M%S")}{extension}'
+        self.batch_size = batch_size
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(column, pyarrow.string()) for column in COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+        self._buffer: Dict[str, List[str]] = {column: [] for column in COLUMNS}
+
+    def _flush(self) -> None:
+        if self._buffer[TASK_COLUMN]:
+            self._writer.write_table(self._pyarrow.table(self._buffer, schema=self._schema))
+            self._buffer = {column: [] for column in COLUMNS}
+
+    def _write(self, records: List[dict], task: str) -> None:
+        for record in records:
+            self._buffer[TASK_COLUMN].append(task)
+            for column in COLUMNS[1:]:
+                self._buffer[column].append(record.get(column))
+        if len(self._buffer[TASK_COLUMN]) >= self.batch_size:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._writer.close()
+
+
+class ExcelSink(OutputSink):
+    """
+    Прежний вывод: отдельный Excel-файл на каждый адрес в папке output (json_processing.parse_json_to_dataframe).
+    """
+    streaming = False
+
+    def __init__(self, path: str = None):
+        super().__init__()
+
+    def write(self, records: List[dict], task: List[str] = None) -> None:
+        # Файлы разных адресов независимы, поэтому запись не блокирует другие потоки
+        parse_json_to_dataframe(records)
+
+
+class TableSink(OutputSink):
+    """
+    Вывод таблицы с результатами в консоль (json_processing.create_search_result_table).
+    """
+    fan_out = False
+    streaming = False
+
+    def __init__(self, path: str = None):
+        super().__init__()
+
+    def _write(self, records: List[dict], task: str) -> None:
+        create_search_result_table(records)
+
+
+# Способы вывода по имени и расширение файла по умолчанию
+SINKS: Dict[str, Type[OutputSink]] = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'sqlite': SqliteSink,
+    'parquet': ParquetSink,
+    'excel': ExcelSink,
+    'table': TableSink,
+}
+EXTENSIONS: Dict[str, str] = {'csv': '.csv', 'jsonl': '.jsonl', 'sqlite': '.sqlite3', 'parquet': '.parquet'}
+
+# Колонки вывода изменений в инкрементальном режиме
+CHANGES_COLUMNS = [CHANGE_COLUMN, *COLUMNS]
+
+
+def create_changes_sink(output_dir: str = 'output') -> CsvSink:
+    """
+    Создаёт вывод изменений инкрементального режима: отдельный CSV-файл на каждый запуск
+    (output_dir/changes-<время запуска>.csv) с видом изменения в колонке CHANGE_COLUMN.
+
+    :param output_dir: Папка для файлов вывода.
+    :type output_dir: str
+    :rtype: CsvSink
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path: str = os.path.join(output_dir, f'changes-{time.strftime("%Y%m%d-%H%M%S")}.csv')
+    logger.info(f'Changes output: {path}')
+    return CsvSink(path, CHANGES_COLUMNS)
+
+
+class OutputWriter:
+    """
+    Набор способов вывода. Записи каждой задачи передаются во все способы вывода сразу по готовности.
+
+    Methods:
+        write(records: List[dict], task: List[str]) -> None:
+        Дописывает записи одной задачи во все способы вывода.
+
+        close() -> None:
+        Завершает вывод (закрывает файлы).
+    """
+
+    def __init__(self, sinks: List[OutputSink]):
+        """
+        :param sinks: Способы вывода.
+        :type sinks: List[OutputSink]
+        """
+        self.sinks = sinks
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Все способы вывода принимают записи задачи частями.
+
+        :rtype: bool
+        """
+        return all(sink.streaming for sink in self.sinks)
+
+    @classmethod
+    def create(cls, names: List[str], output_dir: str = 'output', base_name: str = 'results') -> 'OutputWriter':
+        """
+        Создаёт способы вывода по именам из SINKS. Файловые способы пишут в output_dir/base_name.<расширение>.
+
+        :param names: Имена способов вывода ('csv', 'jsonl', 'sqlite', 'parquet', 'excel', 'table').
+        :type names: List[str]
+        :param output_dir: Папка для файлов вывода.
+        :type output_dir: str
+        :param base_name: Имя файлов вывода без расширения.
+        :type base_name: str
+        :return: Набор способов вывода.
+        :rtype: OutputWriter
+        :raises ValueError: Если способ вывода неизвестен.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        sinks: List[OutputSink] = []
+        for name in names:
+            if name not in SINKS:
+                raise ValueError(f'Unknown output sink: {name}, available: {", ".join(SINKS)}')
+            path: str = os.path.join(output_dir, base_name + EXTENSIONS.get(name, ''))
+            sinks.append(SINKS[name](path))
+            logger.info(f'Output sink {name}' + (f': {path}' if name in EXTENSIONS else ''))
+        return cls(sinks)
+
+    def write(self, records: List[dict], task: List[str] = None) -> None:
+        for sink in self.sinks:
+            sink.write(records, task)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,243 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Признак конца потока элементов между стадиями
+_DONE = object()
+
+
+class Stage:
+    """
+    Стадия конвейера: функция, которая выполняется над каждым элементом в workers потоках.
+    Перед стадией стоит ограниченная очередь, поэтому быстрая стадия не накапливает в памяти
+    неограниченное количество элементов, а ждёт медленную.
+
+    Если функция возвращает None, элемент дальше не передаётся.
+
+    Attributes:
+    name str: Имя стадии для статистики.
+    function Callable: Функция стадии.
+    workers int: Количество потоков стадии.
+    use_processes bool: Если True, функция выполняется в пуле процессов (для тяжёлых вычислений,
+                        которым мешает GIL). Функция и элементы должны сериализоваться pickle.
+    processed int: Количество обработанных элементов.
+    busy_time float: Суммарное время выполнения функции во всех потоках, секунды.
+    max_queue_depth int: Наибольшая длина очереди перед стадией.
+    """
+
+    def __init__(self, name: str, function: Callable[[Any], Any], workers: int = 1, use_processes: bool = False):
+        """
+        :param name: Имя стадии.
+        :type name: str
+        :param function: Функция, которая обрабатывает один элемент и возвращает элемент для следующей стадии.
+        :type function: Callable[[Any], Any]
+        :param workers: Количество потоков стадии.
+        :type workers: int
+        :param use_processes: Выполнять функцию в пуле процессов.
+        :type use_processes: bool
+        """
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.use_processes = use_processes
+
+        self.processed = 0
+        self.busy_time = 0.0
+        self.max_queue_depth = 0
+        self._queue_depth_sum = 0
+        self._queue_samples = 0
+        self._lock = threading.Lock()
+
+    def record(self, busy_time: float, queue_depth: int) -> None:
+        """
+        Учитывает обработанный элемент в статистике стадии.
+
+        :param busy_time: Время обработки элемента, секунды.
+        :type busy_time: float
+        :param queue_depth: Длина очереди перед стадией в момент получения элемента.
+        :type queue_depth: int
+        :return: None
+        """
+        with self._lock:
+            self.processed += 1
+            self.busy_time += busy_time
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            self._queue_depth_sum += queue_depth
+            self._queue_samples += 1
+
+    def stats(self, elapsed: float) -> str:
+        """
+        Статистика стадии: пропускная способность, загрузка потоков и длина очереди.
+
+        :param elapsed: Время работы конвейера, секунды.
+        :type elapsed: float
+        :rtype: str
+        """
+        with self._lock:
+            throughput: float = self.processed / elapsed if elapsed > 0 else 0.0
+            utilization: float = self.busy_time / (elapsed * self.workers) if elapsed > 0 else 0.0
+            average_depth: float = self._queue_depth_sum / self._queue_samples if self._queue_samples else 0.0
+            return (f'{self.name}: {self.processed} items, {throughput:.1f}/s, workers {self.workers} '
+                    f'busy {utilization:.0%}, queue avg {average_depth:.1f} max {self.max_queue_depth}')
+
+
+class Pipeline:
+    """
+    Конвейер из стадий, соединённых ограниченными очередями. Разные элементы одновременно находятся
+    на разных стадиях: пока одни задачи ждут ответа сервера, результаты других разбираются и записываются.
+
+    Статистика стадий выводится в лог каждые stats_interval секунд и по завершении. Стадия, у которой
+    загрузка потоков близка к 100%, а очередь перед ней полна, — узкое место.
+
+    При первой ошибке в любой стадии конвейер останавливается, а ошибка поднимается из run.
+
+    Methods:
+        run(items: Iterable) -> None:
+        Пропускает элементы через все стадии и ждёт завершения.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 1000, stats_interval: float = 30):
+        """
+        :param stages: Стадии по порядку.
+        :type stages: List[Stage]
+        :param queue_size: Размер очереди перед каждой стадией.
+        :type queue_size: int
+        :param stats_interval: Интервал вывода статистики в лог, секунды. 0 — только по завершении.
+        :type stats_interval: float
+        """
+        self.stages = stages
+        self.queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self.stats_interval = stats_interval
+        self._error: BaseException | None = None
+        self._stopped = threading.Event()
+        self._started = 0.0
+
+    def _put(self, index: int, item: Any) -> bool:
+        """
+        Кладёт элемент в очередь стадии, пока конвейер не остановлен ошибкой.
+
+        :return: False, если конвейер остановлен.
+        :rtype: bool
+        """
+        while not self._stopped.is_set():
+            try:
+                self.queues[index].put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stopped.set()
+
+    def _feed(self, items: Iterable) -> None:
+        """
+        Передаёт элементы в первую стадию. Источник может быть генератором, который сам выполняет работу
+        (например, разрешение префиксного дерева), поэтому он читается в отдельном потоке.
+        """
+        try:
+            for item in items:
+                if not self._put(0, item):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._put(0, _DONE)
+
+    def _work(self, index: int, executor: Executor | None, finished: threading.Barrier) -> None:
+        """
+        Поток стадии: берёт элементы из очереди стадии, обрабатывает и передаёт в следующую.
+        Последний завершившийся поток стадии передаёт признак конца следующей стадии.
+        """
+        stage: Stage = self.stages[index]
+        input_queue: queue.Queue = self.queues[index]
+        try:
+            while not self._stopped.is_set():
+                try:
+                    item: Any = input_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+
+                queue_depth: int = input_queue.qsize()
+                started: float = time.monotonic()
+                try:
+                    result: Any = executor.submit(stage.function, item).result() if executor is not None \
+                        else stage.function(item)
+                except BaseException as e:
+                    self._fail(e)
+                    break
+                stage.record(time.monotonic() - started, queue_depth)
+
+                if result is not None and index + 1 < len(self.stages):
+                    if not self._put(index + 1, result):
+                        break
+        finally:
+            if finished.wait() == 0 and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    self._put(index + 1, _DONE)
+
+    def log_stats(self) -> None:
+        """
+        Выводит в лог статистику всех стадий.
+
+        :return: None
+        """
+        elapsed: float = time.monotonic() - self._started
+        for stage in self.stages:
+            logger.info(f'Pipeline stage {stage.stats(elapsed)}')
+
+    def run(self, items: Iterable) -> None:
+        """
+        Пропускает элементы через все стадии и ждёт завершения.
+
+        :param items: Элементы для первой стадии.
+        :type items: Iterable
+        :return: None
+        :raises BaseException: Первая ошибка, возникшая в стадии или в источнике элементов.
+        """
+        self._started = time.monotonic()
+        executors: List[Executor | None] = [ProcessPoolExecutor(stage.workers) if stage.use_processes else None
+                                            for stage in self.stages]
+        threads: List[threading.Thread] = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            finished: threading.Barrier = threading.Barrier(stage.workers)
+            threads.extend(threading.Thread(target=self._work, args=(index, executors[index], finished), daemon=True,
+                                            name=f'{stage.name}-{number}') for number in range(stage.workers))
+        for thread in threads:
+            thread.start()
+
+        try:
+            # Ждём завершения последней стадии, периодически выводя статистику
+            last_stage: List[threading.Thread] = threads[-self.stages[-1].workers:]
+            next_report: float = time.monotonic() + self.stats_interval
+            while any(thread.is_alive() for thread in last_stage):
+                for thread in last_stage:
+                    thread.join(timeout=0.5)
+                if self.stats_interval and time.monotonic() >= next_report:
+                    self.log_stats()
+                    next_report = time.monotonic() + self.stats_interval
+        except BaseException as e:
+            # Прерывание (Ctrl+C) останавливает все стадии
+            self._fail(e)
+            raise
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+            self.log_stats()
+
+        if self._error is not None:
+            raise self._error
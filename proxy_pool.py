@@ -0,0 +1,184 @@
+import logging
+import random
+import threading
+import time
+from typing import List
+
+import requests
+
+from rate_limiter import ConcurrencyController, TokenBucket
+from token_manager import TokenManager
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyEndpoint:
+    """
+    Один прокси из пула: собственная сессия (и пул соединений), собственный токен, ограничитель частоты
+    и адаптивный лимит одновременных запросов, а также статистика здоровья прокси.
+
+    Сессия прокси получает атрибуты proxy_endpoint и token_manager, по которым RequestConfig.send
+    находит статистику и токен этого прокси.
+
+    Attributes:
+    proxy_url str: Адрес прокси.
+    session requests.Session: Сессия, настроенная на этот прокси.
+    token_manager TokenManager: Менеджер токена прокси.
+    rate_limiter TokenBucket: Ограничитель частоты запросов через прокси.
+    concurrency_controller ConcurrencyController: Лимит одновременных запросов через прокси.
+    """
+
+    def __init__(self, proxy_url: str, session: requests.Session, token_manager: TokenManager,
+                 rate_limiter: TokenBucket = None, concurrency_controller: ConcurrencyController = None,
+                 max_consecutive_failures: int = 3, max_error_rate: float = 0.5, ejection_time: float = 30,
+                 max_ejection_time: float = 600):
+        """
+        :param proxy_url: Адрес прокси.
+        :type proxy_url: str
+        :param session: Сессия, настроенная на этот прокси.
+        :type session: requests.Session
+        :param token_manager: Менеджер токена прокси.
+        :type token_manager: TokenManager
+        :param rate_limiter: Ограничитель частоты запросов через прокси.
+        :type rate_limiter: Optional[TokenBucket]
+        :param concurrency_controller: Лимит одновременных запросов через прокси.
+        :type concurrency_controller: Optional[ConcurrencyController]
+        :param max_consecutive_failures: После скольких ошибок подряд прокси временно исключается.
+        :type max_consecutive_failures: int
+        :param max_error_rate: При какой доле ошибок (скользящее среднее) прокси временно исключается.
+        :type max_error_rate: float
+        :param ejection_time: На сколько секунд прокси исключается в первый раз. При повторных исключениях
+                              время удваивается до max_ejection_time.
+        :type ejection_time: float
+        :param max_ejection_time: Максимальное время исключения в секундах.
+        :type max_ejection_time: float
+        """
+        self.proxy_url = proxy_url
+        self.session = session
+        self.token_manager = token_manager
+        self.rate_limiter = rate_limiter
+        self.concurrency_controller = concurrency_controller
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_error_rate = max_error_rate
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+
+        # Статистика: скользящие средние времени ответа и доли ошибок
+        self.latency: float = 0.5
+        self.error_rate: float = 0.0
+        self.requests: int = 0
+        self.in_flight: int = 0
+        self.consecutive_failures: int = 0
+        self.ejections: int = 0
+        self.ejected_until: float = 0
+        self._lock = threading.Lock()
+
+        session.proxy_endpoint = self
+        session.token_manager = token_manager
+
+    @property
+    def name(self) -> str:
+        """
+        Адрес прокси без логина и пароля, для логов.
+
+        :rtype: str
+        """
+        return self.proxy_url.rsplit('@', 1)[-1]
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self) -> float:
+        """
+        Оценка нагрузки прокси: чем меньше, тем лучше. Учитывает запросы в работе, время ответа и долю ошибок.
+
+        :rtype: float
+        """
+        return (self.in_flight + 1) * self.latency * (1 + 4 * self.error_rate)
+
+    def start(self) -> None:
+        """
+        Отмечает начало запроса через прокси.
+
+        :return: None
+        """
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, failed: bool, latency: float) -> None:
+        """
+        Отмечает окончание запроса и обновляет статистику. Если прокси деградировал, временно исключает его.
+
+        :param failed: True, если запрос завершился ошибкой прокси или перегрузки (таймаут, 407, 429, 5xx).
+        :type failed: bool
+        :param latency: Время выполнения запроса в секундах.
+        :type latency: float
+        :return: None
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.error_rate = 0.8 * self.error_rate + 0.2 * (1.0 if failed else 0.0)
+            if not failed:
+                self.latency = 0.8 * self.latency + 0.2 * latency
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.max_consecutive_failures or self.error_rate > self.max_error_rate:
+                duration: float = min(self.max_ejection_time, self.ejection_time * 2 ** self.ejections)
+                self.ejected_until = time.monotonic() + duration
+                self.ejections += 1
+                self.consecutive_failures = 0
+                self.error_rate = self.max_error_rate / 2
+                logger.warning(f'Proxy {self.name} ejected for {duration:.0f}s')
+
+
+class ProxyPool:
+    """
+    Пул прокси. Распределяет задачи между доступными прокси, выбирая наименее нагруженный
+    с учётом времени ответа и доли ошибок. Деградировавшие прокси временно исключаются из выбора.
+
+    Methods:
+        acquire() -> ProxyEndpoint:
+        Выбирает прокси для следующей задачи.
+    """
+
+    def __init__(self, endpoints: List[ProxyEndpoint]):
+        """
+        :param endpoints: Прокси пула.
+        :type endpoints: List[ProxyEndpoint]
+        """
+        if not endpoints:
+            raise ValueError('Proxy pool must contain at least one proxy')
+        self.endpoints = endpoints
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def acquire(self) -> ProxyEndpoint:
+        """
+        Выбирает прокси с наименьшей оценкой нагрузки среди доступных. Если исключены все прокси,
+        выбирается тот, который вернётся в пул раньше остальных.
+
+        :return: Выбранный прокси.
+        :rtype: ProxyEndpoint
+        """
+        now: float = time.monotonic()
+        available: List[ProxyEndpoint] = [endpoint for endpoint in self.endpoints if endpoint.is_available(now)]
+        if not available:
+            return min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)
+
+        # Случайный порядок, чтобы при равных оценках нагрузка распределялась равномерно
+        random.shuffle(available)
+        return min(available, key=lambda endpoint: endpoint.score())
+
+    def log_stats(self) -> None:
+        """
+        Выводит в лог статистику по каждому прокси.
+
+        :return: None
+        """
+        for endpoint in self.endpoints:
+            logger.info(f'Proxy {endpoint.name}: requests {endpoint.requests}, latency {endpoint.latency:.2f}s, '
+                        f'error rate {endpoint.error_rate:.2f}, ejections {endpoint.ejections}')
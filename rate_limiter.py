@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов (token bucket). Бюджет пополняется со скоростью rate запросов в секунду
+    и накапливается не больше чем на burst запросов.
+
+    Бюджет резервируется заранее: reserve() сразу списывает запрос и возвращает, сколько нужно подождать,
+    поэтому ожидание происходит без блокировки, и ограничитель можно использовать и из потоков, и из asyncio.
+
+    Methods:
+        reserve() -> float:
+        Резервирует один запрос и возвращает паузу перед его отправкой в секундах.
+
+        acquire() -> None:
+        Ждёт, пока запрос можно отправить.
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        """
+        :param rate: Средняя допустимая частота запросов в секунду.
+        :type rate: float
+        :param burst: Сколько запросов можно отправить подряд без пауз.
+        :type burst: float
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Резервирует один запрос.
+
+        :return: Пауза перед отправкой запроса в секундах (0, если бюджет есть).
+        :rtype: float
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """
+        Резервирует один запрос и ждёт, пока его можно отправить.
+
+        :return: None
+        """
+        delay: float = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ConcurrencyController:
+    """
+    Адаптивное ограничение количества одновременных запросов по схеме AIMD
+    (additive increase, multiplicative decrease).
+
+    Пока запросы проходят успешно и быстрее latency_target, лимит увеличивается на единицу за каждое «окно»
+    из limit успешных запросов. При перегрузке (429, 5xx, таймауты) лимит умножается на decrease_factor,
+    но не чаще одного раза за cooldown секунд, чтобы одна волна ошибок не обрушила лимит до минимума.
+    Так клиент сам находит максимальную устойчивую параллельность.
+
+    Methods:
+        acquire() -> None:
+        Ждёт свободного места под лимитом.
+
+        release(overloaded: bool, latency: float) -> None:
+        Освобождает место и сообщает результат запроса.
+    """
+
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 16, latency_target: float = 2.0,
+                 decrease_factor: float = 0.5, cooldown: float = 5.0):
+        """
+        :param initial: Начальный лимит одновременных запросов.
+        :type initial: int
+        :param minimum: Минимальный лимит.
+        :type minimum: int
+        :param maximum: Максимальный лимит.
+        :type maximum: int
+        :param latency_target: Время ответа в секундах, выше которого лимит не увеличивается.
+        :type latency_target: float
+        :param decrease_factor: Во сколько раз уменьшается лимит при перегрузке.
+        :type decrease_factor: float
+        :param cooldown: Минимальный интервал между уменьшениями лимита в секундах.
+        :type cooldown: float
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        # Лимит хранится дробным, чтобы аддитивное увеличение и мультипликативное уменьшение были плавными
+        self._limit: float = float(min(max(initial, minimum), maximum))
+        self._in_flight: int = 0
+        self._successes: int = 0
+        self._decreased_at: float = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """
+        Текущий лимит одновременных запросов.
+
+        :rtype: int
+        """
+        return max(self.minimum, int(self._limit))
+
+    def acquire(self) -> None:
+        """
+        Ждёт, пока количество выполняющихся запросов станет меньше лимита, и занимает место.
+
+        :return: None
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, overloaded: bool, latency: float) -> None:
+        """
+        Освобождает место и корректирует лимит по результату запроса.
+
+        :param overloaded: True, если сервер ответил 429/5xx или запрос завершился таймаутом.
+        :type overloaded: bool
+        :param latency: Время выполнения запроса в секундах.
+        :type latency: float
+        :return: None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            previous_limit: int = self.limit
+
+            if overloaded:
+                now: float = time.monotonic()
+                if now - self._decreased_at >= self.cooldown:
+                    self._limit = max(float(self.minimum), self._limit * self.decrease_factor)
+                    self._decreased_at = now
+                self._successes = 0
+            elif latency <= self.latency_target:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._limit = min(float(self.maximum), self._limit + 1)
+                    self._successes = 0
+
+            if self.limit != previous_limit:
+                logger.info(f'Concurrency limit changed: {previous_limit} -> {self.limit}')
+            self._condition.notify_all()
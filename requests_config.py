@@ -10,6 +10,8 @@
 # - data: Данные для POST-запросов.
 # - use_proxies: Флаг, определяющий, нужно ли использовать прокси для запроса.
 
+from urllib.parse import urlsplit
+
 from classes import RequestConfig
 
 initial_response = RequestConfig(
@@ -58,4 +60,37 @@ search_response = RequestConfig(
     data={"address_level":1},
     before_request_method='add_token_to_headers',
     after_request_method='search_loop'
-)
\ No newline at end of file
+)
+
+# Поиск объекта по кадастровому номеру (main.lookup_cadastral): строка поиска передаётся в параметре search_string
+cadastral_search_response = RequestConfig(
+    url='https://fias-public-service.nalog.ru/api/spas/v2.0/SearchAddressItems',
+    method='GET',
+    headers={
+        "accept": "application/json, text/javascript, */*; q=0.01",
+        "host": "fias-public-service.nalog.ru",
+        "origin": "https://fias.nalog.ru",
+        "referer": "https://fias.nalog.ru/",
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-site"
+    },
+    before_request_method='add_token_to_headers'
+)
+
+# Все конфигурации запросов к ФИАС, адреса которых меняет use_base_url
+request_configs = [initial_response, get_token_response, search_response, cadastral_search_response]
+
+
+def use_base_url(base_url: str) -> None:
+    """
+    Направляет все запросы на другой сервер, например на локальный заменитель ФИАС (mock_fias.py):
+    в URL каждой конфигурации схема и адрес сервера заменяются на base_url, путь и параметры сохраняются.
+
+    :param base_url: Адрес сервера, например http://127.0.0.1:8080.
+    :type base_url: str
+    :return: None
+    """
+    for request_config in request_configs:
+        parts = urlsplit(request_config.url)
+        request_config.url = base_url.rstrip('/') + request_config.url[len(f'{parts.scheme}://{parts.netloc}'):]
@@ -0,0 +1,363 @@
+"""
+Постоянно работающий сервис поиска адресов (HTTP/JSON) для других программ.
+
+Сессия, токен, кэш ответов, локальный индекс ГАР и индекс кадастровых номеров открываются один раз
+при запуске и используются всеми запросами. Одинаковые адреса, которые ищутся одновременно (в том числе
+по запросам разных клиентов), ищутся один раз.
+
+    python resolver_service.py --port 8765
+
+Запросы:
+
+    POST /resolve          {"address": "г. Москва, ул. Ленина, д. 1"}  (или список элементов адреса)
+    GET  /resolve?address=г. Москва, ул. Ленина, д. 1
+    POST /resolve/batch    {"addresses": ["...", ["...", "..."]]}
+    GET  /health           состояние сервиса и счётчики
+    GET  /metrics          метрики производительности в формате Prometheus
+
+Ответ на адрес: {"address": [...], "path": "...", "records": [...]} или {"address": [...], "error": "..."}.
+Ненайденный адрес (ни один объект не совпадает лучше settings.service_match_min_ratio) — ответ 404
+с {"address": [...], "error": "...", "not_found": true}.
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+import main
+from classes import RequestConfig, SearchContext
+from json_processing import extract_address_records
+from metrics import registry
+from requests_config import use_base_url
+from settings import service_host, service_port, service_batch_limit, service_match_min_ratio
+from task_reader import Task
+
+logger = logging.getLogger(__name__)
+
+
+class AddressResolver:
+    """
+    Поиск адресов с общим тёплым состоянием: одна сессия с пулом соединений, токен через менеджер токена,
+    кэши и индексы, подключённые к RequestConfig. Поиски выполняются в пуле из workers потоков.
+
+    Одинаковые адреса (по нормализованному ключу задачи с сохранённым порядком слов), поиск которых уже
+    выполняется, не ищутся повторно:
+    все запросившие их клиенты получают результат одного поиска (single-flight).
+
+    Attributes:
+    resolved int: Количество выполненных поисков.
+    failed int: Количество поисков, завершившихся ошибкой.
+    not_found int: Количество адресов, которые не найдены.
+    coalesced int: Количество запросов, присоединившихся к уже выполняющемуся поиску.
+
+    Methods:
+        submit(elements: List[str]) -> Future:
+        Запускает поиск адреса или присоединяется к уже выполняющемуся.
+
+        resolve_many(addresses: List) -> List[dict]:
+        Ищет несколько адресов параллельно.
+    """
+
+    def __init__(self, workers: int = main.default_workers):
+        """
+        Открывает сессию и получает токен.
+
+        :param workers: Количество одновременных поисков.
+        :type workers: int
+        """
+        workers = main.configure_proxy_pool(workers)
+        self.session: requests.Session = main.get_session(workers)
+        main.get_token(self.session)
+        # Порог совпадения только для сервиса: клиенту лучше получить 404, чем данные случайного объекта
+        RequestConfig.match_min_ratio = service_match_min_ratio
+
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                                               thread_name_prefix='resolve')
+        self._in_flight: Dict[Tuple[str, ...], Future] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+        self.resolved = 0
+        self.failed = 0
+        self.not_found = 0
+        self.coalesced = 0
+
+    def _resolve(self, task: Task) -> dict:
+        """
+        Ищет один адрес без вывода результата.
+
+        :param task: Задача.
+        :type task: Task
+        :return: Результат для ответа клиенту.
+        :rtype: dict
+        """
+        try:
+            context: SearchContext = main.search_object(self.session, task, defer_output=True)
+            records: List[dict] = context.records if context.records is not None \
+                else extract_address_records(context.result)
+        except LookupError as e:
+            # Элемент адреса не совпал ни с одним объектом лучше settings.service_match_min_ratio
+            with self._lock:
+                self.not_found += 1
+            logger.info('Address not found: %s (%s)', task, e)
+            return {"address": list(task), "error": str(e), "not_found": True}
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f'Resolve failed for address {task}: {e}')
+            return {"address": list(task), "error": str(e)}
+        with self._lock:
+            self.resolved += 1
+        return {"address": list(task), "path": context.path, "records": records}
+
+    def _forget(self, key: Tuple[str, ...], future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def submit(self, elements: List[str]) -> Future:
+        """
+        Запускает поиск адреса или, если такой же адрес уже ищется, возвращает тот же Future.
+
+        :param elements: Элементы адреса.
+        :type elements: List[str]
+        :return: Future с результатом (см. _resolve).
+        :rtype: Future
+        """
+        task: Task = Task(elements)
+        with self._lock:
+            future: Future | None = self._in_flight.get(task.key)
+            if future is not None:
+                self.coalesced += 1
+                registry.increment('service_coalesced_total')
+                return future
+            future = self.executor.submit(self._resolve, task)
+            self._in_flight[task.key] = future
+        future.add_done_callback(lambda done: self._forget(task.key, done))
+        return future
+
+    def resolve_many(self, addresses: List) -> List[dict]:
+        """
+        Ищет несколько адресов параллельно и возвращает результаты в том же порядке.
+
+        :param addresses: Адреса: строки с элементами через запятую или списки элементов.
+        :type addresses: List
+        :rtype: List[dict]
+        """
+        futures: List[Future] = [self.submit(parse_address(address)) for address in addresses]
+        return [future.result() for future in futures]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"status": "ok", "uptime": round(time.time() - self.started_at, 1), "resolved": self.resolved,
+                    "failed": self.failed, "not_found": self.not_found, "coalesced": self.coalesced,
+                    "in_flight": len(self._in_flight)}
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+
+def parse_address(address: str | List[str]) -> List[str]:
+    """
+    Элементы адреса из запроса клиента: строка с элементами через запятую или список элементов.
+
+    :param address: Адрес из запроса.
+    :type address: str | List[str]
+    :rtype: List[str]
+    :raises ValueError: Если адрес пустой или имеет неверный тип.
+    """
+    if isinstance(address, str):
+        elements: List[str] = Task.from_line(address)
+    elif isinstance(address, list) and all(isinstance(element, str) for element in address):
+        elements = address
+    else:
+        raise ValueError('Address must be a string or a list of strings')
+    elements = [element for element in elements if element.strip()]
+    if not elements:
+        raise ValueError('Address is empty')
+    return elements
+
+
+class ResolverService:
+    """
+    HTTP-сервер сервиса поиска адресов. Каждый запрос обрабатывается в отдельном потоке,
+    соединения клиентов поддерживаются (keep-alive).
+
+    Methods:
+        serve() -> None:
+        Обслуживает запросы до прерывания (Ctrl+C).
+    """
+
+    def __init__(self, resolver: AddressResolver, host: str = service_host, port: int = service_port,
+                 batch_limit: int = service_batch_limit):
+        """
+        :param resolver: Поиск адресов.
+        :type resolver: AddressResolver
+        :param host: Адрес, на котором слушает сервис.
+        :type host: str
+        :param port: Порт. 0 — любой свободный.
+        :type port: int
+        :param batch_limit: Наибольшее количество адресов в одном запросе /resolve/batch.
+        :type batch_limit: int
+        """
+        self.resolver = resolver
+        self.batch_limit = batch_limit
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self.url = f'http://{host}:{self._server.server_address[1]}'
+
+    def _make_handler(self) -> type:
+        service: ResolverService = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                service.handle(self, 'GET')
+
+            def do_POST(self) -> None:
+                service.handle(self, 'POST')
+
+            def log_message(self, message_format: str, *args) -> None:
+                logger.debug(f'{self.address_string()} {message_format % args}')
+
+        return Handler
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str) -> None:
+        """
+        Обрабатывает один запрос клиента.
+
+        :param request: Обработчик запроса http.server.
+        :type request: BaseHTTPRequestHandler
+        :param method: HTTP-метод.
+        :type method: str
+        :return: None
+        """
+        parts = urlsplit(request.path)
+        path: str = parts.path.rstrip('/')
+        try:
+            length: int = int(request.headers.get('Content-Length') or 0)
+            body: dict = json.loads(request.rfile.read(length)) if length else {}
+            if not isinstance(body, dict):
+                raise ValueError('Request body must be a JSON object')
+
+            if path == '/health':
+                self.respond(request, 200, self.resolver.stats())
+            elif path == '/metrics':
+                self.respond(request, 200, registry.to_prometheus(), 'text/plain; version=0.0.4')
+            elif path == '/resolve':
+                address = parse_qs(parts.query).get('address', [None])[0] if method == 'GET' \
+                    else body.get('address')
+                result: dict = self.resolver.submit(parse_address(address)).result()
+                status: int = 200 if 'error' not in result else 404 if result.get('not_found') else 502
+                self.respond(request, status, result)
+            elif path == '/resolve/batch' and method == 'POST':
+                addresses = body.get('addresses')
+                if not isinstance(addresses, list):
+                    raise ValueError('"addresses" must be a list')
+                if len(addresses) > self.batch_limit:
+                    raise ValueError(f'Too many addresses: {len(addresses)}, limit {self.batch_limit}')
+                self.respond(request, 200, {"results": self.resolver.resolve_many(addresses)})
+            else:
+                self.respond(request, 404, {"error": f'Unknown endpoint {method} {path}'})
+        except ValueError as e:
+            # Ошибки в запросе клиента, в том числе неверный JSON
+            self.respond(request, 400, {"error": str(e)})
+
+    @staticmethod
+    def respond(request: BaseHTTPRequestHandler, status: int, body: dict | str,
+                content_type: str = 'application/json') -> None:
+        """
+        Отправляет ответ клиенту.
+
+        :param request: Обработчик запроса http.server.
+        :type request: BaseHTTPRequestHandler
+        :param status: Код ответа.
+        :type status: int
+        :param body: Данные для JSON или готовый текст.
+        :type body: dict | str
+        :param content_type: Тип содержимого.
+        :type content_type: str
+        :return: None
+        """
+        raw: bytes = (json.dumps(body, ensure_ascii=False) if isinstance(body, dict) else body).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        request.send_header('Content-Length', str(len(raw)))
+        request.end_headers()
+        request.wfile.write(raw)
+
+    def start(self) -> 'ResolverService':
+        """
+        Запускает сервер в фоновом потоке.
+
+        :return: Этот же сервис.
+        :rtype: ResolverService
+        """
+        threading.Thread(target=self._server.serve_forever, name='resolver-service', daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер.
+
+        :return: None
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve(self) -> None:
+        """
+        Обслуживает запросы в текущем потоке до прерывания (Ctrl+C).
+
+        :return: None
+        """
+        logger.info(f'Resolver service listening on {self.url}, press Ctrl+C to stop')
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+
+    :return: Аргументы командной строки.
+    :rtype: argparse.Namespace
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Сервис поиска адресов ФИАС')
+    parser.add_argument('--host', default=service_host)
+    parser.add_argument('--port', type=int, default=service_port)
+    parser.add_argument('--workers', type=int, default=main.default_workers, help='количество одновременных поисков')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать кэш ответов')
+    parser.add_argument('--no-local-index', action='store_true', help='не использовать локальный индекс ГАР')
+    parser.add_argument('--fias-url', metavar='URL',
+                        help='отправлять запросы на другой сервер, например на локальный заменитель ФИАС')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments: argparse.Namespace = parse_args()
+    if arguments.fias_url:
+        use_base_url(arguments.fias_url)
+    main.configure_cache(arguments.no_cache)
+    main.configure_local_index(arguments.no_local_index)
+    main.configure_cadastral_index()
+    main.configure_metrics()
+    address_resolver: AddressResolver = AddressResolver(arguments.workers)
+    try:
+        ResolverService(address_resolver, arguments.host, arguments.port).serve()
+    finally:
+        address_resolver.close()
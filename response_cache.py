@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Сколько обращений к записям накапливается, прежде чем их время записывается в базу одной транзакцией
+TOUCH_BATCH_SIZE = 256
+
+
+class ResponseCache:
+    """
+    Постоянный кэш ответов GetAddressItems в базе SQLite.
+
+    Ключом служит URL и тело запроса (path, address_levels, address_type), поэтому один и тот же запрос
+    при повторном запуске или после падения скрипта берётся с диска, а не из сети.
+    Время жизни записи задаётся для каждого уровня иерархии отдельно, размер кэша ограничен, при переполнении
+    удаляются записи, к которым дольше всего не обращались (LRU). Время обращения при попадании в кэш
+    записывается в базу не сразу, а пачками по TOUCH_BATCH_SIZE (и перед вытеснением записей), поэтому
+    чтение из кэша не выполняет запись и фиксацию транзакции на каждый запрос.
+
+    Methods:
+        get(url: str, data: dict) -> str | None:
+        Возвращает тело закэшированного ответа или None.
+
+        put(url: str, data: dict, body: str) -> None:
+        Сохраняет тело ответа в кэш.
+    """
+
+    def __init__(self, db_path: str, ttl_by_level: Dict[int, int] = None, default_ttl: int = 86400,
+                 max_entries: int = 100000, refresh: bool = False):
+        """
+        Открывает (или создаёт) базу кэша.
+
+        :param db_path: Путь к файлу базы SQLite.
+        :type db_path: str
+        :param ttl_by_level: Время жизни записей в секундах по уровням. Уровень — количество ID в path
+                             (0 — список объектов первого уровня).
+        :type ttl_by_level: Optional[Dict[int, int]]
+        :param default_ttl: Время жизни записей уровней, которых нет в ttl_by_level, в секундах.
+        :type default_ttl: int
+        :param max_entries: Максимальное количество записей в кэше.
+        :type max_entries: int
+        :param refresh: Если True, кэш не читается, но новые ответы в него записываются.
+        :type refresh: bool
+        """
+        self.ttl_by_level = ttl_by_level if ttl_by_level else {}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.refresh = refresh
+
+        # Счётчики для статистики в логах
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # Время последнего обращения к записям, ещё не записанное в базу: ключ -> время
+        self._touched: Dict[str, float] = {}
+
+        # Соединение используется из нескольких потоков, доступ к нему защищён блокировкой
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, level INTEGER, body TEXT, created_at REAL, accessed_at REAL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self._connection.commit()
+        self._entries = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+        logger.info(f'Response cache opened: {db_path}, entries: {self._entries}, refresh: {refresh}')
+
+    @staticmethod
+    def make_key(url: str, data: dict) -> str:
+        """
+        Формирует ключ кэша из URL и тела запроса.
+
+        :param url: URL запроса.
+        :type url: str
+        :param data: Тело POST-запроса.
+        :type data: dict
+        :return: Хэш SHA-1 от URL и тела запроса.
+        :rtype: str
+        """
+        raw: str = url + '|' + json.dumps(data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_level(data: dict) -> int:
+        """
+        Определяет уровень запроса по количеству ID в path.
+
+        :param data: Тело POST-запроса.
+        :type data: dict
+        :return: Уровень запроса (0 — список объектов первого уровня).
+        :rtype: int
+        """
+        path: str | None = data.get('path')
+        return len(path.split('.')) if path else 0
+
+    def get(self, url: str, data: dict) -> str | None:
+        """
+        Возвращает тело закэшированного ответа, если запись есть и не устарела.
+
+        :param url: URL запроса.
+        :type url: str
+        :param data: Тело POST-запроса.
+        :type data: dict
+        :return: Тело ответа или None.
+        :rtype: str | None
+        """
+        if self.refresh:
+            return None
+
+        key: str = self.make_key(url, data)
+        ttl: int = self.ttl_by_level.get(self.get_level(data), self.default_ttl)
+        now: float = time.time()
+
+        with self._lock:
+            row = self._connection.execute('SELECT body, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > ttl:
+                self.misses += 1
+                return None
+
+            # Время последнего обращения для LRU записывается в базу пачкой
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touched()
+                self._connection.commit()
+            self.hits += 1
+
+        logger.debug('Cache hit for %s', data)
+        return row[0]
+
+    def _flush_touched(self) -> None:
+        """
+        Записывает накопленное время обращений к записям. Вызывается под блокировкой, фиксацию выполняет
+        вызывающий метод.
+
+        :return: None
+        """
+        if self._touched:
+            self._connection.executemany('UPDATE responses SET accessed_at = ? WHERE key = ?',
+                                         [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def put(self, url: str, data: dict, body: str) -> None:
+        """
+        Сохраняет тело ответа в кэш и удаляет самые старые записи, если размер кэша превышен.
+
+        :param url: URL запроса.
+        :type url: str
+        :param data: Тело POST-запроса.
+        :type data: dict
+        :param body: Тело ответа.
+        :type body: str
+        :return: None
+        """
+        key: str = self.make_key(url, data)
+        now: float = time.time()
+
+        with self._lock:
+            exists: bool = self._connection.execute('SELECT 1 FROM responses WHERE key = ?', (key,)).fetchone() \
+                is not None
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, level, body, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, self.get_level(data), body, now, now)
+            )
+            if not exists:
+                self._entries += 1
+
+            if self._entries > self.max_entries:
+                # Перед вытеснением время обращений должно быть в базе, иначе удалятся недавно прочитанные записи
+                self._flush_touched()
+
+                # Удаляем 10% записей, к которым дольше всего не обращались, чтобы не чистить кэш на каждой записи
+                evict_count: int = self._entries - self.max_entries + self.max_entries // 10
+                self._connection.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)', (evict_count,)
+                )
+                self._entries = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+                logger.info(f'Cache evicted {evict_count} entries')
+
+            self._connection.commit()
+
+    def close(self) -> None:
+        """
+        Закрывает соединение с базой кэша.
+
+        :return: None
+        """
+        logger.info(f'Response cache closed, hits: {self.hits}, misses: {self.misses}')
+        with self._lock:
+            self._flush_touched()
+            self._connection.commit()
+            self._connection.close()
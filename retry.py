@@ -0,0 +1,245 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict
+
+import requests
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Ключи политик для ошибок, у которых нет статус-кода
+TIMEOUT = 'timeout'
+CONNECTION_ERROR = 'connection'
+
+
+class RetryBudget:
+    """
+    Бюджет повторов. Каждый обычный запрос пополняет бюджет на ratio, каждый повтор расходует единицу.
+    Когда бюджет исчерпан, повторы не выполняются, и при массовом сбое сервера клиент не умножает нагрузку
+    на количество попыток. Минимальный запас min_tokens позволяет повторять редкие ошибки сразу после старта.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10, max_tokens: float = 100):
+        """
+        :param ratio: Доля повторов относительно обычных запросов.
+        :type ratio: float
+        :param min_tokens: Начальный запас повторов.
+        :type min_tokens: float
+        :param max_tokens: Максимальный запас повторов.
+        :type max_tokens: float
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """
+        Пополняет бюджет после обычного (первого) запроса.
+
+        :return: None
+        """
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Расходует единицу бюджета на повтор.
+
+        :return: True, если повтор разрешён.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Повтор отдельных HTTP-запросов при временных ошибках.
+
+    Для каждого статус-кода (429, 5xx) и для таймаутов и ошибок соединения задаётся своё максимальное
+    количество попыток. Пауза между попытками растёт экспоненциально со случайным разбросом (full jitter),
+    заголовок Retry-After учитывается. Повторы ограничены общим бюджетом RetryBudget.
+
+    Methods:
+        send(request: Callable[[], requests.Response], description: str) -> requests.Response:
+        Выполняет запрос, повторяя его при временных ошибках.
+
+        send_async(request: Callable[[], Awaitable], description: str):
+        То же для асинхронного запроса (async_classes.py), пауза между попытками не блокирует цикл событий.
+    """
+
+    def __init__(self, policies: Dict[int | str, int] = None, backoff_base: float = 0.5, backoff_max: float = 30,
+                 retry_after_max: float = 120, budget: RetryBudget = None):
+        """
+        :param policies: Максимальное количество попыток (включая первую) по статус-коду,
+                         а также по ключам TIMEOUT и CONNECTION_ERROR. Остальные ошибки не повторяются.
+        :type policies: Optional[Dict[int | str, int]]
+        :param backoff_base: Базовая пауза перед повтором в секундах.
+        :type backoff_base: float
+        :param backoff_max: Максимальная пауза перед повтором в секундах.
+        :type backoff_max: float
+        :param retry_after_max: Максимальная пауза, которую может запросить сервер через Retry-After, в секундах.
+        :type retry_after_max: float
+        :param budget: Бюджет повторов. Если не передан, создаётся бюджет по умолчанию.
+        :type budget: Optional[RetryBudget]
+        """
+        self.policies = policies if policies is not None else {
+            429: 6, 500: 3, 502: 4, 503: 4, 504: 4, TIMEOUT: 3, CONNECTION_ERROR: 3
+        }
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.budget = budget if budget is not None else RetryBudget()
+
+        # Количество выполненных повторов, для статистики
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def get_backoff(self, attempt: int, response: requests.Response | None = None) -> float:
+        """
+        Вычисляет паузу перед следующей попыткой. Если сервер прислал Retry-After, используется он,
+        иначе — экспоненциальная пауза со случайным разбросом.
+
+        :param attempt: Номер неудачной попытки, начиная с 1.
+        :type attempt: int
+        :param response: Ответ сервера, если он был.
+        :type response: Optional[requests.Response]
+        :return: Пауза в секундах.
+        :rtype: float
+        """
+        if response is not None:
+            retry_after: float | None = self.parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.retry_after_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def parse_retry_after(value: str | None) -> float | None:
+        """
+        Разбирает заголовок Retry-After: количество секунд или HTTP-дату.
+
+        :param value: Значение заголовка.
+        :type value: Optional[str]
+        :return: Пауза в секундах или None, если заголовка нет или он некорректен.
+        :rtype: float | None
+        """
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def send(self, request: Callable[[], requests.Response], description: str = '') -> requests.Response:
+        """
+        Выполняет запрос и повторяет только его, если ошибка временная, политика и бюджет позволяют.
+        Если попытки закончились, возвращается последний ответ (или поднимается последнее исключение),
+        и решение об ошибке принимает вызывающий код.
+
+        :param request: Функция, отправляющая запрос.
+        :type request: Callable[[], requests.Response]
+        :param description: Описание запроса для логов.
+        :type description: str
+        :return: Ответ сервера.
+        :rtype: requests.Response
+        :raises requests.exceptions.RequestException: Если запрос не удался и повторы исчерпаны.
+        """
+        self.budget.deposit()
+        attempt: int = 0
+        while True:
+            attempt += 1
+            response: requests.Response | None = None
+            try:
+                response = request()
+                key: int | str = response.status_code
+            except requests.exceptions.Timeout:
+                key = TIMEOUT
+                if not self._should_retry(key, attempt, description):
+                    raise
+            except requests.exceptions.ConnectionError:
+                key = CONNECTION_ERROR
+                if not self._should_retry(key, attempt, description):
+                    raise
+            else:
+                if not self._should_retry(key, attempt, description):
+                    return response
+                # Соединение освобождается до паузы, тело ответа с ошибкой не нужно
+                response.close()
+
+            delay: float = self.get_backoff(attempt, response)
+            logger.warning(f'Retrying {description} after {key} in {delay:.1f}s (attempt {attempt + 1})')
+            time.sleep(delay)
+
+    async def send_async(self, request: Callable[[], Awaitable], description: str = ''):
+        """
+        Асинхронный вариант send. Запрос должен поднимать исключения requests.exceptions.Timeout и
+        requests.exceptions.ConnectionError при таймаутах и ошибках соединения. Тело ответа читается
+        запросом целиком, поэтому ответ с ошибкой перед повтором не закрывается.
+
+        :param request: Функция, возвращающая корутину отправки запроса.
+        :type request: Callable[[], Awaitable]
+        :param description: Описание запроса для логов.
+        :type description: str
+        :return: Ответ сервера.
+        :raises requests.exceptions.RequestException: Если запрос не удался и повторы исчерпаны.
+        """
+        self.budget.deposit()
+        attempt: int = 0
+        while True:
+            attempt += 1
+            response = None
+            try:
+                response = await request()
+                key: int | str = response.status_code
+            except requests.exceptions.Timeout:
+                key = TIMEOUT
+                if not self._should_retry(key, attempt, description):
+                    raise
+            except requests.exceptions.ConnectionError:
+                key = CONNECTION_ERROR
+                if not self._should_retry(key, attempt, description):
+                    raise
+            else:
+                if not self._should_retry(key, attempt, description):
+                    return response
+
+            delay: float = self.get_backoff(attempt, response)
+            logger.warning(f'Retrying {description} after {key} in {delay:.1f}s (attempt {attempt + 1})')
+            await asyncio.sleep(delay)
+
+    def _should_retry(self, key: int | str, attempt: int, description: str) -> bool:
+        """
+        Проверяет, нужно ли повторить запрос после ошибки key.
+
+        :param key: Статус-код или TIMEOUT/CONNECTION_ERROR.
+        :type key: int | str
+        :param attempt: Номер выполненной попытки.
+        :type attempt: int
+        :param description: Описание запроса для логов.
+        :type description: str
+        :return: True, если запрос нужно повторить.
+        :rtype: bool
+        """
+        max_attempts: int = self.policies.get(key, 1)
+        if attempt >= max_attempts:
+            return False
+        if not self.budget.withdraw():
+            logger.warning(f'Retry budget exhausted, not retrying {description} after {key}')
+            registry.increment('retries_denied_total', reason=key)
+            return False
+        with self._lock:
+            self.retries += 1
+        registry.increment('retries_total', reason=key)
+        return True
@@ -0,0 +1,193 @@
+# Модуль settings.py содержит общие настройки работы парсера.
+
+# Количество потоков, в которых параллельно обрабатываются адреса из tasks.txt.
+# При значении 1 адреса обрабатываются последовательно, как раньше.
+max_workers = 4
+
+# Если True, задачи из файла объединяются в префиксное дерево (address_trie.py), и общие части адресов
+# (регион, город, улица, дом) запрашиваются у ФИАС один раз на весь пакет.
+use_prefix_trie = True
+
+# Постоянный кэш ответов GetAddressItems (response_cache.py). Отключается ключом --no-cache,
+# ключ --refresh заставляет заново запросить все ответы и обновить кэш.
+cache_enabled = True
+cache_path = 'cache/responses.sqlite3'
+
+# Время жизни записей кэша в секундах по уровням. Уровень — количество ID в path:
+# 0 — список регионов, 1 — объекты региона, 2 — объекты города и т.д.
+# Верхние уровни иерархии почти не меняются, список помещений дома меняется чаще.
+cache_ttl_by_level = {
+    0: 30 * 24 * 3600,
+    1: 30 * 24 * 3600,
+    2: 14 * 24 * 3600,
+    3: 7 * 24 * 3600,
+}
+cache_default_ttl = 24 * 3600
+
+# Максимальное количество записей в кэше, при превышении удаляются самые давно использованные
+cache_max_entries = 100000
+
+# Если True, ответ последнего уровня (список помещений дома) читается потоково (json_stream.py):
+# адреса разбираются по мере получения и сразу превращаются в записи, поэтому память не зависит от размера дома.
+# Потоковые ответы не сохраняются в кэш.
+stream_final_level = False
+
+# Таймауты запросов в секундах: (подключение, чтение)
+request_timeout = (10, 60)
+
+# Повторы запросов при временных ошибках (retry.py). Для каждого статус-кода и для таймаутов ('timeout')
+# и ошибок соединения ('connection') задаётся максимальное количество попыток, включая первую.
+retry_policies = {
+    429: 6,
+    500: 3,
+    502: 4,
+    503: 4,
+    504: 4,
+    'timeout': 3,
+    'connection': 3,
+}
+
+# Пауза перед повтором растёт экспоненциально от retry_backoff_base до retry_backoff_max секунд со случайным
+# разбросом. Пауза из заголовка Retry-After ограничивается retry_after_max секундами.
+retry_backoff_base = 0.5
+retry_backoff_max = 30
+retry_after_max = 120
+
+# Доля повторов относительно обычных запросов. При массовом сбое повторы прекращаются, когда бюджет исчерпан.
+retry_budget_ratio = 0.2
+
+# Токен ФИАС (token_manager.py) хранится в файле между запусками и обновляется через token_ttl секунд
+# после получения, а также сразу, если сервер его отклонил.
+token_cache_path = 'cache/token.json'
+token_ttl = 1800
+
+# Ограничение частоты запросов (rate_limiter.TokenBucket): не больше rate_limit_per_second запросов в секунду
+# в среднем и не больше rate_limit_burst подряд. При значении None частота не ограничивается.
+rate_limit_per_second = 10
+rate_limit_burst = 10
+
+# Адаптивный лимит одновременных запросов (rate_limiter.ConcurrencyController). Лимит растёт от concurrency_initial
+# до concurrency_max, пока ответы приходят быстрее concurrency_latency_target секунд, и уменьшается вдвое
+# при 429, 5xx и таймаутах. Пока лимит включён, задачи выполняются в max(max_workers, concurrency_max) потоках,
+# чтобы лимит мог вырасти до concurrency_max: количество одновременных запросов ограничивает сам лимит.
+# Частота запросов при этом не превышает rate_limit_per_second.
+adaptive_concurrency = True
+concurrency_initial = 2
+concurrency_min = 1
+concurrency_max = 16
+concurrency_latency_target = 2.0
+
+# Пул прокси (proxy_pool.py, список прокси задаётся в credentials.proxy_urls). Ограничения частоты и количества
+# одновременных запросов действуют для каждого прокси отдельно, поэтому пропускная способность растёт
+# с количеством прокси. Прокси временно исключается из пула после proxy_max_consecutive_failures ошибок подряд
+# или когда доля ошибок превышает proxy_max_error_rate. Время исключения начинается с proxy_ejection_time
+# секунд и удваивается при повторных исключениях до proxy_max_ejection_time.
+proxy_max_consecutive_failures = 3
+proxy_max_error_rate = 0.5
+proxy_ejection_time = 30
+proxy_max_ejection_time = 600
+
+# Асинхронный режим (async_classes.py, ключ запуска --async, нужен httpx): сколько поисков адресов выполняется
+# одновременно и сколько HTTP-запросов может быть в работе. Частоту запросов по-прежнему ограничивает
+# rate_limit_per_second.
+async_max_in_flight = 200
+
+# Способы вывода результата (output_sinks.py): 'csv', 'jsonl', 'sqlite', 'parquet' (нужен pyarrow) — один общий
+# набор данных в папке output_dir, 'excel' — отдельный Excel-файл на каждый адрес, 'table' — таблица в консоли.
+# Можно переопределить ключом запуска --output.
+output_sinks = ['csv', 'table']
+output_dir = 'output'
+
+# Тип объектов, которые попадают в вывод: 'Помещение', 'Квартира' или 'all' (все объекты последнего уровня).
+# Можно переопределить ключом запуска --filter.
+object_type_filter = 'Помещение'
+
+# Журнал выполнения задач из tasks.txt (task_journal.py). При повторном запуске выполненные задачи пропускаются,
+# повторяются только задачи с ошибкой, новые и изменённые строки. Ключ запуска --restart очищает журнал.
+journal_enabled = True
+journal_path = 'cache/journal.sqlite3'
+
+# Файл задач (task_reader.py): txt — адрес через запятую в каждой строке, csv или jsonl — адрес собирается
+# из колонок tasks_columns (значение колонки с запятыми разбивается на элементы). Ключи запуска --tasks и --columns.
+tasks_path = 'tasks.txt'
+tasks_columns = None
+
+# Задачи читаются и выполняются частями по task_chunk_size строк. Внутри части задачи с одинаковым нормализованным
+# адресом (регистр, пробелы, "ул." / "улица") ищутся один раз, результат записывается для каждой исходной строки.
+task_chunk_size = 10000
+deduplicate_tasks = True
+
+# Локальный индекс ГАР (gar_index.py), построенный из XML-выгрузки ФИАС командой
+# python gar_index.py gar_xml.zip --regions 77,50. Если файл индекса есть, запросы GetAddressItems выполняются
+# по нему без обращения к серверу, сервер используется только для объектов, которых нет в индексе.
+# Ключ запуска --no-local-index отключает индекс.
+gar_index_enabled = True
+gar_index_path = 'cache/gar.sqlite3'
+
+# Индекс кадастровых номеров (cadastral_index.py): объекты из каждого ответа сервера записываются в индекс,
+# чтобы по кадастровому номеру находить адрес без обращения к сети (ключ запуска --lookup-cadastral).
+cadastral_index_enabled = True
+cadastral_index_path = 'cache/cadastral.sqlite3'
+
+# Инкрементальный режим (fingerprint_store.py, ключ запуска --incremental): отпечатки результатов домов
+# из прошлых запусков. Дома, которые не изменились, не выводятся повторно.
+fingerprint_path = 'cache/fingerprints.sqlite3'
+
+# Поиск по нескольким путям (beam search): если на уровне несколько объектов совпадают с элементом адреса почти
+# одинаково (степень совпадения отличается не больше чем на beam_margin), проверяются до beam_width путей,
+# списки их дочерних объектов запрашиваются параллельно, и выбирается путь, у которого лучше совпадают следующие
+# уровни. При beam_width = 1 всегда выбирается один лучший объект, как раньше. Префиксное дерево
+# (use_prefix_trie) проверяет кандидатов только на один уровень вперёд: узел общий для всех задач поддерева,
+# поэтому выбирается кандидат, среди дочерних объектов которого лучше находятся элементы адресов всех задач узла.
+beam_width = 3
+beam_margin = 0.05
+
+# Конвейер (pipeline.py): поиск, извлечение записей и вывод выполняются отдельными стадиями с очередями
+# по pipeline_queue_size элементов между ними, поэтому сеть не простаивает, пока результаты разбираются и
+# записываются. Извлечение записей выполняется в pipeline_extract_workers потоках или, если
+# pipeline_extract_processes = True, в пуле из стольких же процессов. Статистика стадий (пропускная способность,
+# загрузка, длина очереди) выводится в лог каждые pipeline_stats_interval секунд и по завершении.
+pipeline_enabled = True
+pipeline_queue_size = 1000
+pipeline_extract_workers = 2
+pipeline_extract_processes = False
+pipeline_output_workers = 1
+pipeline_stats_interval = 30
+
+# Метрики производительности (metrics.py): время запросов по запросам ФИАС и уровням иерархии, объём данных,
+# количество кандидатов, попадания в кэш и повторы. Сводка выводится в лог по завершении пакета задач.
+# Если задан metrics_export_path (или ключ запуска --metrics), метрики выгружаются в файл: .prom — текстовый
+# формат Prometheus (например, для node_exporter textfile collector), иначе JSON.
+metrics_enabled = True
+metrics_export_path = None
+
+# Сервис поиска адресов (resolver_service.py): адрес и порт HTTP-сервера и наибольшее количество адресов
+# в одном запросе /resolve/batch. Количество одновременных поисков — как у main.py (main.default_workers).
+service_host = '127.0.0.1'
+service_port = 8765
+service_batch_limit = 1000
+
+# Наименьшая степень совпадения (SequenceMatcher.ratio) элемента адреса с названием объекта для сервиса поиска.
+# Если лучший объект совпадает хуже и не совпадает по названию без слова типа ("1" и "квартира 1"), адрес
+# считается не найденным, и сервис отвечает 404, а не результатом случайно выбранного объекта. Пакетный поиск
+# (main.py) порога не использует и, как и прежде, выбирает лучший объект.
+service_match_min_ratio = 0.3
+
+# Общая очередь задач для нескольких машин (work_queue.py, ключ запуска --queue): файл задач загружается в базу
+# на общем диске частями по queue_chunk_size задач. Обработчик арендует часть на queue_lease_time секунд
+# и продлевает аренду, пока обрабатывает её; часть обработчика, завершившегося аварийно, забирает другой.
+# Часть, которая не выполнилась queue_max_attempts раз, считается невыполнимой. Пока другие обработчики
+# заняты последними частями, свободный обработчик проверяет очередь каждые queue_poll_interval секунд.
+queue_chunk_size = 500
+queue_lease_time = 300
+queue_max_attempts = 3
+queue_poll_interval = 10
+
+# Логирование (log_setup.py, ключи запуска --log-level и --log-format): уровень, формат 'text' или 'json'
+# (строка JSON на каждую запись). Если log_background включён, лог выводится в консоль фоновым потоком
+# и не задерживает поиск. Подробности по каждому объекту ответа пишутся только на уровне DEBUG
+# и только для каждого log_sample_every-го объекта.
+log_level = 'INFO'
+log_format = 'text'
+log_background = True
+log_sample_every = 100
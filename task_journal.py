@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+from task_reader import Task
+
+logger = logging.getLogger(__name__)
+
+# Статусы задач в журнале
+DONE = 'done'
+FAILED = 'failed'
+
+
+class TaskJournal:
+    """
+    Журнал выполнения задач в базе SQLite. Для каждой строки файла задач хранит статус (done/failed),
+    количество попыток, найденный path и текст ошибки.
+
+    Ключ записи — файл задач и номер строки, вместе с ними хранится хэш содержимого строки. Если строка
+    изменилась, задача считается новой. При повторном запуске выполненные задачи пропускаются,
+    повторяются только задачи с ошибкой и новые задачи, поэтому прерванный пакет продолжается с места остановки.
+
+    Methods:
+        pending(source: str, tasks: List[Task]) -> List[Task]:
+        Возвращает невыполненные задачи.
+
+        mark_done(source: str, line_number: int, task: List[str], path: str) -> None:
+        Отмечает задачу выполненной.
+
+        mark_failed(source: str, line_number: int, task: List[str], error: str) -> None:
+        Отмечает задачу завершившейся ошибкой.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Открывает (или создаёт) базу журнала.
+
+        :param db_path: Путь к файлу базы SQLite.
+        :type db_path: str
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # Соединение используется из нескольких потоков, доступ к нему защищён блокировкой
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL synchronous=NORMAL не теряет целостность базы, но не ждёт fsync на каждую задачу
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS tasks ('
+            'source TEXT, line_number INTEGER, raw_hash TEXT, task TEXT, status TEXT, attempts INTEGER, '
+            'path TEXT, error TEXT, updated_at REAL, PRIMARY KEY (source, line_number))'
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_hash(task: List[str]) -> str:
+        """
+        Хэш содержимого строки задачи.
+
+        :param task: Адрес, разбитый на элементы.
+        :type task: List[str]
+        :rtype: str
+        """
+        return hashlib.sha1(','.join(task).encode('utf-8')).hexdigest()
+
+    def pending(self, source: str, tasks: List[Task]) -> List[Task]:
+        """
+        Отбирает задачи, которые ещё не выполнены: новые, изменившиеся и завершившиеся ошибкой.
+        Из базы читаются только строки из диапазона номеров переданных задач, поэтому файл задач
+        можно обрабатывать частями.
+
+        :param source: Файл задач.
+        :type source: str
+        :param tasks: Задачи с номерами строк (task_reader.Task).
+        :type tasks: List[Task]
+        :return: Задачи, которые нужно выполнить.
+        :rtype: List[Task]
+        """
+        if not tasks:
+            return []
+        line_numbers: List[int] = [task.line_number for task in tasks]
+        with self._lock:
+            done: Dict[int, str] = dict(self._connection.execute(
+                'SELECT line_number, raw_hash FROM tasks WHERE source = ? AND status = ? '
+                'AND line_number BETWEEN ? AND ?', (source, DONE, min(line_numbers), max(line_numbers))
+            ).fetchall())
+
+        pending_tasks: List[Task] = [task for task in tasks if done.get(task.line_number) != self.make_hash(task)]
+        logger.info(f'Task journal: {len(tasks) - len(pending_tasks)} tasks already done, '
+                    f'{len(pending_tasks)} pending')
+        return pending_tasks
+
+    def _record(self, source: str, line_number: int, task: List[str], status: str, path: str | None,
+                error: str | None) -> None:
+        """
+        Записывает результат попытки выполнения задачи.
+
+        :return: None
+        """
+        raw_hash: str = self.make_hash(task)
+        with self._lock:
+            # Попытки считаются только для неизменной строки: изменённая строка — новая задача
+            row = self._connection.execute(
+                'SELECT raw_hash, attempts FROM tasks WHERE source = ? AND line_number = ?', (source, line_number)
+            ).fetchone()
+            attempts: int = row[1] + 1 if row and row[0] == raw_hash else 1
+            self._connection.execute(
+                'INSERT OR REPLACE INTO tasks (source, line_number, raw_hash, task, status, attempts, path, error, '
+                'updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (source, line_number, raw_hash, ', '.join(task), status, attempts, path, error, time.time())
+            )
+            self._connection.commit()
+
+    def mark_done(self, source: str, line_number: int, task: List[str], path: str | None) -> None:
+        """
+        Отмечает задачу выполненной.
+
+        :param source: Файл задач.
+        :type source: str
+        :param line_number: Номер строки задачи.
+        :type line_number: int
+        :param task: Адрес, разбитый на элементы.
+        :type task: List[str]
+        :param path: Найденный path объекта.
+        :type path: Optional[str]
+        :return: None
+        """
+        self._record(source, line_number, task, DONE, path, None)
+
+    def mark_failed(self, source: str, line_number: int, task: List[str], error: str) -> None:
+        """
+        Отмечает задачу завершившейся ошибкой. При следующем запуске задача будет выполнена снова.
+
+        :param source: Файл задач.
+        :type source: str
+        :param line_number: Номер строки задачи.
+        :type line_number: int
+        :param task: Адрес, разбитый на элементы.
+        :type task: List[str]
+        :param error: Текст ошибки.
+        :type error: str
+        :return: None
+        """
+        self._record(source, line_number, task, FAILED, None, error)
+
+    def reset(self, source: str) -> None:
+        """
+        Удаляет записи файла задач, чтобы выполнить его заново целиком.
+
+        :param source: Файл задач.
+        :type source: str
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM tasks WHERE source = ?', (source,))
+            self._connection.commit()
+        logger.info(f'Task journal reset for {source}')
+
+    def counts(self, source: str) -> Dict[str, int]:
+        """
+        Количество задач файла по статусам.
+
+        :param source: Файл задач.
+        :type source: str
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            return dict(self._connection.execute(
+                'SELECT status, COUNT(*) FROM tasks WHERE source = ? GROUP BY status', (source,)
+            ).fetchall())
+
+    def close(self) -> None:
+        """
+        Закрывает базу журнала.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,211 @@
+import contextlib
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+from typing import ContextManager, Dict, Iterable, Iterator, List, TextIO, Tuple
+
+from name_matching import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Путь файла задач, вместо которого читается стандартный ввод
+STDIN = '-'
+
+
+class Task(list):
+    """
+    Задача — адрес, разбитый на элементы. Это обычный список строк, поэтому задачу можно передавать
+    везде, где раньше передавался List[str], но он также хранит, откуда задача прочитана.
+
+    Attributes:
+    source str: Файл задач. None для адреса, введённого вручную.
+    line_number int: Номер строки (записи) в файле, начиная с 1.
+    raw str: Исходная строка адреса, как она записана в файле.
+    key Tuple[str, ...]: Нормализованный адрес (name_matching.normalize_name каждого элемента, порядок слов
+                         сохраняется). Задачи с одинаковым ключом — дубликаты, они ищутся один раз.
+    duplicates List[Task]: Дубликаты этой задачи, которым передаётся её результат.
+    """
+
+    def __init__(self, elements: Iterable[str], source: str = None, line_number: int = 0, raw: str = None):
+        """
+        :param elements: Элементы адреса. Пробелы по краям убираются, повторяющиеся пробелы схлопываются.
+        :type elements: Iterable[str]
+        :param source: Файл задач.
+        :type source: Optional[str]
+        :param line_number: Номер строки (записи) в файле.
+        :type line_number: int
+        :param raw: Исходная строка адреса. Если не передана, собирается из элементов.
+        :type raw: Optional[str]
+        """
+        super().__init__(' '.join(str(element).split()) for element in elements)
+        self.source = source
+        self.line_number = line_number
+        self.raw = raw if raw is not None else ', '.join(self)
+        self.key: Tuple[str, ...] = tuple(normalize_name(element) for element in self)
+        self.duplicates: List[Task] = []
+
+    @classmethod
+    def from_line(cls, line: str, source: str = None, line_number: int = 0) -> 'Task':
+        """
+        Создаёт задачу из строки, элементы адреса в которой разделены запятыми.
+
+        :param line: Строка адреса.
+        :type line: str
+        :param source: Файл задач.
+        :type source: Optional[str]
+        :param line_number: Номер строки в файле.
+        :type line_number: int
+        :rtype: Task
+        """
+        line = line.strip()
+        return cls(line.split(','), source, line_number, line)
+
+    def all_tasks(self) -> List['Task']:
+        """
+        Задача вместе со всеми её дубликатами.
+
+        :rtype: List[Task]
+        """
+        return [self, *self.duplicates]
+
+
+def _elements_from_record(record: dict, columns: List[str]) -> List[str]:
+    """
+    Собирает элементы адреса из полей записи CSV/JSONL в порядке columns.
+    Значение поля, содержащее запятые, разбивается на несколько элементов.
+
+    :param record: Запись (строка CSV или объект JSONL).
+    :type record: dict
+    :param columns: Поля, из которых собирается адрес, в порядке элементов адреса.
+    :type columns: List[str]
+    :return: Элементы адреса.
+    :rtype: List[str]
+    :raises KeyError: Если поля нет в записи.
+    """
+    elements: List[str] = []
+    for column in columns:
+        value = record[column]
+        if value is None or str(value).strip() == '':
+            continue
+        elements.extend(str(value).split(','))
+    return elements
+
+
+def open_tasks(path: str, newline: str = None) -> ContextManager[TextIO]:
+    """
+    Открывает файл задач для чтения. Вместо пути STDIN ('-') используется стандартный ввод, который не закрывается.
+
+    :param path: Путь к файлу задач или STDIN.
+    :type path: str
+    :param newline: Параметр newline функции open (для csv — '').
+    :type newline: Optional[str]
+    :return: Контекстный менеджер открытого файла.
+    :rtype: ContextManager[TextIO]
+    """
+    if path == STDIN:
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, 'r', encoding='utf-8-sig', newline=newline)
+
+
+def iter_tasks(path: str, columns: List[str] = None, file_format: str = None) -> Iterator[Task]:
+    """
+    Читает задачи из файла по одной, не загружая файл целиком.
+
+    Поддерживаемые форматы (определяются по расширению, если file_format не указан):
+     - txt — строка файла — адрес, элементы разделены запятыми (прежний формат tasks.txt);
+     - csv — строка таблицы с заголовком, адрес собирается из колонок columns;
+     - jsonl — JSON-объект на строку, адрес собирается из полей columns.
+
+    Пустые строки пропускаются, но номера строк сохраняются.
+
+    :param path: Путь к файлу задач или STDIN ('-') — задачи из стандартного ввода (по умолчанию в формате txt).
+    :type path: str
+    :param columns: Колонки (поля) с элементами адреса по порядку. Для csv и jsonl по умолчанию ['address'].
+    :type columns: Optional[List[str]]
+    :param file_format: Формат файла: 'txt', 'csv' или 'jsonl'.
+    :type file_format: Optional[str]
+    :return: Итератор по задачам.
+    :rtype: Iterator[Task]
+    :raises ValueError: Если формат файла не поддерживается.
+    """
+    file_format = (file_format or os.path.splitext(path)[1].lstrip('.') or 'txt').lower()
+    columns = columns or ['address']
+    source: str = os.path.abspath(path) if path != STDIN else '<stdin>'
+
+    if file_format == 'txt':
+        with open_tasks(path) as file:
+            for line_number, line in enumerate(file, 1):
+                if line.strip():
+                    yield Task.from_line(line, source, line_number)
+
+    elif file_format == 'csv':
+        with open_tasks(path, newline='') as file:
+            # Номер строки — номер записи после заголовка, начиная с 1
+            for line_number, record in enumerate(csv.DictReader(file), 1):
+                elements: List[str] = _elements_from_record(record, columns)
+                if elements:
+                    yield Task(elements, source, line_number)
+
+    elif file_format == 'jsonl':
+        with open_tasks(path) as file:
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    elements: List[str] = _elements_from_record(json.loads(line), columns)
+                except (ValueError, KeyError) as e:
+                    logger.error(f'Skipping line {line_number} of {path}: {e}')
+                    continue
+                if elements:
+                    yield Task(elements, source, line_number)
+
+    else:
+        raise ValueError(f'Unsupported tasks file format: {file_format}')
+
+
+def iter_chunks(tasks: Iterable[Task], chunk_size: int) -> Iterator[List[Task]]:
+    """
+    Разбивает поток задач на части по chunk_size задач.
+
+    :param tasks: Задачи.
+    :type tasks: Iterable[Task]
+    :param chunk_size: Размер части.
+    :type chunk_size: int
+    :return: Итератор по частям.
+    :rtype: Iterator[List[Task]]
+    """
+    iterator: Iterator[Task] = iter(tasks)
+    while True:
+        chunk: List[Task] = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def deduplicate(tasks: Iterable[Task]) -> List[Task]:
+    """
+    Схлопывает дубликаты: задачи с одинаковым нормализованным адресом (регистр, лишние пробелы,
+    "ул." / "улица") ищутся один раз. Порядок слов учитывается: "д. 1 к. 2" и "д. 2 к. 1" — разные задачи.
+    Первая задача группы остаётся в списке, остальные попадают в её duplicates и получают её результат.
+
+    :param tasks: Задачи.
+    :type tasks: Iterable[Task]
+    :return: Уникальные задачи.
+    :rtype: List[Task]
+    """
+    unique: Dict[Tuple[str, ...], Task] = {}
+    count: int = 0
+    for task in tasks:
+        count += 1
+        first: Task | None = unique.get(task.key)
+        if first is None:
+            unique[task.key] = task
+        else:
+            first.duplicates.append(task)
+
+    if count != len(unique):
+        logger.info(f'Deduplicated tasks: {count} -> {len(unique)}')
+    return list(unique.values())
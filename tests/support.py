@@ -0,0 +1,110 @@
+"""
+Общие заготовки тестов: временная папка и локальный заменитель сервера ФИАС (mock_fias.py).
+"""
+import os
+import sys
+import tempfile
+import unittest
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_processing
+import main
+from classes import RequestConfig
+from mock_fias import MockFiasServer, SyntheticHierarchy
+from requests_config import request_configs, use_base_url
+from token_manager import TokenManager
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    Тест с временной папкой, которая удаляется после теста.
+
+    Attributes:
+    directory str: Временная папка.
+    """
+
+    def setUp(self):
+        temporary_directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.directory: str = temporary_directory.name
+
+    def temp_path(self, name: str) -> str:
+        """
+        :param name: Имя файла.
+        :return: Путь к файлу во временной папке.
+        """
+        return os.path.join(self.directory, name)
+
+
+class RecordCollector:
+    """
+    Способ вывода для тестов: собирает записи задач в список.
+
+    Attributes:
+    written List[tuple]: Пары (задача, записи) в порядке вывода.
+    """
+    streaming = True
+
+    def __init__(self):
+        self.written: List[tuple] = []
+
+    def write(self, records: List[dict], task: List[str] = None) -> None:
+        self.written.append((task, list(records)))
+
+    def close(self) -> None:
+        pass
+
+    @property
+    def records(self) -> List[dict]:
+        return [record for _, records in self.written for record in records]
+
+
+class MockFiasTestCase(TempDirTestCase):
+    """
+    Тест поиска против локального заменителя сервера ФИАС. Кэш ответов, локальные индексы, ограничитель частоты
+    и адаптивный лимит отключены, токен хранится только в памяти (для асинхронного режима — во временной папке),
+    записи собираются в self.output. Всё изменённое состояние модулей восстанавливается после теста.
+
+    Attributes:
+    hierarchy SyntheticHierarchy: Иерархия сервера.
+    server MockFiasServer: Запущенный сервер.
+    output RecordCollector: Выведенные записи.
+    """
+    hierarchy_size: tuple = (1, 2, 3, 3, 5)
+    server_options: dict = {}
+
+    def setUp(self):
+        super().setUp()
+        self.hierarchy: SyntheticHierarchy = SyntheticHierarchy(*self.hierarchy_size)
+        self.server: MockFiasServer = MockFiasServer(self.hierarchy, **self.server_options).start()
+        self.addCleanup(self.server.stop)
+
+        for name in ('token_manager', 'response_cache', 'local_resolver', 'cadastral_index', 'rate_limiter',
+                     'concurrency_controller', 'proxy_pool', 'match_min_ratio'):
+            self.patch(RequestConfig, name)
+        for request_config in request_configs:
+            self.patch(request_config, 'url')
+        self.patch(json_processing, 'output_writer')
+        self.patch(main, 'token_cache_path')
+
+        use_base_url(self.server.url)
+        RequestConfig.token_manager = TokenManager(main.fetch_token)
+        RequestConfig.response_cache = RequestConfig.local_resolver = RequestConfig.cadastral_index = None
+        RequestConfig.rate_limiter = RequestConfig.concurrency_controller = RequestConfig.proxy_pool = None
+        self.output: RecordCollector = RecordCollector()
+        json_processing.output_writer = self.output
+        main.token_cache_path = self.temp_path('token.json')
+
+    def patch(self, target: object, name: str, *value) -> None:
+        """
+        Запоминает атрибут и восстанавливает его после теста. Если передано value, атрибут заменяется.
+
+        :param target: Модуль, класс или объект.
+        :param name: Имя атрибута.
+        :param value: Новое значение (необязательно).
+        """
+        self.addCleanup(setattr, target, name, getattr(target, name))
+        if value:
+            setattr(target, name, value[0])
@@ -0,0 +1,89 @@
+import os
+import sys
+import unittest
+from typing import Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import address_trie
+from address_trie import AddressTrie
+from classes import SearchContext
+
+# Дочерние объекты по path: две улицы совпадают с "ул. Тверская" одинаково, дом 5 есть только на второй
+TREE: Dict[str | None, List[str]] = {
+    None: ['Московская область'],
+    '1': ['улица Тверская 1', 'улица Тверская 2'],
+    '1.11': ['дом 1', 'дом 2', 'дом 3'],
+    '1.12': ['дом 5'],
+}
+
+
+class FakeConfig:
+    """Заменитель search_response: отвечает на GetAddressItems по TREE и запоминает запрошенные path."""
+
+    def __init__(self):
+        self.requested: List[str | None] = []
+
+    def prepare_context(self, session, context: SearchContext = None) -> SearchContext:
+        context = context or SearchContext()
+        context.session, context.headers = session, {}
+        return context
+
+    def get_address_items(self, context: SearchContext, path: str = None) -> dict:
+        self.requested.append(path)
+        ids: List[str] = path.split('.') if path else []
+        parents: List[dict] = [{"object_id": object_id, "full_name": ''} for object_id in ids]
+        addresses: List[dict] = []
+        for number, name in enumerate(TREE.get(path, []), 1):
+            item: dict = {"object_id": f'{ids[-1] if ids else ""}{number}', "full_name": name}
+            addresses.append({**item, "hierarchy": parents + [item]})
+        return {"addresses": addresses}
+
+    def iter_address_items(self, context: SearchContext, path: str) -> Iterator[dict]:
+        return iter(self.get_address_items(context, path)['addresses'])
+
+
+class AddressTrieTest(unittest.TestCase):
+
+    def resolve(self, tasks: List[List[str]]) -> Dict[str, str]:
+        trie: AddressTrie = AddressTrie(tasks, FakeConfig())
+        return {node.name: node.path for node in trie.resolve(None, 2)}
+
+    def test_shared_prefixes_are_requested_once(self):
+        config: FakeConfig = FakeConfig()
+        trie: AddressTrie = AddressTrie([['Московская обл.', 'ул. Тверская 1', f'д. {number}']
+                                         for number in (1, 2, 3)], config)
+        paths: List[str] = sorted(node.path for node in trie.resolve(None, 2))
+        self.assertEqual(paths, ['1.11.111', '1.11.112', '1.11.113'])
+        self.assertEqual(config.requested.count('1.11'), 1)
+        self.assertEqual(config.requested.count('1'), 1)
+
+    def test_missing_object_skips_subtree(self):
+        # У дома нет дочерних объектов: задачи поддерева пропускаются, остальные выполняются
+        tasks: List[List[str]] = [['Московская обл.', 'ул. Тверская 1', 'д. 1', 'кв. 1'],
+                                  ['Московская обл.', 'ул. Тверская 1', 'д. 1', 'кв. 2'],
+                                  ['Московская обл.', 'ул. Тверская 1', 'д. 2']]
+        self.assertEqual(self.resolve(tasks), {'д. 2': '1.11.112'})
+
+    def test_tasks_of_one_node(self):
+        tasks: List[List[str]] = [['Московская обл.', 'ул. Тверская 1', 'д. 1'],
+                                  ['московская обл.', 'ул. Тверская 1', 'Д. 1'],
+                                  ['Московская обл.', 'ул. Тверская 1']]
+        trie: AddressTrie = AddressTrie(tasks, FakeConfig())
+        self.assertEqual(trie.nodes_count, 3)
+        self.assertEqual(AddressTrie.count_tasks(trie.root), 3)
+        nodes: dict = {node.level: node.tasks for node in trie.resolve(None, 2)}
+        self.assertEqual(nodes, {1: tasks[2:], 2: tasks[:2]})
+
+    def test_ambiguous_node_looks_one_level_ahead(self):
+        self.assertEqual(self.resolve([['Московская обл.', 'ул. Тверская', 'д. 5']]), {'д. 5': '1.12.121'})
+
+    def test_single_best_object_without_beam(self):
+        original: int = address_trie.beam_width
+        self.addCleanup(setattr, address_trie, 'beam_width', original)
+        address_trie.beam_width = 1
+        self.assertTrue(self.resolve([['Московская обл.', 'ул. Тверская', 'д. 5']])['д. 5'].startswith('1.11.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
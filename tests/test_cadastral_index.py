@@ -0,0 +1,98 @@
+import json
+import os
+import unittest
+from typing import List
+
+from support import MockFiasTestCase, TempDirTestCase
+from test_gar_index import FILES
+
+import main
+from cadastral_index import CadastralIndex
+from classes import RequestConfig
+from gar_index import GarIndexBuilder
+from mock_fias import SyntheticHierarchy
+from response_cache import ResponseCache
+from task_reader import Task
+
+
+class CadastralIndexTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index: CadastralIndex = CadastralIndex(self.temp_path('cadastral.sqlite3'))
+        self.addCleanup(self.index.close)
+        # Ответы заменителя сервера: у улиц нет кадастровых номеров, у домов есть
+        self.hierarchy: SyntheticHierarchy = SyntheticHierarchy(1, 2, 3, 3, 5)
+        self.streets: List[dict] = self.hierarchy.get_address_items({"path": '1.1001'})['addresses']
+        self.houses: List[dict] = self.hierarchy.get_address_items({"path": '1.1001.1001001'})['addresses']
+
+    def test_add_addresses_skips_objects_without_number(self):
+        self.assertEqual(self.index.add_addresses(self.streets), 0)
+        self.assertEqual(self.index.add_addresses(self.streets + self.houses), len(self.houses))
+
+    def test_lookup(self):
+        self.index.add_addresses(self.houses)
+        house: dict = self.houses[0]
+        number: str = house['address_details']['cadastral_number']
+        # Пробелы в номере не учитываются, неизвестных номеров в результате нет
+        found: dict = self.index.lookup([f' {number.replace(":", ": ")} ', '77:00:000000000000:0'])
+        self.assertEqual(list(found), [number])
+        self.assertEqual(found[number]['object_id'], house['object_id'])
+        self.assertEqual(found[number]['path'], '.'.join(str(item['object_id']) for item in house['hierarchy']))
+        self.assertEqual(found[number]['address'], ', '.join(item['full_name_short'] for item in house['hierarchy']))
+        self.assertEqual(found[number]['type'], house['type_name'])
+
+    def test_newer_data_replaces_older(self):
+        house: dict = self.houses[0]
+        number: str = house['address_details']['cadastral_number']
+        self.index.add_addresses([house])
+        moved: dict = {**house, "hierarchy": house['hierarchy'][:2] + house['hierarchy'][3:]}
+        self.index.add_addresses([moved])
+        self.assertEqual(self.index.lookup([number])[number]['path'].count('.'), 2)
+
+    def test_import_response_cache(self):
+        cache_path: str = self.temp_path('responses.sqlite3')
+        cache: ResponseCache = ResponseCache(cache_path)
+        cache.put('http://fias/GetAddressItems', {"path": '1.1001'}, json.dumps({"addresses": self.streets}))
+        cache.put('http://fias/GetAddressItems', {"path": '1.1001.1001001'},
+                  json.dumps({"addresses": self.houses}))
+        cache.close()
+        self.assertEqual(self.index.import_response_cache(cache_path), len(self.houses))
+        numbers: List[str] = [house['address_details']['cadastral_number'] for house in self.houses]
+        self.assertEqual(sorted(self.index.lookup(numbers)), sorted(numbers))
+
+    def test_import_gar_index(self):
+        source: str = self.temp_path('gar')
+        for name, content in FILES.items():
+            path: str = os.path.join(source, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(content)
+        gar_path: str = self.temp_path('gar.sqlite3')
+        builder: GarIndexBuilder = GarIndexBuilder(gar_path)
+        builder.ingest(source)
+        builder.close()
+
+        self.assertEqual(self.index.import_gar_index(gar_path), 1)
+        found: dict = self.index.lookup(['77:01:0001001:5'])['77:01:0001001:5']
+        self.assertEqual((found['object_id'], found['path']), (5, '1.2.3.5'))
+        self.assertIn('Ленина', found['address'])
+
+
+class CadastralIndexSearchTest(MockFiasTestCase):
+    """Индекс пополняется ответами, полученными во время поиска."""
+
+    def test_search_fills_index(self):
+        RequestConfig.cadastral_index = CadastralIndex(self.temp_path('cadastral.sqlite3'))
+        self.addCleanup(RequestConfig.cadastral_index.close)
+        tasks: List[Task] = [Task(task, None, number) for number, task in enumerate(self.hierarchy.sample_tasks(3), 1)]
+        self.assertEqual(main.start(tasks, workers=2), 0)
+
+        records: List[dict] = self.output.records
+        self.assertTrue(records)
+        found: dict = RequestConfig.cadastral_index.lookup(record['Кадастровый номер'] for record in records)
+        self.assertEqual(sorted(found), sorted({record['Кадастровый номер'] for record in records}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from support import TempDirTestCase
+
+from fingerprint_store import ADDED, CHANGED, REMOVED, FingerprintStore
+
+
+def make_records() -> list:
+    # Два помещения без кадастрового номера с одинаковым адресом — разные помещения
+    return [{"Кадастровый номер": "77:01:1", "Адрес": "дом 1, кв. 1", "Тип": "Квартира"},
+            {"Кадастровый номер": "", "Адрес": "дом 1, кладовая", "Тип": "Кладовая"},
+            {"Кадастровый номер": "", "Адрес": "дом 1, кладовая", "Тип": "Кладовая"}]
+
+
+class FingerprintStoreTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db_path: str = self.temp_path('fingerprints.sqlite')
+
+    def open_store(self) -> FingerprintStore:
+        store: FingerprintStore = FingerprintStore(self.db_path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_state_saved_only_after_commit(self):
+        # Запуск прервался после сравнения, но до вывода: дом должен снова считаться изменившимся
+        self.assertEqual(len(self.open_store().compare('1.2', make_records())[ADDED]), 3)
+        store: FingerprintStore = self.open_store()
+        self.assertEqual(len(store.compare('1.2', make_records())[ADDED]), 3)
+        store.commit('1.2')
+        self.assertIsNone(self.open_store().compare('1.2', make_records()))
+
+    def test_repeat_task_for_same_house(self):
+        store: FingerprintStore = self.open_store()
+        self.assertEqual(len(store.compare('1.2', make_records())[ADDED]), 3)
+        store.commit('1.2')
+        # Вторая задача к тому же дому выводит записи, но изменения не повторяет
+        self.assertEqual(store.compare('1.2', make_records()), {ADDED: [], REMOVED: [], CHANGED: []})
+
+
+if __name__ == '__main__':
+    unittest.main()
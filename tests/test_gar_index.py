@@ -0,0 +1,95 @@
+import os
+import shutil
+import unittest
+from typing import Dict
+
+from support import TempDirTestCase
+
+from gar_index import GarIndexBuilder, LocalResolver
+
+# Маленькая выгрузка ГАР: справочники в корне, данные региона 77 в его папке
+FILES: Dict[str, str] = {
+    'AS_ADDR_OBJ_TYPES_20240101_1.XML': '<ADDRESSOBJECTTYPES>'
+    '<ADDRESSOBJECTTYPE ID="1" LEVEL="1" SHORTNAME="г" NAME="Город" ISACTIVE="true"/>'
+    '<ADDRESSOBJECTTYPE ID="2" LEVEL="8" SHORTNAME="ул" NAME="Улица" ISACTIVE="true"/></ADDRESSOBJECTTYPES>',
+    'AS_HOUSE_TYPES_20240101_1.XML': '<HOUSETYPES><HOUSETYPE ID="2" NAME="Дом" SHORTNAME="д" ISACTIVE="true"/>'
+    '</HOUSETYPES>',
+    'AS_ADDHOUSE_TYPES_20240101_1.XML': '<HOUSETYPES><HOUSETYPE ID="1" NAME="Корпус" SHORTNAME="к" ISACTIVE="true"/>'
+    '</HOUSETYPES>',
+    'AS_APARTMENT_TYPES_20240101_1.XML': '<APARTMENTTYPES>'
+    '<APARTMENTTYPE ID="2" NAME="Квартира" SHORTNAME="кв" ISACTIVE="true"/></APARTMENTTYPES>',
+    '77/AS_ADDR_OBJ_20240101_1.XML': '<ADDRESSOBJECTS>'
+    '<OBJECT OBJECTID="1" NAME="Москва" TYPENAME="г" LEVEL="1" ISACTUAL="1" ISACTIVE="1"/>'
+    '<OBJECT OBJECTID="2" NAME="Ленина" TYPENAME="ул" LEVEL="8" ISACTUAL="1" ISACTIVE="1"/></ADDRESSOBJECTS>',
+    '77/AS_HOUSES_20240101_1.XML': '<HOUSES>'
+    '<HOUSE OBJECTID="3" HOUSENUM="1" HOUSETYPE="2" ADDNUM1="2" ADDTYPE1="1" ISACTUAL="1" ISACTIVE="1"/>'
+    '<HOUSE OBJECTID="4" HOUSENUM="1" HOUSETYPE="2" ISACTUAL="0" ISACTIVE="1"/></HOUSES>',
+    '77/AS_APARTMENTS_20240101_1.XML': '<APARTMENTS>'
+    '<APARTMENT OBJECTID="5" NUMBER="10" APARTTYPE="2" ISACTUAL="1" ISACTIVE="1"/></APARTMENTS>',
+    '77/AS_MUN_HIERARCHY_20240101_1.XML': '<ITEMS>'
+    '<ITEM OBJECTID="1" PARENTOBJID="0" PATH="1" ISACTIVE="1"/>'
+    '<ITEM OBJECTID="2" PARENTOBJID="1" PATH="1.2" ISACTIVE="1"/>'
+    '<ITEM OBJECTID="3" PARENTOBJID="2" PATH="1.2.3" ISACTIVE="1"/>'
+    '<ITEM OBJECTID="4" PARENTOBJID="2" PATH="1.2.4" ISACTIVE="1"/>'
+    '<ITEM OBJECTID="5" PARENTOBJID="3" PATH="1.2.3.5" ISACTIVE="1"/></ITEMS>',
+    '77/AS_APARTMENTS_PARAMS_20240101_1.XML': '<PARAMS>'
+    '<PARAM OBJECTID="5" TYPEID="8" VALUE="77:01:0001001:5" ENDDATE="2079-06-06"/>'
+    '<PARAM OBJECTID="5" TYPEID="5" VALUE="123456" ENDDATE="2079-06-06"/></PARAMS>',
+}
+
+
+class GarIndexTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.source: str = self.temp_path('gar')
+        for name, content in FILES.items():
+            path: str = os.path.join(self.source, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(content)
+
+    def build(self, source: str, regions: list = None) -> LocalResolver:
+        db_path: str = self.temp_path(f'gar-{len(os.listdir(self.directory))}.sqlite3')
+        builder: GarIndexBuilder = GarIndexBuilder(db_path)
+        builder.ingest(source, regions)
+        builder.close()
+        return LocalResolver(db_path)
+
+    @staticmethod
+    def names(response: dict) -> list:
+        return [(address['hierarchy'][-1]['full_name'], address['hierarchy'][-1]['full_name_short'])
+                for address in response['addresses']]
+
+    def test_answers_like_get_address_items(self):
+        resolver: LocalResolver = self.build(self.source)
+        self.assertEqual(self.names(resolver.get_address_items({})), [('Город Москва', 'г. Москва')])
+        self.assertEqual(self.names(resolver.get_address_items({'path': '1'})), [('Улица Ленина', 'ул. Ленина')])
+        # Неактуальный дом в индекс не попадает
+        self.assertEqual(self.names(resolver.get_address_items({'path': '1.2'})), [('Дом 1 Корпус 2', 'д. 1 к. 2')])
+
+        [apartment] = resolver.get_address_items({'path': '1.2.3'})['addresses']
+        self.assertEqual(apartment['address_details'], {'cadastral_number': '77:01:0001001:5'})
+        self.assertEqual([item['object_id'] for item in apartment['hierarchy']], [1, 2, 3, 5])
+        self.assertEqual(resolver.hits, 4)
+
+    def test_missing_objects_are_requested_from_server(self):
+        resolver: LocalResolver = self.build(self.source)
+        self.assertIsNone(resolver.get_address_items({'path': '1.2.99'}))
+        self.assertIsNone(resolver.get_address_items({'path': '1.2.3.5'}))
+        self.assertEqual(resolver.misses, 2)
+
+    def test_region_index_does_not_answer_region_list(self):
+        resolver: LocalResolver = self.build(self.source, ['77'])
+        self.assertIsNone(resolver.get_address_items({}))
+        self.assertEqual(len(resolver.get_address_items({'path': '1'})['addresses']), 1)
+        self.assertIsNone(self.build(self.source, ['50']).get_address_items({'path': '1'}))
+
+    def test_zip_archive(self):
+        archive: str = shutil.make_archive(self.temp_path('gar'), 'zip', self.source)
+        resolver: LocalResolver = self.build(archive)
+        self.assertEqual(self.names(resolver.get_address_items({'path': '1.2'})), [('Дом 1 Корпус 2', 'д. 1 к. 2')])
+
+
+if __name__ == '__main__':
+    unittest.main()
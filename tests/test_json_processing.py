@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_processing
+from json_processing import get_name_index, get_object_id_by_name
+
+
+def make_response(names: list) -> dict:
+    return {"addresses": [{"hierarchy": [{"object_id": str(number), "full_name": name}]}
+                          for number, name in enumerate(names, 1)]}
+
+
+class NameIndexCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        json_processing._name_indexes.clear()
+        self.addCleanup(json_processing._name_indexes.clear)
+
+    def test_index_is_reused_for_the_same_path(self):
+        # Каждая задача получает свою копию ответа, но индекс строится один раз
+        first: dict = make_response(['улица Ленина', 'улица Мира'])
+        second: dict = make_response(['улица Ленина', 'улица Мира'])
+        self.assertIs(get_name_index(first['addresses'], 0, '1.2'), get_name_index(second['addresses'], 0, '1.2'))
+        self.assertIsNot(get_name_index(first['addresses'], 0, '1.3'), get_name_index(first['addresses'], 0, '1.2'))
+        self.assertEqual(get_object_id_by_name(second, 'ул. Мира', 0, path='1.2'), '2')
+
+    def test_changed_response_rebuilds_index(self):
+        self.assertEqual(get_object_id_by_name(make_response(['улица Ленина']), 'ул. Мира', 0, path='1.2'), '1')
+        changed: dict = make_response(['улица Ленина', 'улица Мира'])
+        self.assertEqual(get_object_id_by_name(changed, 'ул. Мира', 0, path='1.2'), '2')
+
+    def test_cache_is_bounded(self):
+        addresses: list = make_response(['улица Ленина'])['addresses']
+        for number in range(json_processing.NAME_INDEX_CACHE_SIZE + 10):
+            get_name_index(addresses, 0, str(number))
+        self.assertEqual(len(json_processing._name_indexes), json_processing.NAME_INDEX_CACHE_SIZE)
+        self.assertNotIn(('0', 0), json_processing._name_indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
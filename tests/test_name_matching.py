@@ -0,0 +1,65 @@
+import itertools
+import os
+import sys
+import unittest
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_matching import NameIndex, normalize_name
+
+
+def legacy_best_match(addresses: list, name: str, level: int) -> str | None:
+    # Прежний get_object_id_by_name: SequenceMatcher.ratio() для каждого кандидата, при равенстве — первый
+    best_id, best_ratio = None, 0
+    for address in addresses:
+        item: dict = address['hierarchy'][level]
+        ratio: float = SequenceMatcher(None, name.lower(), item['full_name'].lower()).ratio()
+        if ratio > best_ratio:
+            best_id, best_ratio = item['object_id'], ratio
+    return best_id
+
+
+def make_houses() -> list:
+    names: list = []
+    for house, building in itertools.product(range(1, 13), range(1, 4)):
+        names += [f'дом {house} корпус {building}', f'дом {house} строение {building}']
+    names += [f'дом {house}' for house in range(1, 13)] + ['владение 5', 'дом 10а', 'дом 1/2']
+    return [{"hierarchy": [{"object_id": str(index), "full_name": name}]} for index, name in enumerate(names)]
+
+
+class NameMatchingTest(unittest.TestCase):
+
+    def test_normalize_keeps_word_order(self):
+        self.assertEqual(normalize_name('д. 1'), normalize_name('дом 1'))
+        self.assertEqual(normalize_name('д. 1 к. 2'), normalize_name('дом 1 корпус 2'))
+        self.assertNotEqual(normalize_name('д. 1 к. 2'), normalize_name('д. 2 к. 1'))
+        self.assertEqual(normalize_name('ул. Ленина'), normalize_name('улица ленина'))
+
+    def test_house_numbers(self):
+        addresses: list = make_houses()
+        index: NameIndex = NameIndex(addresses, 0)
+        ids: dict = {address['hierarchy'][0]['full_name']: address['hierarchy'][0]['object_id']
+                     for address in addresses}
+        queries: list = ['д 2 к 1', 'д. 1 к. 2', 'д. 12 корп. 3', 'дом 7 стр 2', 'д. 10а', 'д 1/2', 'вл. 5',
+                         'д. 3', 'дом 11 корпус 1', 'д.4 к.3', 'д 9 с 2', 'д 9 строен 2']
+        for query in queries:
+            with self.subTest(query=query):
+                # Сокращения раскрываются, и дом с тем же номером и корпусом находится по словарю,
+                # остальные названия выбираются так же, как прежним перебором через SequenceMatcher
+                expected: str | None = ids.get(normalize_name(query)) or legacy_best_match(addresses, query, 0)
+                self.assertEqual(index.best_match(query), expected)
+
+    def test_min_ratio(self):
+        addresses: list = [{"hierarchy": [{"object_id": str(number), "full_name": f'квартира {number}'}]}
+                           for number in range(1, 21)]
+        index: NameIndex = NameIndex(addresses, 0)
+        self.assertIsNone(index.best_match('нет такого', 0.3))
+        self.assertEqual(index.top_matches('нет такого', 3, 0.05, 0.3), [])
+        # Короткое название без слова типа совпадает хуже порога, но указывает объект однозначно
+        self.assertEqual(index.best_match('1', 0.3), '1')
+        self.assertEqual(index.best_match('кв. 12', 0.3), '12')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import csv
+import json
+import sqlite3
+import unittest
+from typing import List
+from unittest import mock
+
+from support import TempDirTestCase
+
+from output_sinks import TASK_COLUMN, OutputWriter, TableSink
+from task_reader import Task, deduplicate
+
+RECORDS: List[dict] = [{"Кадастровый номер": "77:01:1", "Адрес": "дом 1, кв. 1", "Тип": "Квартира"},
+                       {"Кадастровый номер": "77:01:2", "Адрес": "дом 1, кв. 2", "Тип": "Квартира"}]
+
+
+def make_task() -> Task:
+    # Вторая строка — дубликат первой: ищется один раз, а записи выводятся для обеих строк
+    tasks: List[Task] = deduplicate([Task.from_line('г. Москва, ул. Ленина, д. 1', 'tasks.txt', 1),
+                                     Task.from_line('г. москва, улица Ленина, д. 1', 'tasks.txt', 2)])
+    assert len(tasks) == 1
+    return tasks[0]
+
+
+class OutputSinksTest(TempDirTestCase):
+
+    def write(self, names: List[str], *batches: List[dict]) -> None:
+        writer: OutputWriter = OutputWriter.create(names, self.directory)
+        task: Task = make_task()
+        for records in batches:
+            writer.write(records, task)
+        writer.close()
+
+    def test_records_fan_out_to_duplicate_tasks(self):
+        self.write(['csv', 'jsonl', 'sqlite'], RECORDS)
+        expected: List[tuple] = [(task, record["Кадастровый номер"])
+                                 for task in ('г. Москва, ул. Ленина, д. 1', 'г. москва, улица Ленина, д. 1')
+                                 for record in RECORDS]
+
+        with open(self.temp_path('results.csv'), encoding='utf-8-sig', newline='') as file:
+            self.assertEqual([(row[TASK_COLUMN], row["Кадастровый номер"]) for row in csv.DictReader(file)], expected)
+        with open(self.temp_path('results.jsonl'), encoding='utf-8') as file:
+            rows: List[dict] = [json.loads(line) for line in file]
+        self.assertEqual([(row[TASK_COLUMN], row["Кадастровый номер"]) for row in rows], expected)
+        with sqlite3.connect(self.temp_path('results.sqlite3')) as connection:
+            self.assertEqual(connection.execute('SELECT task, cadastral_number FROM results').fetchall(), expected)
+
+    def test_files_are_appended_between_runs(self):
+        # Вторая порция той же задачи приходит при потоковом чтении ответа, второй запуск дописывает файл
+        self.write(['csv'], RECORDS[:1], RECORDS[1:])
+        self.write(['csv'], RECORDS)
+        with open(self.temp_path('results.csv'), encoding='utf-8-sig', newline='') as file:
+            lines: List[str] = file.read().splitlines()
+        self.assertEqual(len(lines), 1 + 4 + 4)
+        self.assertEqual(sum(line.startswith(TASK_COLUMN) for line in lines), 1)
+
+    def test_table_is_printed_once(self):
+        with mock.patch('output_sinks.create_search_result_table') as create_table:
+            TableSink().write(RECORDS, make_task())
+        create_table.assert_called_once_with(RECORDS)
+
+    def test_streaming_flag(self):
+        for names, streaming in ((['csv', 'jsonl'], True), (['csv', 'table'], False)):
+            writer: OutputWriter = OutputWriter.create(names, self.directory)
+            self.addCleanup(writer.close)
+            self.assertEqual(writer.streaming, streaming)
+
+    def test_unknown_sink(self):
+        with self.assertRaises(ValueError):
+            OutputWriter.create(['xml'], self.directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import unittest
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from mock_fias import SyntheticHierarchy
+from pipeline import Pipeline, Stage
+
+
+def tag(name: str):
+    def function(item: tuple) -> tuple:
+        number, stages = item
+        return number, stages + [name]
+    return function
+
+
+class PipelineTest(unittest.TestCase):
+
+    def test_items_pass_stages_in_order(self):
+        results: List[tuple] = []
+        lock: threading.Lock = threading.Lock()
+
+        def output(item: tuple) -> None:
+            with lock:
+                results.append(tag('output')(item))
+
+        Pipeline([Stage('resolve', tag('resolve'), 4), Stage('extract', tag('extract'), 2),
+                  Stage('output', output)], queue_size=2, stats_interval=0).run((number, []) for number in range(50))
+        self.assertEqual(sorted(number for number, _ in results), list(range(50)))
+        self.assertTrue(all(stages == ['resolve', 'extract', 'output'] for _, stages in results))
+
+    def test_none_is_not_passed_on(self):
+        results: List[int] = []
+        Pipeline([Stage('resolve', lambda number: number if number % 2 else None, 2),
+                  Stage('output', results.append)], stats_interval=0).run(range(10))
+        self.assertEqual(sorted(results), [1, 3, 5, 7, 9])
+
+    def test_stage_error_stops_pipeline(self):
+        processed: List[int] = []
+
+        def resolve(number: int) -> int:
+            if number == 3:
+                raise LookupError('not found')
+            return number
+
+        with self.assertRaises(LookupError):
+            Pipeline([Stage('resolve', resolve), Stage('output', processed.append)], queue_size=1,
+                     stats_interval=0).run(range(1000))
+        self.assertLess(len(processed), 1000)
+
+    def test_source_error_is_raised(self):
+        def source():
+            yield 1
+            raise ConnectionError('server gone')
+
+        with self.assertRaises(ConnectionError):
+            Pipeline([Stage('output', lambda item: None)], stats_interval=0).run(source())
+
+
+class ExtractStageTest(unittest.TestCase):
+    """Стадия извлечения записей получает фильтр в элементе, поэтому он действует и в пуле процессов."""
+
+    def setUp(self):
+        hierarchy: SyntheticHierarchy = SyntheticHierarchy(1, 1, 1, 2, 3)
+        # Дома улицы и помещения первого дома в одном ответе
+        addresses: list = hierarchy.get_address_items({'path': '1.1001.1001001'})['addresses'] + \
+            hierarchy.get_address_items({'path': '1.1001.1001001.1001001001'})['addresses']
+        self.response_data: dict = {'addresses': addresses}
+
+    def extract(self, object_type: str, use_processes: bool) -> List[tuple]:
+        results: List[tuple] = []
+        Pipeline([Stage('extract', main.extract_result, 2, use_processes), Stage('output', results.append)],
+                 stats_interval=0).run([('key', '1.2', self.response_data, None, object_type)])
+        return results
+
+    def test_filter_applies_in_threads_and_processes(self):
+        for use_processes in (False, True):
+            for object_type, count in (('all', 5), ('Дом', 2), ('Помещение', 3), ('Квартира', 0)):
+                with self.subTest(use_processes=use_processes, object_type=object_type):
+                    [(key, path, records, seconds)] = self.extract(object_type, use_processes)
+                    self.assertEqual((key, path, len(records)), ('key', '1.2', count))
+                    self.assertTrue(all(object_type in ('all', record['Тип']) for record in records))
+                    self.assertIsNotNone(seconds)
+
+    def test_extracted_records_are_passed_through(self):
+        records: List[dict] = [{"Кадастровый номер": "77:01:1", "Адрес": "дом 1", "Тип": "Дом"}]
+        self.assertEqual(main.extract_result(('key', '1.2', None, records, 'all')), ('key', '1.2', records, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
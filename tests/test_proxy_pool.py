@@ -0,0 +1,120 @@
+import os
+import sys
+import unittest
+from typing import List
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from classes import RequestConfig
+from proxy_pool import ProxyEndpoint, ProxyPool
+
+
+class ProxyPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now: float = 1000.0
+        patcher = mock.patch('proxy_pool.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_endpoints(self, count: int) -> List[ProxyEndpoint]:
+        endpoints: List[ProxyEndpoint] = []
+        for number in range(count):
+            session: requests.Session = requests.Session()
+            self.addCleanup(session.close)
+            endpoints.append(ProxyEndpoint(f'user:pass@10.0.0.{number}:8080', session, None,
+                                           max_consecutive_failures=3, ejection_time=30, max_ejection_time=100))
+        return endpoints
+
+    @staticmethod
+    def fail(endpoint: ProxyEndpoint, count: int) -> None:
+        for _ in range(count):
+            endpoint.start()
+            endpoint.finish(True, 1.0)
+
+    def test_consecutive_failures_eject_proxy(self):
+        endpoint: ProxyEndpoint = self.make_endpoints(1)[0]
+        self.fail(endpoint, 2)
+        self.assertTrue(endpoint.is_available(self.now))
+        self.fail(endpoint, 1)
+        self.assertFalse(endpoint.is_available(self.now))
+        self.assertTrue(endpoint.is_available(self.now + 30))
+        self.assertEqual(endpoint.session.proxy_endpoint, endpoint)
+        self.assertEqual(endpoint.name, '10.0.0.0:8080')
+
+    def test_ejection_time_doubles_up_to_maximum(self):
+        endpoint: ProxyEndpoint = self.make_endpoints(1)[0]
+        durations: List[float] = []
+        for _ in range(4):
+            self.fail(endpoint, 3)
+            durations.append(endpoint.ejected_until - self.now)
+            self.now = endpoint.ejected_until
+        self.assertEqual(durations, [30, 60, 100, 100])
+
+    def test_success_resets_consecutive_failures(self):
+        endpoint: ProxyEndpoint = self.make_endpoints(1)[0]
+        for _ in range(5):
+            self.fail(endpoint, 1)
+            endpoint.start()
+            endpoint.finish(False, 0.1)
+        self.assertTrue(endpoint.is_available(self.now))
+        self.assertEqual(endpoint.requests, 10)
+
+    def test_pool_skips_ejected_proxies(self):
+        endpoints: List[ProxyEndpoint] = self.make_endpoints(3)
+        pool: ProxyPool = ProxyPool(endpoints)
+        self.fail(endpoints[0], 3)
+        self.fail(endpoints[1], 3)
+        self.assertEqual({pool.acquire() for _ in range(20)}, {endpoints[2]})
+
+        # Если исключены все, выбирается прокси, который вернётся в пул раньше остальных
+        self.now += 1
+        self.fail(endpoints[2], 3)
+        self.assertIs(pool.acquire(), endpoints[0])
+        self.now += 29
+        self.assertTrue({pool.acquire() for _ in range(20)} <= set(endpoints[:2]))
+
+    def test_pool_prefers_least_loaded_proxy(self):
+        endpoints: List[ProxyEndpoint] = self.make_endpoints(2)
+        pool: ProxyPool = ProxyPool(endpoints)
+        endpoints[0].start()
+        endpoints[0].start()
+        self.assertIs(pool.acquire(), endpoints[1])
+
+    def test_empty_pool(self):
+        with self.assertRaises(ValueError):
+            ProxyPool([])
+
+
+class ConfigureProxyPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        urls: List[str] = [f'user:pass@10.0.0.{number}:8080' for number in range(3)]
+        for patcher in (mock.patch.object(RequestConfig, 'proxy_pool', None),
+                        mock.patch.object(main, 'proxy_urls', urls)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_sessions_sized_for_all_workers(self):
+        # Потоков по 4 на каждый прокси, и каждый прокси может принять все потоки, если остальные исключены
+        self.assertEqual(main.configure_proxy_pool(4), 12)
+        for endpoint in RequestConfig.proxy_pool.endpoints:
+            self.addCleanup(endpoint.session.close)
+            self.assertEqual(endpoint.session.get_adapter('https://fias.example')._pool_maxsize, 12)
+        # Повторный вызов использует уже созданный пул
+        pool: ProxyPool = RequestConfig.proxy_pool
+        self.assertEqual(main.configure_proxy_pool(2), 6)
+        self.assertIs(RequestConfig.proxy_pool, pool)
+
+    def test_without_proxies(self):
+        with mock.patch.object(main, 'proxy_urls', []):
+            self.assertEqual(main.configure_proxy_pool(4), 4)
+        self.assertIsNone(RequestConfig.proxy_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
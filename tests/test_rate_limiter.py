@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import ConcurrencyController, TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock: FakeClock = FakeClock()
+        patcher = mock.patch('rate_limiter.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(RateLimiterTestCase):
+
+    def test_burst_then_rate(self):
+        bucket: TokenBucket = TokenBucket(rate=10, burst=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        # Бюджет исчерпан: каждый следующий запрос ждёт на 1 / rate дольше предыдущего
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+    def test_refill_is_capped_by_burst(self):
+        bucket: TokenBucket = TokenBucket(rate=10, burst=2)
+        bucket.reserve()
+        bucket.reserve()
+        self.clock.now += 60
+        self.assertEqual([bucket.reserve() for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+
+class ConcurrencyControllerTest(RateLimiterTestCase):
+
+    def run_requests(self, controller: ConcurrencyController, count: int, overloaded: bool = False,
+                     latency: float = 0.1) -> None:
+        for _ in range(count):
+            controller.acquire()
+            controller.release(overloaded, latency)
+
+    def test_additive_increase(self):
+        controller: ConcurrencyController = ConcurrencyController(initial=2, maximum=4, latency_target=1.0)
+        # Лимит растёт на единицу за каждое окно из limit успешных запросов
+        self.run_requests(controller, 2)
+        self.assertEqual(controller.limit, 3)
+        self.run_requests(controller, 3)
+        self.assertEqual(controller.limit, 4)
+        self.run_requests(controller, 20)
+        self.assertEqual(controller.limit, 4)
+
+    def test_slow_responses_do_not_increase(self):
+        controller: ConcurrencyController = ConcurrencyController(initial=2, latency_target=1.0)
+        self.run_requests(controller, 10, latency=5.0)
+        self.assertEqual(controller.limit, 2)
+
+    def test_multiplicative_decrease_with_cooldown(self):
+        controller: ConcurrencyController = ConcurrencyController(initial=16, minimum=2, maximum=16, cooldown=5)
+        self.run_requests(controller, 3, overloaded=True)
+        self.assertEqual(controller.limit, 8)
+        self.clock.now += 5
+        self.run_requests(controller, 1, overloaded=True)
+        self.assertEqual(controller.limit, 4)
+        self.clock.now += 5
+        self.run_requests(controller, 1, overloaded=True)
+        self.clock.now += 5
+        self.run_requests(controller, 1, overloaded=True)
+        self.assertEqual(controller.limit, 2)
+
+    def test_acquire_waits_for_release(self):
+        controller: ConcurrencyController = ConcurrencyController(initial=1, maximum=1)
+        controller.acquire()
+        acquired: threading.Event = threading.Event()
+
+        def second_request() -> None:
+            controller.acquire()
+            acquired.set()
+
+        thread: threading.Thread = threading.Thread(target=second_request)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        controller.release(False, 0.1)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
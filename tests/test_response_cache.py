@@ -0,0 +1,44 @@
+import sqlite3
+import unittest
+
+from support import TempDirTestCase
+
+from response_cache import ResponseCache
+
+
+class ResponseCacheTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db_path: str = self.temp_path('cache.sqlite3')
+
+    def accessed_at(self) -> dict:
+        with sqlite3.connect(self.db_path) as connection:
+            return dict(connection.execute('SELECT body, accessed_at FROM responses').fetchall())
+
+    def test_touches_are_written_in_batches(self):
+        cache: ResponseCache = ResponseCache(self.db_path, max_entries=10)
+        for number in range(3):
+            cache.put('url', {"path": str(number)}, f'body {number}')
+        written: dict = self.accessed_at()
+
+        self.assertEqual(cache.get('url', {"path": "0"}), 'body 0')
+        self.assertEqual(self.accessed_at(), written)
+
+        cache.close()
+        self.assertGreater(self.accessed_at()['body 0'], written['body 0'])
+
+    def test_eviction_keeps_recently_read_entries(self):
+        cache: ResponseCache = ResponseCache(self.db_path, max_entries=10)
+        self.addCleanup(cache.close)
+        for number in range(10):
+            cache.put('url', {"path": str(number)}, f'body {number}')
+        # Первая запись прочитана последней, поэтому при переполнении удаляется не она
+        self.assertEqual(cache.get('url', {"path": "0"}), 'body 0')
+        cache.put('url', {"path": "10"}, 'body 10')
+        self.assertEqual(cache.get('url', {"path": "0"}), 'body 0')
+        self.assertIsNone(cache.get('url', {"path": "1"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
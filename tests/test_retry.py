@@ -0,0 +1,101 @@
+import asyncio
+import email.utils
+import io
+import os
+import sys
+import time
+import unittest
+from typing import List
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retry import RetryBudget, RetryPolicy
+
+
+def make_response(status_code: int, retry_after: str = None) -> requests.Response:
+    response: requests.Response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b'')
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return response
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.delays: List[float] = []
+        patcher = mock.patch('retry.time.sleep', self.delays.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, policy: RetryPolicy, responses: List[requests.Response | Exception]) -> requests.Response:
+        attempts: iter = iter(responses)
+
+        def request() -> requests.Response:
+            result = next(attempts)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return policy.send(request, 'test')
+
+    def test_retry_after_is_honoured_and_capped(self):
+        policy: RetryPolicy = RetryPolicy(retry_after_max=60)
+        response = self.send(policy, [make_response(429, '7'), make_response(429, '600'), make_response(200)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.delays, [7, 60])
+        self.assertEqual(policy.retries, 2)
+
+    def test_retry_after_http_date(self):
+        value: str = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(RetryPolicy.parse_retry_after(value), 30, delta=2)
+        self.assertIsNone(RetryPolicy.parse_retry_after('скоро'))
+
+    def test_attempts_per_status(self):
+        policy: RetryPolicy = RetryPolicy({503: 3}, backoff_base=0.1, backoff_max=0.2)
+        # Последний ответ возвращается вызывающему коду, статус 404 не повторяется
+        self.assertEqual(self.send(policy, [make_response(503)] * 3).status_code, 503)
+        self.assertEqual(self.send(policy, [make_response(404)]).status_code, 404)
+        self.assertEqual(len(self.delays), 2)
+        self.assertTrue(all(0 <= delay <= 0.2 for delay in self.delays))
+
+    def test_connection_error_is_raised_after_attempts(self):
+        policy: RetryPolicy = RetryPolicy({'connection': 2})
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.send(policy, [requests.exceptions.ConnectionError()] * 2)
+        self.assertEqual(policy.retries, 1)
+
+    def test_budget_limits_retries(self):
+        # Запаса хватает на один повтор, обычные запросы бюджет не пополняют
+        policy: RetryPolicy = RetryPolicy({503: 5}, budget=RetryBudget(ratio=0, min_tokens=1))
+        self.assertEqual(self.send(policy, [make_response(503), make_response(200)]).status_code, 200)
+        self.assertEqual(self.send(policy, [make_response(503)]).status_code, 503)
+        self.assertEqual(policy.retries, 1)
+
+    def test_budget_refills_with_requests(self):
+        budget: RetryBudget = RetryBudget(ratio=0.5, min_tokens=0)
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+    def test_send_async_waits_without_blocking(self):
+        responses: iter = iter([make_response(429, '3'), make_response(200)])
+
+        async def request() -> requests.Response:
+            return next(responses)
+
+        with mock.patch('retry.asyncio.sleep', new=mock.AsyncMock()) as sleep:
+            response = asyncio.run(RetryPolicy().send_async(request, 'test'))
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_awaited_once_with(3)
+        self.assertEqual(self.delays, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
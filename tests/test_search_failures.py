@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+from typing import List
+
+from support import MockFiasTestCase
+
+import main
+from task_reader import Task
+
+
+class SearchFailuresTest(MockFiasTestCase):
+    """Ненайденный адрес отмечается ошибкой своей задачи и не прерывает обработку остальных."""
+
+    def make_tasks(self) -> List[Task]:
+        tasks: List[Task] = [Task(task, None, number) for number, task in enumerate(self.hierarchy.sample_tasks(3), 1)]
+        # У помещения нет дочерних объектов, поэтому последний элемент адреса не найден
+        missing: Task = Task(tasks[0] + ['кв. 1', 'комн. 1'], None, len(tasks) + 1)
+        return tasks + [missing]
+
+    def assert_found(self, tasks: List[Task]) -> None:
+        self.assertEqual(sorted(task.line_number for task, _ in self.output.written),
+                         sorted({task.line_number for task in tasks[:-1]}))
+
+    def test_start_without_trie(self):
+        self.patch(main, 'use_prefix_trie', False)
+        for pipeline in (True, False):
+            with self.subTest(pipeline=pipeline):
+                self.patch(main, 'pipeline_enabled', pipeline)
+                self.output.written.clear()
+                tasks: List[Task] = self.make_tasks()
+                self.assertEqual(main.start(tasks, workers=2), 1)
+                self.assert_found(tasks)
+
+    def test_start_with_trie(self):
+        tasks: List[Task] = self.make_tasks()
+        self.assertEqual(main.start(tasks, workers=2), 1)
+        self.assert_found(tasks)
+
+    def test_start_single_task_chunk(self):
+        # Часть из одной задачи выполняется без префиксного дерева
+        self.assertEqual(main.start(self.make_tasks()[-1:], workers=2), 1)
+        self.assertEqual(self.output.written, [])
+
+    def test_start_async(self):
+        tasks: List[Task] = self.make_tasks()
+        self.assertEqual(asyncio.run(main.start_async(tasks)), 1)
+        self.assert_found(tasks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from typing import List
+
+from support import MockFiasTestCase
+
+import classes
+import main
+
+
+class StreamingOutputTest(MockFiasTestCase):
+    """Ответ последнего уровня читается потоково, записи выводятся частями по мере чтения."""
+
+    def setUp(self):
+        super().setUp()
+        self.patch(classes, 'stream_final_level', True)
+        self.calls: List[dict] = []
+        save_search_result = classes.save_search_result
+
+        def recording_save_search_result(data, **kwargs) -> int:
+            self.calls.append(kwargs)
+            return save_search_result(data, **kwargs)
+
+        self.patch(classes, 'save_search_result', recording_save_search_result)
+
+    def test_deferred_output_keeps_path(self):
+        task: List[str] = self.hierarchy.sample_tasks(1)[0]
+        context = main.search_object(main.get_session(1, ''), task, defer_output=True)
+        self.assertEqual(context.records, [])
+        self.assertEqual(self.calls, [{'task': task, 'path': context.path}])
+        self.assertEqual(len(self.output.records), self.hierarchy_size[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from typing import List
+
+from support import MockFiasTestCase, TempDirTestCase
+
+import main
+from task_journal import DONE, FAILED, TaskJournal
+from task_reader import Task
+
+
+class TaskJournalTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.journal: TaskJournal = TaskJournal(self.temp_path('journal.sqlite3'))
+        self.addCleanup(self.journal.close)
+
+    def test_pending_skips_done_tasks(self):
+        tasks: List[Task] = [Task.from_line(f'г. Город, ул. Улица, д. {number}', 'tasks.txt', number)
+                             for number in range(1, 4)]
+        self.journal.mark_done('tasks.txt', 1, tasks[0], '1.2.3')
+        self.journal.mark_failed('tasks.txt', 2, tasks[1], 'Address not found')
+        self.assertEqual([task.line_number for task in self.journal.pending('tasks.txt', tasks)], [2, 3])
+        self.assertEqual(self.journal.counts('tasks.txt'), {DONE: 1, FAILED: 1})
+        # Другой файл задач с теми же номерами строк — другие задачи
+        self.assertEqual(len(self.journal.pending('other.txt', tasks)), 3)
+
+    def test_changed_line_is_a_new_task(self):
+        self.journal.mark_done('tasks.txt', 1, Task.from_line('г. Город, ул. Улица, д. 1', 'tasks.txt', 1), '1')
+        changed: Task = Task.from_line('г. Город, ул. Улица, д. 2', 'tasks.txt', 1)
+        self.assertEqual(self.journal.pending('tasks.txt', [changed]), [changed])
+
+    def test_reset(self):
+        task: Task = Task.from_line('г. Город, ул. Улица, д. 1', 'tasks.txt', 1)
+        self.journal.mark_done('tasks.txt', 1, task, '1')
+        self.journal.reset('tasks.txt')
+        self.assertEqual(self.journal.pending('tasks.txt', [task]), [task])
+
+
+class JournalResumeTest(MockFiasTestCase):
+    """Повторный запуск того же файла задач выполняет только задачи, завершившиеся ошибкой."""
+
+    def setUp(self):
+        super().setUp()
+        journal: TaskJournal = TaskJournal(self.temp_path('journal.sqlite3'))
+        self.addCleanup(journal.close)
+        self.patch(main, 'task_journal', journal)
+
+    def read_tasks(self) -> List[Task]:
+        lines: List[str] = [', '.join(task) for task in self.hierarchy.sample_tasks(3)]
+        # У помещения нет дочерних объектов, поэтому последняя задача завершается ошибкой
+        lines.append(lines[0] + ', кв. 1, комн. 1')
+        return [Task.from_line(line, 'tasks.txt', number) for number, line in enumerate(lines, 1)]
+
+    def address_requests(self) -> int:
+        return sum(count for (endpoint, _), count in self.server.counts.items() if endpoint == 'GetAddressItems')
+
+    def test_resume_retries_only_failed_tasks(self):
+        self.assertEqual(main.start(self.read_tasks(), 'tasks.txt', 2), 1)
+        self.assertEqual(main.task_journal.counts('tasks.txt'), {DONE: 3, FAILED: 1})
+        written: int = len(self.output.written)
+        requests_before: int = self.address_requests()
+
+        self.assertEqual(main.start(self.read_tasks(), 'tasks.txt', 2), 1)
+        self.assertEqual(len(self.output.written), written)
+        # Повторяется только поиск задачи с ошибкой: список регионов и дочерние объекты пяти элементов адреса
+        self.assertEqual(self.address_requests() - requests_before, 6)
+        self.assertEqual(main.task_journal.counts('tasks.txt'), {DONE: 3, FAILED: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_reader import Task, deduplicate
+
+
+class DeduplicateTest(unittest.TestCase):
+
+    def test_different_houses_are_not_merged(self):
+        tasks: list = [Task.from_line('г. Москва, ул. Ленина, д. 1 к. 2'),
+                       Task.from_line('г. Москва, ул. Ленина, д. 2 к. 1')]
+        self.assertEqual(len(deduplicate(tasks)), 2)
+
+    def test_same_address_is_merged(self):
+        first: Task = Task.from_line('г. Москва, ул. Ленина, д. 1')
+        second: Task = Task.from_line('г.  Москва,  улица ЛЕНИНА, д. 1')
+        unique: list = deduplicate([first, second])
+        self.assertEqual(unique, [first])
+        self.assertEqual(first.duplicates, [second])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+import unittest
+from typing import List
+from unittest import mock
+
+import requests
+
+from support import TempDirTestCase
+
+from token_manager import AsyncTokenManager, TokenManager
+
+
+class TokenManagerTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tokens: List[str] = []
+
+    def fetch(self, session) -> str:
+        self.tokens.append(f'token-{len(self.tokens) + 1}')
+        return self.tokens[-1]
+
+    def test_token_is_reused_until_ttl(self):
+        manager: TokenManager = TokenManager(self.fetch, ttl=60)
+        self.assertEqual([manager.get(None), manager.get(None)], ['token-1', 'token-1'])
+        with mock.patch('token_manager.time.time', return_value=time.time() + 61):
+            self.assertEqual(manager.get(None), 'token-2')
+        self.assertEqual(manager.refreshes, 2)
+
+    def test_token_is_shared_between_runs(self):
+        path: str = self.temp_path('token.json')
+        self.assertEqual(TokenManager(self.fetch, path).get(None), 'token-1')
+        # Новый запуск берёт токен из файла без запросов
+        self.assertEqual(TokenManager(self.fetch, path).get(None), 'token-1')
+        self.assertEqual(self.tokens, ['token-1'])
+
+    def test_invalidate_refreshes_once(self):
+        manager: TokenManager = TokenManager(self.fetch)
+        rejected: str = manager.get(None)
+        manager.invalidate(rejected)
+        self.assertEqual(manager.get(None), 'token-2')
+        # Отказ, пришедший после обновления, относится к старому токену и не сбрасывает новый
+        manager.invalidate(rejected)
+        self.assertEqual(manager.get(None), 'token-2')
+
+    def test_concurrent_requests_fetch_one_token(self):
+        def slow_fetch(session) -> str:
+            time.sleep(0.1)
+            return self.fetch(session)
+
+        manager: TokenManager = TokenManager(slow_fetch)
+        results: List[str] = []
+        threads: List[threading.Thread] = [threading.Thread(target=lambda: results.append(manager.get(None)))
+                                           for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['token-1'] * 8)
+        self.assertEqual(manager.refreshes, 1)
+
+    def test_missing_token_raises(self):
+        with self.assertRaises(requests.exceptions.RequestException):
+            TokenManager(lambda session: None).get(None)
+
+    def test_async_requests_fetch_one_token(self):
+        async def fetch(client) -> str:
+            await asyncio.sleep(0.05)
+            return self.fetch(client)
+
+        async def run() -> List[str]:
+            manager: AsyncTokenManager = AsyncTokenManager(fetch, self.temp_path('token.json'))
+            return await asyncio.gather(*(manager.get_async(None) for _ in range(8)))
+
+        self.assertEqual(asyncio.run(run()), ['token-1'] * 8)
+        # Токен асинхронного режима хранится в том же формате и подходит синхронному менеджеру
+        self.assertEqual(TokenManager(self.fetch, self.temp_path('token.json')).get(None), 'token-1')
+
+
+if __name__ == '__main__':
+    unittest.main()
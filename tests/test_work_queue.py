@@ -0,0 +1,33 @@
+import unittest
+
+from support import TempDirTestCase
+
+from task_reader import Task
+from work_queue import DONE, FAILED, PENDING, WorkQueue
+
+
+class WorkQueueTest(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.queue: WorkQueue = WorkQueue(self.temp_path('queue.sqlite3'))
+        self.addCleanup(self.queue.close)
+        tasks: list = [Task([f'г. Город, ул. Улица, д. {number}'], 'tasks.txt', number) for number in range(1, 5)]
+        self.queue.enqueue('tasks.txt', tasks, 4)
+
+    def test_retry_skips_finished_tasks(self):
+        chunk_id, chunk = self.queue.claim('w1')
+        self.queue.record(chunk_id, [1], '1.2.3', None)
+        self.queue.record(chunk_id, [2], None, 'Address not found')
+        # Сетевая ошибка: часть возвращается в очередь, при повторе выполняются только задачи 3 и 4
+        self.queue.fail(chunk_id, 'w1', 'Connection refused')
+        self.assertEqual(self.queue.counts(), {PENDING: 1})
+
+        chunk_id, chunk = self.queue.claim('w2')
+        finished: set = self.queue.finished_lines(chunk_id)
+        self.assertEqual([task.line_number for task in chunk if task.line_number not in finished], [3, 4])
+        self.assertEqual(self.queue.task_counts(), {DONE: 1, FAILED: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """
+    Управляет токеном "master-token" для запросов к ФИАС.
+
+    Токен хранится в памяти и на диске, поэтому повторные запуски не выполняют запросы получения токена,
+    пока токен не устарел. Токен обновляется по расписанию (через ttl секунд после получения)
+    и когда сервер отклоняет его (invalidate). Обновление выполняется одним потоком: остальные потоки ждут
+    и получают уже обновлённый токен, а не запускают своё обновление.
+
+    Methods:
+        get(session: requests.Session) -> str:
+        Возвращает действующий токен, при необходимости получая новый.
+
+        invalidate(token: str) -> None:
+        Отмечает токен как отклонённый сервером.
+    """
+
+    def __init__(self, fetch: Callable[[requests.Session], str | None], cache_path: str = None, ttl: float = 1800):
+        """
+        :param fetch: Функция, получающая новый токен через сессию (последовательность запросов get_token).
+        :type fetch: Callable[[requests.Session], str | None]
+        :param cache_path: Путь к файлу, где токен хранится между запусками. Если None, токен хранится только в памяти.
+        :type cache_path: Optional[str]
+        :param ttl: Через сколько секунд после получения токен обновляется.
+        :type ttl: float
+        """
+        self.fetch = fetch
+        self.cache_path = cache_path
+        self.ttl = ttl
+
+        self._token: str | None = None
+        self._obtained_at: float = 0
+        self._loaded: bool = False
+        self._lock = threading.Lock()
+
+        # Количество полученных токенов, для статистики
+        self.refreshes = 0
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.time() - self._obtained_at < self.ttl
+
+    def _load(self) -> None:
+        """
+        Загружает токен с диска, если файл есть.
+
+        :return: None
+        """
+        self._loaded = True
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                data: dict = json.load(file)
+            self._token, self._obtained_at = data.get('token'), float(data.get('obtained_at', 0))
+            logger.info('Token loaded from disk')
+        except (OSError, ValueError) as e:
+            logger.warning(f'Could not load token from {self.cache_path}: {e}')
+
+    def _save(self) -> None:
+        """
+        Сохраняет токен на диск.
+
+        :return: None
+        """
+        if not self.cache_path:
+            return
+        if os.path.dirname(self.cache_path):
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+
+        # Запись через временный файл, чтобы прерванная запись не испортила сохранённый токен
+        temporary_path: str = self.cache_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump({'token': self._token, 'obtained_at': self._obtained_at}, file)
+        os.replace(temporary_path, self.cache_path)
+
+    def get(self, session: requests.Session) -> str:
+        """
+        Возвращает действующий токен. Если токена нет, он устарел или был отклонён, получает новый.
+
+        :param session: Активная сессия для получения токена.
+        :type session: requests.Session
+        :return: Токен.
+        :rtype: str
+        :raises requests.exceptions.RequestException: Если токен получить не удалось.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if not self._is_fresh():
+                logger.info('Token request started')
+                token: str | None = self.fetch(session)
+                if not token:
+                    raise requests.exceptions.RequestException('Token was not received')
+                self._token, self._obtained_at = token, time.time()
+                self.refreshes += 1
+                self._save()
+                logger.info('Token received')
+            return self._token
+
+    def invalidate(self, token: str) -> None:
+        """
+        Отмечает токен как отклонённый сервером. Если токен уже обновлён другим потоком, ничего не делает,
+        поэтому одновременные отказы в нескольких потоках приводят к одному обновлению.
+
+        :param token: Токен, который отклонил сервер.
+        :type token: str
+        :return: None
+        """
+        with self._lock:
+            if self._token == token:
+                logger.warning('Token rejected by server, it will be refreshed')
+                self._token = None
+
+
+class AsyncTokenManager(TokenManager):
+    """
+    Менеджер токена для асинхронных запросов (async_classes.py). Хранит токен так же, как TokenManager,
+    но получает его асинхронной функцией fetch, а одновременные обращения ждут одного обновления
+    на asyncio.Lock, не блокируя цикл событий.
+
+    Methods:
+        get_async(client) -> str:
+        Возвращает действующий токен, при необходимости получая новый.
+    """
+
+    def __init__(self, fetch: Callable[[object], Awaitable[str | None]], cache_path: str = None, ttl: float = 1800):
+        """
+        :param fetch: Асинхронная функция, получающая новый токен через HTTP-клиент.
+        :type fetch: Callable[[object], Awaitable[str | None]]
+        :param cache_path: Путь к файлу, где токен хранится между запусками. Если None, токен хранится только в памяти.
+        :type cache_path: Optional[str]
+        :param ttl: Через сколько секунд после получения токен обновляется.
+        :type ttl: float
+        """
+        super().__init__(fetch, cache_path, ttl)
+        self._async_lock: asyncio.Lock | None = None
+
+    async def get_async(self, client) -> str:
+        """
+        Возвращает действующий токен. Если токена нет, он устарел или был отклонён, получает новый.
+
+        :param client: Асинхронный HTTP-клиент для получения токена.
+        :type client: httpx.AsyncClient
+        :return: Токен.
+        :rtype: str
+        :raises requests.exceptions.RequestException: Если токен получить не удалось.
+        """
+        # Блокировка создаётся в работающем цикле событий, а не при создании менеджера
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            if not self._loaded:
+                self._load()
+            if not self._is_fresh():
+                logger.info('Token request started')
+                token: str | None = await self.fetch(client)
+                if not token:
+                    raise requests.exceptions.RequestException('Token was not received')
+                with self._lock:
+                    self._token, self._obtained_at = token, time.time()
+                self.refreshes += 1
+                self._save()
+                logger.info('Token received')
+            return self._token
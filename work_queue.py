@@ -0,0 +1,323 @@
+"""
+Общая очередь задач для нескольких машин без координатора (ключ запуска --queue).
+
+Файл задач один раз загружается в базу SQLite на общем диске частями по queue_chunk_size задач.
+Каждый запущенный обработчик забирает часть с арендой на lease_time секунд, продлевает аренду, пока
+обрабатывает часть, и отмечает её выполненной. Если обработчик завершился аварийно, его аренда истекает,
+и часть забирает другой обработчик. Чтобы ускорить обработку, достаточно запустить больше обработчиков.
+
+    python main.py --tasks tasks.txt --queue //server/share/queue.sqlite3
+
+Результат каждой задачи (path или ошибка) записывается в очередь сразу после вывода её записей. Часть,
+обработчик которой завершился аварийно или получил сетевую ошибку, выполняется заново только для задач без
+записанного результата. Записи задачи могут попасть в результат дважды, только если обработчик завершился
+между выводом её записей и записью результата (каждый обработчик пишет в свои файлы вывода).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+from task_reader import Task, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+# Состояния части задач
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """
+    Очередь частей задач с арендой в базе SQLite.
+
+    База используется без WAL: журнал WAL требует общей памяти и не работает на сетевых дисках.
+    Каждая операция — короткая транзакция BEGIN IMMEDIATE, поэтому обработчики на разных машинах
+    не забирают одну часть дважды.
+
+    Methods:
+        enqueue(source: str, tasks: Iterable[Task], chunk_size: int) -> int:
+        Загружает задачи в очередь, если файл задач ещё не загружен.
+
+        claim(worker: str) -> Tuple[int, List[Task]] | None:
+        Забирает свободную часть или часть с истёкшей арендой.
+
+        renew(chunk_id: int, worker: str) -> bool:
+        Продлевает аренду части.
+
+        complete(chunk_id: int, worker: str) -> None:
+        Отмечает часть выполненной.
+
+        fail(chunk_id: int, worker: str, error: str) -> None:
+        Возвращает часть в очередь после ошибки.
+
+        record(chunk_id: int, line_numbers: List[int], path: str | None, error: str | None) -> None:
+        Записывает результат задачи.
+
+        finished_lines(chunk_id: int) -> Set[int]:
+        Номера строк задач части, результат которых уже записан.
+    """
+
+    def __init__(self, db_path: str, lease_time: float = 300, max_attempts: int = 3):
+        """
+        Открывает (или создаёт) базу очереди.
+
+        :param db_path: Путь к файлу базы SQLite на общем диске.
+        :type db_path: str
+        :param lease_time: Время аренды части, секунды. Обработчик продлевает аренду, пока часть обрабатывается.
+        :type lease_time: float
+        :param max_attempts: Сколько раз часть выдаётся обработчикам, прежде чем она считается невыполнимой.
+        :type max_attempts: int
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+
+        # Транзакции открываются явно (isolation_level=None), ожидание блокировки другой машиной — до 60 секунд
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=DELETE')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, source TEXT, first_line INTEGER, '
+            'tasks TEXT, status TEXT, worker TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, error TEXT, '
+            'updated_at REAL, UNIQUE (source, first_line))'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS chunks_status ON chunks (status, lease_until)')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS results (chunk_id INTEGER, line_number INTEGER, path TEXT, error TEXT, '
+            'updated_at REAL, PRIMARY KEY (chunk_id, line_number))'
+        )
+
+    def _transaction(self, statements: List[Tuple[str, tuple]]) -> List[sqlite3.Cursor]:
+        """
+        Выполняет запросы в одной транзакции с блокировкой на запись.
+
+        :param statements: Запросы и их параметры.
+        :type statements: List[Tuple[str, tuple]]
+        :return: Курсоры выполненных запросов.
+        :rtype: List[sqlite3.Cursor]
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                cursors: List[sqlite3.Cursor] = [self._connection.execute(sql, parameters)
+                                                 for sql, parameters in statements]
+                self._connection.execute('COMMIT')
+                return cursors
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+
+    def enqueue(self, source: str, tasks: Iterable[Task], chunk_size: int = 500) -> int:
+        """
+        Загружает задачи в очередь частями по chunk_size. Если задачи этого файла уже загружены
+        (другим обработчиком или в прошлом запуске), ничего не делает, поэтому все обработчики
+        можно запускать одной и той же командой.
+
+        :param source: Имя файла задач, одинаковое на всех машинах.
+        :type source: str
+        :param tasks: Задачи.
+        :type tasks: Iterable[Task]
+        :param chunk_size: Количество задач в части.
+        :type chunk_size: int
+        :return: Количество загруженных частей.
+        :rtype: int
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                if self._connection.execute('SELECT 1 FROM chunks WHERE source = ? LIMIT 1', (source,)).fetchone():
+                    self._connection.execute('ROLLBACK')
+                    logger.info(f'Tasks of {source} are already in the queue')
+                    return 0
+                count: int = 0
+                now: float = time.time()
+                for chunk in iter_chunks(tasks, chunk_size):
+                    self._connection.execute(
+                        'INSERT OR IGNORE INTO chunks (source, first_line, tasks, status, updated_at) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (source, chunk[0].line_number, json.dumps(
+                            [[task.line_number, task.raw, list(task)] for task in chunk], ensure_ascii=False),
+                         PENDING, now))
+                    count += 1
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+        logger.info(f'Enqueued {count} chunks of {source}')
+        return count
+
+    def claim(self, worker: str) -> Tuple[int, List[Task]] | None:
+        """
+        Забирает свободную часть или часть, аренда которой истекла (обработчик завершился аварийно).
+
+        :param worker: Имя обработчика.
+        :type worker: str
+        :return: ID части и её задачи или None, если свободных частей нет.
+        :rtype: Optional[Tuple[int, List[Task]]]
+        """
+        now: float = time.time()
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                # Части, которые выдавались max_attempts раз и снова брошены, считаются невыполнимыми
+                self._connection.execute(
+                    'UPDATE chunks SET status = ?, error = ?, updated_at = ? '
+                    'WHERE status = ? AND lease_until < ? AND attempts >= ?',
+                    (FAILED, 'Lease expired too many times', now, LEASED, now, self.max_attempts))
+                row = self._connection.execute(
+                    'SELECT id, source, tasks, status, worker FROM chunks '
+                    'WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY id LIMIT 1',
+                    (PENDING, LEASED, now)).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        'UPDATE chunks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, '
+                        'updated_at = ? WHERE id = ?', (LEASED, worker, now + self.lease_time, now, row[0]))
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+
+        chunk_id, source, tasks, status, previous_worker = row
+        if status == LEASED:
+            logger.warning(f'Chunk {chunk_id} lease of worker {previous_worker} expired, re-queued to {worker}')
+        return chunk_id, [Task(elements, source, line_number, raw) for line_number, raw, elements in json.loads(tasks)]
+
+    def renew(self, chunk_id: int, worker: str) -> bool:
+        """
+        Продлевает аренду части, если она всё ещё принадлежит обработчику.
+
+        :return: False, если аренда истекла и часть забрал другой обработчик.
+        :rtype: bool
+        """
+        cursor: sqlite3.Cursor = self._transaction([(
+            'UPDATE chunks SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?',
+            (time.time() + self.lease_time, time.time(), chunk_id, worker, LEASED))])[0]
+        return cursor.rowcount == 1
+
+    def complete(self, chunk_id: int, worker: str) -> None:
+        """
+        Отмечает часть выполненной, если она всё ещё принадлежит обработчику.
+
+        :return: None
+        """
+        self._transaction([('UPDATE chunks SET status = ?, updated_at = ? WHERE id = ? AND worker = ?',
+                            (DONE, time.time(), chunk_id, worker))])
+
+    def fail(self, chunk_id: int, worker: str, error: str) -> None:
+        """
+        Возвращает часть в очередь после ошибки. После max_attempts попыток часть считается невыполнимой.
+
+        :return: None
+        """
+        self._transaction([(
+            'UPDATE chunks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_until = NULL, '
+            'updated_at = ? WHERE id = ? AND worker = ?',
+            (self.max_attempts, FAILED, PENDING, error, time.time(), chunk_id, worker))])
+
+    def record(self, chunk_id: int, line_numbers: List[int], path: str | None, error: str | None) -> None:
+        """
+        Записывает результат задачи (и её дубликатов): path найденного дома или ошибку, относящуюся только
+        к этой задаче (например, адрес не найден). Задачи с записанным результатом не выполняются повторно.
+
+        :param chunk_id: ID части.
+        :type chunk_id: int
+        :param line_numbers: Номера строк задачи и её дубликатов в файле задач.
+        :type line_numbers: List[int]
+        :param path: Path найденного дома или None при ошибке.
+        :type path: Optional[str]
+        :param error: Текст ошибки или None.
+        :type error: Optional[str]
+        :return: None
+        """
+        now: float = time.time()
+        self._transaction([('INSERT OR REPLACE INTO results (chunk_id, line_number, path, error, updated_at) '
+                            'VALUES (?, ?, ?, ?, ?)', (chunk_id, line_number, path, error, now))
+                           for line_number in line_numbers])
+
+    def finished_lines(self, chunk_id: int) -> Set[int]:
+        """
+        Номера строк задач части, результат которых уже записан (в том числе другим обработчиком).
+
+        :rtype: Set[int]
+        """
+        with self._lock:
+            return {row[0] for row in self._connection.execute(
+                'SELECT line_number FROM results WHERE chunk_id = ?', (chunk_id,))}
+
+    def task_counts(self) -> Dict[str, int]:
+        """
+        Количество задач с записанным результатом: выполненных (done) и завершившихся ошибкой (failed).
+
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            return dict(self._connection.execute(
+                'SELECT CASE WHEN error IS NULL THEN ? ELSE ? END, COUNT(*) FROM results GROUP BY 1',
+                (DONE, FAILED)).fetchall())
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Количество частей по состояниям.
+
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            return dict(self._connection.execute('SELECT status, COUNT(*) FROM chunks GROUP BY status').fetchall())
+
+    def is_finished(self) -> bool:
+        """
+        Проверяет, что в очереди не осталось ни свободных, ни арендованных частей.
+
+        :rtype: bool
+        """
+        counts: Dict[str, int] = self.counts()
+        return not counts.get(PENDING) and not counts.get(LEASED)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class LeaseKeeper:
+    """
+    Фоновый поток, который продлевает аренду части, пока она обрабатывается.
+
+    Attributes:
+    lost bool: Аренда истекла, и часть забрал другой обработчик.
+    """
+
+    def __init__(self, queue: WorkQueue, chunk_id: int, worker: str):
+        self.queue = queue
+        self.chunk_id = chunk_id
+        self.worker = worker
+        self.lost = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'lease-{chunk_id}', daemon=True)
+
+    def _run(self) -> None:
+        # Аренда продлевается трижды за время аренды, чтобы пережить задержку одного продления
+        while not self._stopped.wait(self.queue.lease_time / 3):
+            try:
+                if not self.queue.renew(self.chunk_id, self.worker):
+                    self.lost = True
+                    logger.warning(f'Lease of chunk {self.chunk_id} was lost')
+                    return
+            except sqlite3.Error as e:
+                logger.warning(f'Failed to renew lease of chunk {self.chunk_id}: {e}')
+
+    def __enter__(self) -> 'LeaseKeeper':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()